@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Batch CLI - non-interactive JSONL generation
+
+Streams generation specs (one JSON object per line, see generation_specs.py)
+from a file or stdin and writes one JSON result per line to stdout as items
+complete. At most `--concurrency * 2` specs are in memory at any time, so
+input size doesn't matter. --concurrency only bounds the worker threads:
+the adaptive limiter in concurrency.py decides how many upstream calls are
+actually in flight, so it is safe to set it high.
+
+Usage:
+    python batch_cli.py specs.jsonl --concurrency 8 > results.jsonl
+    cat specs.jsonl | python batch_cli.py - --order completion --cache cache.db
+    python content_agent.py batch specs.jsonl --dry-run
+    python create_agent.py batch specs.jsonl
+"""
+
+import json
+import sys
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from budget import add_budget_arguments, budget_from_args
+from generation_specs import SpecRunner, spec_fingerprint
+from result_store import add_result_store_arguments, result_store_from_env
+
+
+def infer_kind(spec: dict, default_kind: str) -> dict:
+    """Fill in a missing 'kind' from the fields present, else the caller's default"""
+    if "kind" not in spec:
+        if "original_post" in spec:
+            spec["kind"] = "comment"
+        elif "prompt" in spec:
+            spec["kind"] = "content"
+        else:
+            spec["kind"] = default_kind
+    return spec
+
+
+def read_lines(source):
+    """Yield (line_number, spec or parse error) from a JSONL stream"""
+    for number, line in enumerate(source, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            spec = json.loads(line)
+            if not isinstance(spec, dict):
+                raise ValueError("spec must be a JSON object")
+            yield number, spec
+        except ValueError as e:
+            yield number, e
+
+
+def process(number: int, spec, runner: SpecRunner, cache=None, dry_run: bool = False) -> dict:
+    """Handle one input line; never raises, errors are reported in the output record"""
+    if isinstance(spec, Exception):
+        return {"line": number, "error": f"Invalid JSON: {spec}"}
+
+    record = {"line": number, "spec": spec}
+    try:
+        if dry_run:
+            record.update(runner.render(spec))
+            return record
+
+        key = spec_fingerprint(spec) if cache else None
+        result = cache.get(key) if cache else None
+        record["cached"] = result is not None
+        if result is None:
+            result = runner.run(spec)
+            if cache:
+                cache.set(key, result)
+        record["result"] = result
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    return record
+
+
+def run_batch(
+    source,
+    output,
+    runner: SpecRunner = None,
+    concurrency: int = 4,
+    order: str = "input",
+    cache=None,
+    dry_run: bool = False,
+    default_kind: str = "reddit_content"
+) -> dict:
+    """Process a JSONL stream; returns {"processed": n, "errors": n}"""
+    runner = runner or SpecRunner()
+    window = max(1, concurrency) * 2
+    counts = {"processed": 0, "errors": 0}
+
+    def emit(record: dict):
+        output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        output.flush()
+        counts["processed"] += 1
+        counts["errors"] += "error" in record
+
+    def items():
+        for number, spec in read_lines(source):
+            if isinstance(spec, dict):
+                spec = infer_kind(spec, default_kind)
+            yield number, spec
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        if order == "input":
+            # Results leave in input order; reading pauses while the head item is outstanding
+            pending = deque()
+            for number, spec in items():
+                pending.append(executor.submit(process, number, spec, runner, cache, dry_run))
+                if len(pending) >= window:
+                    emit(pending.popleft().result())
+            while pending:
+                emit(pending.popleft().result())
+        else:
+            pending = set()
+            for number, spec in items():
+                pending.add(executor.submit(process, number, spec, runner, cache, dry_run))
+                if len(pending) >= window:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        emit(future.result())
+            for future in wait(pending).done:
+                emit(future.result())
+
+    return counts
+
+
+def main(argv=None, default_kind: str = "reddit_content") -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate content for a JSONL stream of specs")
+    parser.add_argument("input", nargs="?", default="-", help="JSONL spec file ('-' or omitted for stdin)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Worker threads (upper bound on in-flight calls)")
+    parser.add_argument("--order", choices=("input", "completion"), default="input",
+                        help="Emit results in input order or as they complete")
+    parser.add_argument("--cache", metavar="PATH", help="Reuse results from a SQLite response cache")
+    parser.add_argument("--dry-run", action="store_true", help="Render prompts without calling the model")
+    parser.add_argument("--default-kind", default=default_kind,
+                        help=f"Kind for specs without one (default: {default_kind})")
+    add_budget_arguments(parser)
+    add_result_store_arguments(parser)
+    args = parser.parse_args(argv)
+    ledger, labels = budget_from_args(args)
+    results = result_store_from_env(args.results)
+
+    cache = None
+    if args.cache:
+        from response_cache import ResponseCache
+        cache = ResponseCache(args.cache)
+
+    source = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8")
+    try:
+        counts = run_batch(
+            source,
+            sys.stdout,
+            runner=SpecRunner(budget=ledger, budget_labels=labels, result_store=results),
+            concurrency=args.concurrency,
+            order=args.order,
+            cache=cache,
+            dry_run=args.dry_run,
+            default_kind=args.default_kind
+        )
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if cache:
+            cache.close()
+        if ledger:
+            ledger.close()
+        if results:
+            results.close()
+
+    print(f"✅ {counts['processed']} processed, {counts['errors']} errors", file=sys.stderr)
+    return 1 if counts["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,543 @@
+#!/usr/bin/env python3
+"""
+Budget - token and cost ledger with admission control
+
+Every upstream call is admitted against the configured limits before it
+is made and then recorded with its actual usage. Spend is aggregated per
+tenant, campaign, subreddit and model, per period (day/month/total).
+
+Admission reserves the worst case (estimated prompt tokens + max_tokens)
+so concurrent calls can't overshoot a limit together. Over a soft limit
+a call is downgraded to a cheaper model (or just flagged). Over a hard
+limit it is rejected with BudgetExceeded, or queued until budget frees
+up or queue_timeout passes.
+
+Counters live in striped dicts, each stripe with its own lock, so calls
+for different tenants/subreddits rarely contend.
+
+With a path, a background thread saves the ledger every save_interval
+seconds, and close() saves it one last time. Each save adds this
+process's spend since the previous save to the file under a file lock,
+then adopts the merged totals. Several processes (serve.py workers,
+parallel job runners) can therefore share one ledger file without
+overwriting each other, and each sees the others' spend within one
+interval. The file lock is fcntl.flock on POSIX and msvcrt.locking on
+Windows; where neither exists saves are unlocked (fine for one process).
+
+Usage:
+    ledger = BudgetLedger.from_config("budget.json", path="ledger.json")
+    agent = SimpleContentAgent(budget=ledger, budget_labels={"tenant": "acme", "campaign": "spring"})
+    python budget.py status ledger.json --config budget.json
+
+The CLIs take --budget-config/--budget-ledger/--budget-labels, and the
+web API reads BUDGET_CONFIG/BUDGET_LEDGER/BUDGET_LABELS.
+"""
+
+import atexit
+import contextlib
+import json
+import math
+import os
+import sys
+import threading
+import time
+
+# USD per 1K (prompt, completion) tokens
+PRICES = {
+    "gpt-4": (0.03, 0.06),
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+}
+DEFAULT_DOWNGRADES = {"gpt-4": "gpt-3.5-turbo", "gpt-4-turbo": "gpt-4o-mini", "gpt-4o": "gpt-4o-mini"}
+
+DIMENSIONS = ("tenant", "campaign", "subreddit", "model")
+PERIODS = {"day": "%Y-%m-%d", "month": "%Y-%m", "total": None}
+
+
+class BudgetExceeded(Exception):
+    """Raised when a call would exceed a hard budget limit"""
+    pass
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    prompt_price, completion_price = PRICES.get(model, PRICES["gpt-4"])  # unknown models priced high
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
+
+
+def period_key(period: str, now: float = None) -> str:
+    fmt = PERIODS[period]
+    return time.strftime(fmt, time.gmtime(now)) if fmt else "total"
+
+
+class Limit:
+    """Spend limit (USD) for one dimension value, e.g. tenant=acme per month"""
+
+    def __init__(
+        self,
+        dimension: str,
+        key: str = "*",
+        period: str = "month",
+        hard: float = None,
+        soft: float = None,
+        on_soft: str = "downgrade",
+        on_hard: str = "reject"
+    ):
+        if dimension not in DIMENSIONS:
+            raise ValueError(f"Unknown budget dimension {dimension!r}; expected one of {DIMENSIONS}")
+        if period not in PERIODS:
+            raise ValueError(f"Unknown budget period {period!r}; expected one of {tuple(PERIODS)}")
+        if on_soft not in ("downgrade", "allow") or on_hard not in ("reject", "queue"):
+            raise ValueError("on_soft must be 'downgrade' or 'allow'; on_hard must be 'reject' or 'queue'")
+        self.dimension = dimension
+        self.key = key  # "*" applies to every value separately
+        self.period = period
+        self.hard = hard
+        self.soft = soft
+        self.on_soft = on_soft
+        self.on_hard = on_hard
+
+    def applies(self, labels: dict) -> bool:
+        value = labels.get(self.dimension)
+        return value is not None and (self.key == "*" or self.key == value)
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in ("dimension", "key", "period", "hard", "soft", "on_soft", "on_hard")}
+
+
+class Admission:
+    """An admitted call: the model to use and what was reserved for it"""
+
+    __slots__ = ("model", "labels", "reserved", "keys", "downgraded", "soft_limited")
+
+    def __init__(self, model, labels, reserved, keys, downgraded=False, soft_limited=False):
+        self.model = model
+        self.labels = labels
+        self.reserved = reserved
+        self.keys = keys
+        self.downgraded = downgraded
+        self.soft_limited = soft_limited
+
+
+class _Counter:
+    __slots__ = ("tokens", "cost", "reserved", "calls", "minutes", "unsaved", "unsaved_minutes")
+
+    def __init__(self):
+        self.tokens = 0
+        self.cost = 0.0
+        self.reserved = 0.0
+        self.calls = 0
+        self.minutes = {}  # minute -> cost, for burn rate
+        self.unsaved = [0, 0.0, 0]  # tokens, cost, calls recorded since the last save
+        self.unsaved_minutes = {}
+
+
+class BudgetLedger:
+    """Striped-lock spend ledger with admission control"""
+
+    def __init__(
+        self,
+        limits=(),
+        downgrades: dict = None,
+        path: str = None,
+        stripes: int = 16,
+        queue_timeout: float = 60.0,
+        burn_window: float = 3600.0,
+        save_interval: float = 5.0
+    ):
+        self.limits = list(limits)
+        self.downgrades = DEFAULT_DOWNGRADES if downgrades is None else downgrades
+        self.path = path
+        self.queue_timeout = queue_timeout
+        self.burn_window = burn_window
+        self.save_interval = save_interval
+        self.rejected = 0
+        self.downgraded = 0
+
+        self._stripe_count = stripes
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self._counters = [{} for _ in range(stripes)]
+        self._changed = threading.Condition()
+        self._waiters = 0  # queued admits; record/release only take _changed when there are some
+        self._version = 0  # bumped on every record/release so a waiter can't miss one
+        self._dirty = False
+        self._saver_pid = None  # the saver thread doesn't survive a fork, so it's started per process
+        self._stop_saving = threading.Event()
+
+        if path and os.path.exists(path):
+            self.load(path)
+
+    @classmethod
+    def from_config(cls, config_path: str, **kwargs) -> "BudgetLedger":
+        """Build from {"limits": [...], "downgrades": {...}} JSON"""
+        with open(config_path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        return cls(
+            limits=[Limit(**limit) for limit in config.get("limits", [])],
+            downgrades=config.get("downgrades"),
+            **kwargs
+        )
+
+    # Counters
+    def _stripe(self, key: tuple) -> int:
+        return hash(key) % self._stripe_count
+
+    def _keys_for(self, labels: dict, now: float) -> list:
+        """Counter keys (dimension, value, period) a call with these labels updates"""
+        keys = []
+        for dimension in DIMENSIONS:
+            value = labels.get(dimension)
+            if value is not None:
+                for period in PERIODS:
+                    keys.append((dimension, value, period_key(period, now)))
+        return keys
+
+    def _locked(self, keys: list):
+        """Acquire the stripes of `keys` in a fixed order (no deadlocks)"""
+        stripes = sorted({self._stripe(key) for key in keys})
+        for stripe in stripes:
+            self._locks[stripe].acquire()
+        return stripes
+
+    def _unlock(self, stripes: list):
+        for stripe in reversed(stripes):
+            self._locks[stripe].release()
+
+    def _counter(self, key: tuple) -> _Counter:
+        counters = self._counters[self._stripe(key)]
+        counter = counters.get(key)
+        if counter is None:
+            counter = counters[key] = _Counter()
+        return counter
+
+    # Admission
+    def _check(self, labels: dict, cost: float, now: float):
+        """(hard limit hit or None, soft limit hit or None); caller holds the stripes"""
+        hard_hit = soft_hit = None
+        for limit in self.limits:
+            if not limit.applies(labels):
+                continue
+            counter = self._counter((limit.dimension, labels[limit.dimension], period_key(limit.period, now)))
+            committed = counter.cost + counter.reserved + cost
+            if limit.hard is not None and committed > limit.hard:
+                hard_hit = hard_hit or limit
+            elif limit.soft is not None and committed > limit.soft:
+                soft_hit = soft_hit or limit
+        return hard_hit, soft_hit
+
+    def _try_admit(self, labels: dict, model: str, prompt_tokens: int, max_tokens: int):
+        """Admission, or the hard Limit that blocks the call"""
+        now = time.time()
+        downgraded = soft_limited = False
+        while True:
+            call_labels = dict(labels, model=model)
+            cost = estimate_cost(model, prompt_tokens, max_tokens)
+            keys = self._keys_for(call_labels, now)
+            stripes = self._locked(keys)
+            try:
+                hard_hit, soft_hit = self._check(call_labels, cost, now)
+                cheaper = self.downgrades.get(model)
+                blocking = hard_hit or (soft_hit if soft_hit and soft_hit.on_soft == "downgrade" else None)
+                if blocking is None or cheaper is None:
+                    if hard_hit:
+                        return hard_hit
+                    for key in keys:
+                        self._counter(key).reserved += cost
+                    return Admission(model, call_labels, cost, keys, downgraded, soft_limited or soft_hit is not None)
+            finally:
+                self._unlock(stripes)
+            # Over a limit with a cheaper model available: try again with it
+            model = cheaper
+            downgraded = True
+            soft_limited = soft_limited or hard_hit is None
+
+    def admit(self, labels: dict, model: str, prompt_tokens: int, max_tokens: int) -> Admission:
+        """
+        Admit a call before it is made; returns an Admission whose .model
+        may be a cheaper one. Raises BudgetExceeded on a hard limit
+        (after waiting up to queue_timeout when the limit queues).
+        """
+        deadline = None
+        while True:
+            version = self._version
+            result = self._try_admit(labels, model, prompt_tokens, max_tokens)
+            if isinstance(result, Admission):
+                if result.downgraded:
+                    self.downgraded += 1
+                return result
+
+            limit = result
+            if limit.on_hard == "queue":
+                deadline = deadline or time.monotonic() + self.queue_timeout
+                remaining = deadline - time.monotonic()
+                if remaining > 0:
+                    with self._changed:
+                        self._waiters += 1
+                        try:
+                            if self._version == version:  # nothing freed up since _try_admit
+                                self._changed.wait(min(remaining, 1.0))  # re-check at least every second (period roll-over)
+                        finally:
+                            self._waiters -= 1
+                    continue
+            self.rejected += 1
+            raise BudgetExceeded(
+                f"{limit.dimension}={labels.get(limit.dimension, model)} is over its {limit.period}ly "
+                f"budget of ${limit.hard:.2f}"
+            )
+
+    def record(self, admission: Admission, prompt_tokens: int, completion_tokens: int):
+        """Commit the actual usage of an admitted call and release its reservation"""
+        prompt_tokens = prompt_tokens or 0
+        completion_tokens = completion_tokens or 0
+        cost = estimate_cost(admission.model, prompt_tokens, completion_tokens)
+        minute = int(time.time() // 60)
+        stripes = self._locked(admission.keys)
+        try:
+            for key in admission.keys:
+                counter = self._counter(key)
+                counter.reserved -= admission.reserved
+                counter.tokens += prompt_tokens + completion_tokens
+                counter.cost += cost
+                counter.calls += 1
+                unsaved = counter.unsaved
+                unsaved[0] += prompt_tokens + completion_tokens
+                unsaved[1] += cost
+                unsaved[2] += 1
+                if key[2] == "total":
+                    counter.minutes[minute] = counter.minutes.get(minute, 0.0) + cost
+                    counter.unsaved_minutes[minute] = counter.unsaved_minutes.get(minute, 0.0) + cost
+        finally:
+            self._unlock(stripes)
+        self._dirty = True
+        if self.path and self._saver_pid != os.getpid():
+            self._start_saver()
+        self._notify()
+
+    def release(self, admission: Admission):
+        """Drop the reservation of a call that failed"""
+        stripes = self._locked(admission.keys)
+        try:
+            for key in admission.keys:
+                self._counter(key).reserved -= admission.reserved
+        finally:
+            self._unlock(stripes)
+        self._notify()
+
+    def _notify(self):
+        self._version += 1
+        if self._waiters:  # the common case has no queued admits and skips the shared lock
+            with self._changed:
+                self._changed.notify_all()
+
+    # Reporting
+    def spend(self, dimension: str, value: str, period: str = "month") -> dict:
+        key = (dimension, value, period_key(period))
+        stripe = self._stripe(key)
+        with self._locks[stripe]:
+            counter = self._counters[stripe].get(key) or _Counter()
+            return {"tokens": counter.tokens, "cost": round(counter.cost, 6), "calls": counter.calls,
+                    "reserved": round(counter.reserved, 6)}
+
+    def burn_rate(self, dimension: str, value: str) -> float:
+        """USD per hour over the last burn_window seconds"""
+        key = (dimension, value, "total")
+        stripe = self._stripe(key)
+        oldest = int((time.time() - self.burn_window) // 60)
+        with self._locks[stripe]:
+            counter = self._counters[stripe].get(key)
+            if counter is None:
+                return 0.0
+            for minute in [m for m in counter.minutes if m < oldest]:
+                del counter.minutes[minute]
+            cost = sum(counter.minutes.values())
+        return cost * 3600 / self.burn_window
+
+    def status(self) -> list:
+        """Spend, burn rate and time to exhaustion for every limited value seen"""
+        rows = []
+        for limit in self.limits:
+            values = {limit.key} if limit.key != "*" else {
+                key[1] for counters in self._counters for key in list(counters) if key[0] == limit.dimension
+            }
+            for value in sorted(values):
+                spent = self.spend(limit.dimension, value, limit.period)
+                burn = self.burn_rate(limit.dimension, value)
+                remaining = limit.hard - spent["cost"] if limit.hard is not None else None
+                rows.append({
+                    "dimension": limit.dimension,
+                    "value": value,
+                    "period": limit.period,
+                    "spent": spent["cost"],
+                    "tokens": spent["tokens"],
+                    "soft": limit.soft,
+                    "hard": limit.hard,
+                    "burn_per_hour": round(burn, 4),
+                    "hours_to_hard_limit": round(remaining / burn, 1) if remaining is not None and burn > 0 else None,
+                })
+        return rows
+
+    # Persistence
+    def _start_saver(self):
+        with self._changed:
+            if self._saver_pid == os.getpid():
+                return
+            self._saver_pid = os.getpid()
+            self._stop_saving = threading.Event()
+        threading.Thread(target=self._saver, name="budget-saver", daemon=True).start()
+        atexit.register(self.close)
+
+    def _saver(self):
+        stop = self._stop_saving
+        while not stop.wait(self.save_interval):
+            if self._dirty:
+                try:
+                    self.save()
+                except OSError as e:
+                    print(f"⚠️ Could not save budget ledger {self.path}: {e}", file=sys.stderr)
+
+    def close(self):
+        """Stop the saver thread and save what it hasn't"""
+        self._stop_saving.set()
+        if self.path and self._dirty:
+            self.save()
+
+    def save(self, path: str = None):
+        """Merge this process's unsaved spend into the ledger file and adopt the merged totals"""
+        path = path or self.path
+        self._dirty = False
+        oldest = int((time.time() - self.burn_window) // 60)
+        with _file_lock(f"{path}.lock"):
+            on_disk = {key: [tokens, cost, calls, minutes] for key, tokens, cost, calls, minutes in self._read(path)}
+            by_stripe = [[] for _ in range(self._stripe_count)]
+            for key in on_disk:
+                by_stripe[self._stripe(key)].append(key)
+
+            for lock, counters, disk_keys in zip(self._locks, self._counters, by_stripe):
+                with lock:
+                    for key in disk_keys:
+                        if key not in counters:
+                            counters[key] = _Counter()  # spent by another process
+                    for key, counter in counters.items():
+                        row = on_disk.setdefault(key, [0, 0.0, 0, {}])
+                        tokens, cost, calls = counter.unsaved
+                        row[0] += tokens
+                        row[1] += cost
+                        row[2] += calls
+                        for minute, spent in counter.unsaved_minutes.items():
+                            row[3][minute] = row[3].get(minute, 0.0) + spent
+                        row[3] = {minute: spent for minute, spent in row[3].items() if minute >= oldest}
+                        counter.tokens, counter.cost, counter.calls, counter.minutes = row[0], row[1], row[2], dict(row[3])
+                        counter.unsaved, counter.unsaved_minutes = [0, 0.0, 0], {}
+
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"counters": [[list(key)] + row for key, row in on_disk.items()]}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+
+    @staticmethod
+    def _read(path: str) -> list:
+        """(key, tokens, cost, calls, minutes) rows of a ledger file; none if it doesn't exist yet"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return []
+        return [
+            (tuple(key), tokens, cost, calls, {int(minute): spent for minute, spent in minutes.items()})
+            for key, tokens, cost, calls, minutes in data["counters"]
+        ]
+
+    def load(self, path: str):
+        for key, tokens, cost, calls, minutes in self._read(path):
+            counter = self._counter(key)
+            counter.tokens, counter.cost, counter.calls, counter.minutes = tokens, cost, calls, minutes
+
+
+@contextlib.contextmanager
+def _file_lock(path: str):
+    """Exclusive cross-process lock on `path`; imported lazily so budget imports everywhere"""
+    with open(path, "a+") as lock_file:
+        try:
+            import fcntl
+        except ImportError:
+            fcntl = None
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)  # released when the file closes
+            yield
+            return
+        try:
+            import msvcrt
+        except ImportError:
+            yield  # no file locking on this platform
+            return
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def ledger_from_env(config: str = None, path: str = None):
+    """BudgetLedger from BUDGET_CONFIG and BUDGET_LEDGER (arguments win); None when no config is set"""
+    config = config or os.getenv("BUDGET_CONFIG")
+    if not config:
+        return None
+    return BudgetLedger.from_config(config, path=path or os.getenv("BUDGET_LEDGER"))
+
+
+def parse_labels(text: str) -> dict:
+    """'tenant=acme,campaign=spring' -> {"tenant": "acme", "campaign": "spring"}"""
+    labels = {}
+    for pair in (text or "").split(","):
+        if pair.strip():
+            dimension, _, value = pair.partition("=")
+            if dimension.strip() not in DIMENSIONS or not value.strip():
+                raise ValueError(f"Bad budget label {pair!r}; expected dimension=value with one of {DIMENSIONS}")
+            labels[dimension.strip()] = value.strip()
+    return labels
+
+
+def add_budget_arguments(parser):
+    """--budget-config/--budget-ledger/--budget-labels, shared by the CLIs"""
+    parser.add_argument("--budget-config", help="Budget limits JSON (default: $BUDGET_CONFIG)")
+    parser.add_argument("--budget-ledger", help="Ledger file spend is saved to (default: $BUDGET_LEDGER)")
+    parser.add_argument("--budget-labels",
+                        help="Labels calls are charged to, e.g. tenant=acme,campaign=spring (default: $BUDGET_LABELS)")
+
+
+def budget_from_args(args) -> tuple:
+    """(ledger or None, labels) from add_budget_arguments() options"""
+    ledger = ledger_from_env(args.budget_config, args.budget_ledger)
+    return ledger, parse_labels(args.budget_labels or os.getenv("BUDGET_LABELS"))
+
+
+def estimate_prompt_tokens(*texts: str) -> int:
+    """Rough token count (~4 characters per token) used for admission"""
+    return math.ceil(sum(len(text) for text in texts) / 4)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect a budget ledger")
+    sub = parser.add_subparsers(dest="command", required=True)
+    status = sub.add_parser("status", help="Spend, burn rate and time to exhaustion per limit")
+    status.add_argument("ledger")
+    status.add_argument("--config", required=True, help="Budget config JSON with the limits")
+    args = parser.parse_args(argv)
+
+    ledger = BudgetLedger.from_config(args.config, path=args.ledger)
+    for row in ledger.status():
+        hard = f"${row['hard']:.2f}" if row["hard"] is not None else "none"
+        eta = f", hard limit in {row['hours_to_hard_limit']}h" if row["hours_to_hard_limit"] is not None else ""
+        print(f"💰 {row['dimension']}={row['value']} ({row['period']}): ${row['spent']:.2f} of {hard}, "
+              f"burning ${row['burn_per_hour']:.2f}/h{eta}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
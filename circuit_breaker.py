@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Circuit Breaker - fail fast while an upstream model is unhealthy
+
+One breaker per model name (see get_breaker()). A breaker watches the
+calls of the last `window` seconds and opens when, after `min_calls`
+calls, the failure rate or the slow-call rate crosses its threshold.
+While open every call fails immediately with CircuitOpenError; after
+`open_seconds` it half-opens and lets `half_open_calls` probe calls
+through. All probes succeeding closes it again, any failure re-opens it.
+"""
+
+import threading
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose breaker is open"""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"Circuit for {name} is open; retry in {retry_in:.0f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+def counts_as_failure(error: Exception) -> bool:
+    """Client errors (bad request, auth...) say nothing about upstream health"""
+    status = getattr(error, "status_code", None)
+    return status is None or status >= 500 or status in (408, 409, 429)
+
+
+class CircuitBreaker:
+    """Rolling-window error-rate / latency breaker"""
+
+    def __init__(
+        self,
+        name: str,
+        window: float = 60.0,
+        min_calls: int = 10,
+        failure_threshold: float = 0.5,
+        slow_call_seconds: float = 20.0,
+        slow_call_threshold: float = 0.8,
+        open_seconds: float = 30.0,
+        half_open_calls: int = 3
+    ):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_threshold = slow_call_threshold
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+
+        self._calls = deque()  # (finished_at, failed, slow)
+        self._failures = 0
+        self._slow = 0
+        self._probes_started = 0
+        self._probes_passed = 0
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float):
+        calls = self._calls
+        while calls and now - calls[0][0] > self.window:
+            _, failed, slow = calls.popleft()
+            self._failures -= failed
+            self._slow -= slow
+
+    def _open(self, now: float):
+        self.state = OPEN
+        self.opened_at = now
+        self.times_opened += 1
+        self._calls.clear()
+        self._failures = self._slow = 0
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go upstream now"""
+        now = time.monotonic()
+        with self._lock:
+            if self.state == OPEN:
+                if now - self.opened_at < self.open_seconds:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, self.open_seconds - (now - self.opened_at))
+                self.state = HALF_OPEN
+                self._probes_started = self._probes_passed = 0
+
+            if self.state == HALF_OPEN:
+                if self._probes_started >= self.half_open_calls:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, 0.0)
+                self._probes_started += 1
+
+    def record(self, latency: float, failed: bool):
+        """Report the outcome of a call that was let through"""
+        now = time.monotonic()
+        slow = latency >= self.slow_call_seconds
+        with self._lock:
+            if self.state == HALF_OPEN:
+                if failed or slow:
+                    self._open(now)
+                    return
+                self._probes_passed += 1
+                if self._probes_passed >= self.half_open_calls:
+                    self.state = CLOSED
+                return
+            if self.state == OPEN:
+                return  # a call that started before the breaker opened
+
+            self._expire(now)
+            self._calls.append((now, failed, slow))
+            self._failures += failed
+            self._slow += slow
+            total = len(self._calls)
+            if total >= self.min_calls and (
+                self._failures / total >= self.failure_threshold
+                or self._slow / total >= self.slow_call_threshold
+            ):
+                self._open(now)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._expire(time.monotonic())
+            total = len(self._calls)
+            return {
+                "state": self.state,
+                "calls_in_window": total,
+                "failure_rate": round(self._failures / total, 3) if total else None,
+                "slow_rate": round(self._slow / total, 3) if total else None,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+            }
+
+
+# Registry
+_breakers = {}
+_registry_lock = threading.Lock()
+_defaults = {}
+
+
+def configure_breakers(**settings):
+    """Set CircuitBreaker keyword defaults for breakers created from now on"""
+    with _registry_lock:
+        _defaults.update(settings)
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """The shared breaker for a model/backend name"""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _registry_lock:
+            breaker = _breakers.get(name)
+            if breaker is None:
+                breaker = _breakers[name] = CircuitBreaker(name, **_defaults)
+    return breaker
+
+
+def breaker_stats() -> dict:
+    return {name: breaker.stats() for name, breaker in list(_breakers.items())}
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Concurrency - adaptive limit on in-flight upstream calls
+
+One limiter per model name (see get_limiter()), shared by every thread in
+the process: batch workers, job queue workers and web requests. Callers
+acquire a slot before an upstream call and release it with the outcome.
+acquire() blocks while the limit is reached.
+
+The limit follows AIMD on latency and error signals:
+- success with normal latency while the limit is in use: +1 per `limit`
+  completions, i.e. about +1 per round trip
+- latency above `tolerance` x baseline: x `backoff`
+- overload (429, 503, 504, 408 or a timeout): x `overload_backoff`
+
+Calls are grouped into size classes by completion tokens (max_tokens
+when the count isn't known), in powers of two, and each class keeps its
+own latency baseline: the minimum over the last two `baseline_window`
+periods, so it follows a provider that gets slower for good. The signal
+is the smoothed ratio of each call's latency to its class baseline, so a
+change in the mix of short and long calls doesn't read as congestion,
+whatever the fixed per-call cost. Decreases happen at most once per
+smoothed round trip, so the calls of one slow burst don't each shrink it.
+"""
+
+import threading
+import time
+from collections import deque
+
+
+class ConcurrencyLimitExceeded(Exception):
+    """Raised when no slot frees up within the acquire timeout"""
+
+    def __init__(self, name: str, limit: int, waited: float):
+        super().__init__(f"No upstream slot for {name} after {waited:g}s (limit {limit})")
+        self.name = name
+        self.limit = limit
+        self.waited = waited
+
+
+def is_overload(error: Exception) -> bool:
+    """Errors that mean "send less": rate limits, unavailable, gateway timeouts, timeouts"""
+    status = getattr(error, "status_code", None)
+    if status in (408, 429, 503, 504):
+        return True
+    return status is None and "timeout" in type(error).__name__.lower()
+
+
+def size_class(tokens: int = None) -> int:
+    """Power-of-two bucket of a call's token count (0 when unknown): 1, 2-3, 4-7, ..."""
+    return int(tokens).bit_length() if tokens else 0
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit driven by latency and overload signals"""
+
+    def __init__(
+        self,
+        name: str,
+        initial: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 256,
+        tolerance: float = 2.0,
+        backoff: float = 0.9,
+        overload_backoff: float = 0.5,
+        smoothing: float = 0.2,
+        baseline_window: float = 300.0,
+        acquire_timeout: float = 120.0,
+        clock=time.monotonic
+    ):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.overload_backoff = overload_backoff
+        self.smoothing = smoothing
+        self.baseline_window = baseline_window
+        self.acquire_timeout = acquire_timeout
+        self._clock = clock  # injectable so tests can simulate latencies
+
+        self.limit = float(initial)
+        self.in_flight = 0
+        self.waiting = 0
+        self.peak_in_flight = 0
+        self.completed = 0
+        self.overloads = 0
+        self.timeouts = 0
+        self.increases = 0
+        self.decreases = 0
+        self.decisions = deque(maxlen=50)  # (time, old limit, new limit, reason)
+
+        self._smoothed = None       # EWMA of latency / size class baseline
+        self._round_trip = None     # EWMA of whole-call latency
+        self._window_min = {}       # size class -> min latency in the current baseline window
+        self._previous_min = {}     # size class -> min latency in the previous one
+        self._window_started = clock()
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def baseline(self, size: int = 0):
+        """Baseline latency of a size class, or None before its first call"""
+        mins = [m for m in (self._window_min.get(size), self._previous_min.get(size)) if m is not None]
+        return min(mins) if mins else None
+
+    def acquire(self, timeout: float = None):
+        """Wait for a slot; raises ConcurrencyLimitExceeded after `timeout` seconds"""
+        timeout = self.acquire_timeout if timeout is None else timeout
+        start = self._clock()
+        with self._cond:
+            if self.in_flight >= int(self.limit):
+                self.waiting += 1
+                try:
+                    while self.in_flight >= int(self.limit):
+                        remaining = timeout - (self._clock() - start)
+                        if remaining <= 0:
+                            self.timeouts += 1
+                            raise ConcurrencyLimitExceeded(self.name, int(self.limit), timeout)
+                        self._cond.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def release(self, latency: float, tokens: int = None, overloaded: bool = False, max_tokens: int = None):
+        """Free the slot and adjust the limit from the call's outcome"""
+        now = self._clock()
+        with self._cond:
+            if self._round_trip is None:
+                self._round_trip = latency
+            else:
+                self._round_trip += self.smoothing * (latency - self._round_trip)
+            busy = self.in_flight >= int(self.limit) or self.waiting > 0
+            self.in_flight -= 1
+            self.completed += 1
+
+            if overloaded:
+                self.overloads += 1
+                self._decrease(now, self.overload_backoff, "overload")
+            else:
+                self._observe(now, size_class(tokens or max_tokens), latency)
+                if self._smoothed > self.tolerance:
+                    self._decrease(now, self.backoff, "latency")
+                elif busy:
+                    self._set(min(self.max_limit, self.limit + 1 / self.limit), "increase")
+            self._cond.notify_all()
+
+    def cancel(self):
+        """Free a slot whose call was never made"""
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify()
+
+    def _observe(self, now: float, size: int, latency: float):
+        if now - self._window_started > self.baseline_window:
+            self._previous_min, self._window_min = self._window_min, {}
+            self._window_started = now
+        if size not in self._window_min or latency < self._window_min[size]:
+            self._window_min[size] = latency
+        sample = latency / max(self.baseline(size), 1e-9)
+        if self._smoothed is None:
+            self._smoothed = sample
+        else:
+            self._smoothed += self.smoothing * (sample - self._smoothed)
+
+    def _decrease(self, now: float, factor: float, reason: str):
+        # One decrease per round trip: the calls already in flight report the same congestion
+        if now - self._last_decrease < min(self._round_trip, 30.0):
+            return
+        self._last_decrease = now
+        self._set(max(self.min_limit, self.limit * factor), reason)
+
+    def _set(self, limit: float, reason: str):
+        old = int(self.limit)
+        self.limit = limit
+        if int(limit) != old:
+            if int(limit) > old:
+                self.increases += 1
+            else:
+                self.decreases += 1
+            self.decisions.append((round(time.time(), 3), old, int(limit), reason))
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                "peak_in_flight": self.peak_in_flight,
+                "completed": self.completed,
+                "overloads": self.overloads,
+                "acquire_timeouts": self.timeouts,
+                "increases": self.increases,
+                "decreases": self.decreases,
+                "latency_ratio": round(self._smoothed, 3) if self._smoothed is not None else None,
+                "baseline_latency": {
+                    (f"{1 << (size - 1)}-{(1 << size) - 1} tokens" if size else "unknown"): round(self.baseline(size), 4)
+                    for size in sorted(set(self._window_min) | set(self._previous_min))
+                },
+                "recent_decisions": list(self.decisions)[-10:],
+            }
+
+
+# Registry
+_limiters = {}
+_registry_lock = threading.Lock()
+_defaults = {}
+
+
+def configure_limiters(**settings):
+    """Set AdaptiveLimiter keyword defaults for limiters created from now on"""
+    with _registry_lock:
+        _defaults.update(settings)
+
+
+def get_limiter(name: str) -> AdaptiveLimiter:
+    """The shared limiter for a model/backend name"""
+    limiter = _limiters.get(name)
+    if limiter is None:
+        with _registry_lock:
+            limiter = _limiters.get(name)
+            if limiter is None:
+                limiter = _limiters[name] = AdaptiveLimiter(name, **_defaults)
+    return limiter
+
+
+def limiter_stats() -> dict:
+    return {name: limiter.stats() for name, limiter in list(_limiters.items())}
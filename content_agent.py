@@ -1,14 +1,61 @@
 # simple_content_agent.py - MVP: Prompt → Text
 import openai
 import os
+import sys
+import time
 from dotenv import load_dotenv
 import json
+from upstream import create_chat_completion
+from budget import ledger_from_env, parse_labels
+from circuit_breaker import CircuitOpenError, breaker_stats
+from concurrency import ConcurrencyLimitExceeded, limiter_stats
+from content_pool import ContentPoolService, pool_key
+from degraded import DegradedFallback, is_degraded
+from generation_specs import (
+    ContentStrategy, DegradedResultError, Optimization, Persona, RedditContentSpec, SpecRunner, is_error_result
+)
+from http_cache import HttpCache, request_fingerprint
+from response_cache import ResponseCache
+from result_store import result_store_from_env
+from tracing import configure_from_argv, span, traced, write as write_traces
 
 load_dotenv()
 
 class SimpleContentAgent:
-    def __init__(self):
-        self.client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+    def __init__(
+        self,
+        profile_store=None,
+        client=None,
+        result_store=None,
+        fallback=None,
+        budget=None,
+        budget_labels=None,
+        semantic_cache=None,
+        acquire_timeout=None
+    ):
+        # OpenAI client is created on first use, so prompts can be rendered without an API key
+        self._client = client
+        self.model = "gpt-4"  # or "gpt-3.5-turbo" for cheaper option
+        
+        # Optional ResultStore that records every generation
+        self.result_store = result_store
+        
+        # Optional DegradedFallback serving answers while the model's circuit is open
+        self.fallback = fallback
+        
+        # Optional BudgetLedger; calls are admitted (and may be downgraded) before they are made
+        self.budget = budget
+        self.budget_labels = budget_labels or {}  # e.g. {"tenant": "acme", "campaign": "spring"}
+        
+        # Optional SemanticCache reusing reddit_content for near-identical topics
+        self.semantic_cache = semantic_cache
+        
+        # Optional wait for an upstream slot (seconds); when set, ConcurrencyLimitExceeded
+        # reaches the caller instead of becoming an error string, so the web API can answer 503
+        self.acquire_timeout = acquire_timeout
+        
+        # Optional SubredditProfileStore with rolling-window analytics
+        self.profile_store = profile_store
         
         # Agent personality and expertise
         self.system_prompt = """
@@ -60,74 +107,128 @@ class SimpleContentAgent:
         - Engagement hooks
         """
     
+    @property
+    def client(self):
+        if self._client is None:
+            with span("client_setup"):
+                self._client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        return self._client
+    
+    @traced("SimpleContentAgent.generate_content")
     def generate_content(self, user_prompt: str) -> str:
         """
         Main function: Takes a prompt, returns generated content
         """
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4",  # or "gpt-3.5-turbo" for cheaper option
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
+            return self._complete(
+                self.system_prompt,
+                user_prompt,
                 max_tokens=1000,
-                temperature=0.7  # Balance creativity with consistency
+                temperature=0.7,  # Balance creativity with consistency
+                spec={"kind": "content", "prompt": user_prompt}
             )
             
-            content = response.choices[0].message.content
-            return content.strip()
-            
         except Exception as e:
+            if isinstance(e, ConcurrencyLimitExceeded) and self.acquire_timeout is not None:
+                raise
             return f"Error generating content: {str(e)}"
     
+    @traced("SimpleContentAgent.generate_reddit_content")
     def generate_reddit_content(
         self,
         topic: str,
         subreddit: str,
         post_type: str = "first_post",
-        persona: dict = None,
-        content_strategy: dict = None,
-        optimization: dict = None
+        persona=None,
+        content_strategy=None,
+        optimization=None
     ) -> str:
         """
         Generate optimized Reddit content based on virality factors
+
+        persona, content_strategy and optimization may be the typed classes
+        from generation_specs or the equivalent dicts.
         """
         try:
+            # Validate and canonicalize once
+            with span("validate_spec"):
+                spec = RedditContentSpec(topic, subreddit, post_type, persona, content_strategy, optimization)
+            
+            if self.semantic_cache:
+                cached = self._semantic_lookup(spec)
+                if cached is not None:
+                    return cached
+            
             # Build context-aware prompt
-            enhanced_prompt = self._build_reddit_prompt(
-                topic=topic,
-                subreddit=subreddit,
-                post_type=post_type,
-                persona=persona,
-                content_strategy=content_strategy,
-                optimization=optimization
-            )
+            with span("build_prompt"):
+                enhanced_prompt = self._build_reddit_prompt(**spec.arguments())
             
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": self.reddit_system_prompt},
-                    {"role": "user", "content": enhanced_prompt}
-                ],
+            content = self._complete(
+                self.reddit_system_prompt,
+                enhanced_prompt,
                 max_tokens=1500,
-                temperature=0.8  # Slightly higher for creativity
+                temperature=0.8,  # Slightly higher for creativity
+                spec=spec.to_dict()
             )
-            
-            content = response.choices[0].message.content
-            return content.strip()
+            if self.semantic_cache and not is_degraded(content):
+                self.semantic_cache.put(spec, content)
+            return content
             
         except Exception as e:
+            if isinstance(e, ConcurrencyLimitExceeded) and self.acquire_timeout is not None:
+                raise
             return f"Error generating Reddit content: {str(e)}"
     
+    def _semantic_lookup(self, spec: RedditContentSpec):
+        """Stored content for a near-identical topic; the hit is recorded as exact or semantic"""
+        start = time.perf_counter()
+        with span("semantic_cache.lookup") as lookup:
+            match = self.semantic_cache.get(spec)
+            lookup.set(hit=match is not None)
+        if match is None:
+            return None
+        text, similarity, label = match
+        if self.result_store:
+            self.result_store.record(
+                spec=spec.to_dict(), latency=time.perf_counter() - start, output=text, cache=label
+            )
+        return text
+    
+    def _complete(self, system_prompt: str, prompt: str, max_tokens: int, temperature: float, spec: dict) -> str:
+        """Single upstream call shared by all generation methods"""
+        try:
+            completion = create_chat_completion(
+                self.client,
+                self.model,
+                system_prompt,
+                prompt,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                spec=spec,
+                result_store=self.result_store,
+                budget=self.budget,
+                labels=self.budget_labels,
+                acquire_timeout=self.acquire_timeout
+            )
+        except CircuitOpenError:
+            with span("degraded_fallback"):
+                degraded = self.fallback.get(spec) if self.fallback else None
+            if degraded is None:
+                raise
+            return degraded
+        
+        if self.fallback:
+            self.fallback.remember(spec, completion.text)
+        return completion.text
+    
     def _build_reddit_prompt(
         self,
         topic: str,
         subreddit: str,
         post_type: str,
-        persona: dict = None,
-        content_strategy: dict = None,
-        optimization: dict = None
+        persona=None,
+        content_strategy=None,
+        optimization=None
     ) -> str:
         """
         Build a comprehensive Reddit prompt based on all parameters
@@ -158,68 +259,67 @@ class SimpleContentAgent:
         
         return "\n\n".join(prompt_parts)
     
-    def _format_persona(self, persona: dict) -> str:
+    def _format_persona(self, persona) -> str:
         """Format persona information for prompt"""
+        persona = Persona.coerce(persona)
         parts = []
         
-        if persona.get('type'):
-            parts.append(f"Type: {persona['type']}")
+        if persona.type:
+            parts.append(f"Type: {persona.type}")
         
-        if persona.get('credentials'):
-            parts.append(f"Credentials: {persona['credentials']}")
+        if persona.credentials:
+            parts.append(f"Credentials: {persona.credentials}")
         
-        if persona.get('tone'):
-            parts.append(f"Tone: {persona['tone']}")
+        if persona.tone:
+            parts.append(f"Tone: {persona.tone}")
         
-        if persona.get('expertise_area'):
-            parts.append(f"Expertise: {persona['expertise_area']}")
+        if persona.expertise_area:
+            parts.append(f"Expertise: {persona.expertise_area}")
         
         return "; ".join(parts)
     
-    def _format_content_strategy(self, strategy: dict) -> str:
+    def _format_content_strategy(self, strategy) -> str:
         """Format content strategy for prompt"""
+        strategy = ContentStrategy.coerce(strategy)
         parts = []
         
-        if strategy.get('content_type'):
-            parts.append(f"Content Type: {strategy['content_type']}")
+        if strategy.content_type:
+            parts.append(f"Content Type: {strategy.content_type}")
         
-        if strategy.get('viral_hook'):
-            parts.append(f"Viral Hook: {strategy['viral_hook']}")
+        if strategy.viral_hook:
+            parts.append(f"Viral Hook: {strategy.viral_hook}")
         
-        if strategy.get('emotional_trigger'):
-            parts.append(f"Emotional Trigger: {strategy['emotional_trigger']}")
+        if strategy.emotional_trigger:
+            parts.append(f"Emotional Trigger: {strategy.emotional_trigger}")
         
-        if strategy.get('story_arc'):
-            parts.append(f"Story Arc: {strategy['story_arc']}")
+        if strategy.story_arc:
+            parts.append(f"Story Arc: {strategy.story_arc}")
         
-        if strategy.get('value_type'):
-            parts.append(f"Value Type: {strategy['value_type']}")
+        if strategy.value_type:
+            parts.append(f"Value Type: {strategy.value_type}")
         
         return "; ".join(parts)
     
-    def _format_optimization(self, optimization: dict) -> str:
+    def _format_optimization(self, optimization) -> str:
         """Format optimization factors for prompt"""
+        optimization = Optimization.coerce(optimization)
         parts = []
         
-        if optimization.get('title_strategy'):
-            title = optimization['title_strategy']
-            title_parts = []
-            if title.get('hook_type'):
-                title_parts.append(f"Hook: {title['hook_type']}")
-            if title.get('include_credibility'):
-                title_parts.append("Include credibility")
-            if title_parts:
-                parts.append(f"Title: {'; '.join(title_parts)}")
-        
-        if optimization.get('content_structure'):
-            structure = optimization['content_structure']
-            structure_parts = []
-            if structure.get('include_tl_dr'):
-                structure_parts.append("Include TL;DR")
-            if structure.get('use_bullet_points'):
-                structure_parts.append("Use bullet points")
-            if structure_parts:
-                parts.append(f"Structure: {'; '.join(structure_parts)}")
+        title_parts = []
+        if optimization.hook_type:
+            title_parts.append(f"Hook: {optimization.hook_type}")
+        if optimization.include_credibility:
+            title_parts.append("Include credibility")
+        if title_parts:
+            parts.append(f"Title: {'; '.join(title_parts)}")
+        
+        structure_parts = []
+        if optimization.include_tl_dr:
+            structure_parts.append("Include TL;DR")
+        if optimization.use_bullet_points:
+            structure_parts.append("Use bullet points")
+        if structure_parts:
+            parts.append(f"Structure: {'; '.join(structure_parts)}")
         
         return "; ".join(parts)
     
@@ -240,8 +340,11 @@ class SimpleContentAgent:
             instructions.append("Be helpful and add value to the discussion")
             instructions.append("Keep it concise but informative")
         
-        # Subreddit specific (basic examples)
-        if "finance" in subreddit.lower():
+        # Subreddit specific: live profile data when available, basic examples otherwise
+        profile = self.profile_store.describe(subreddit) if self.profile_store else None
+        if profile:
+            instructions.append(f"Match this subreddit profile: {profile}")
+        elif "finance" in subreddit.lower():
             instructions.append("Include specific numbers and data when relevant")
             instructions.append("Focus on actionable financial advice")
         elif "fitness" in subreddit.lower():
@@ -254,7 +357,12 @@ class SimpleContentAgent:
         """
         Enhanced version with additional context
         """
-        # Add context to the prompt if provided
+        with span("build_prompt"):
+            prompt = self._build_context_prompt(user_prompt, context)
+        return self.generate_content(prompt)
+    
+    def _build_context_prompt(self, user_prompt: str, context: dict = None) -> str:
+        """Add context to the prompt if provided"""
         enhanced_prompt = user_prompt
         
         if context:
@@ -271,11 +379,11 @@ class SimpleContentAgent:
             if context_info:
                 enhanced_prompt = f"{user_prompt}\n\nAdditional context:\n" + "\n".join(context_info)
         
-        return self.generate_content(enhanced_prompt)
+        return enhanced_prompt
 
 # Simple CLI interface for testing
 def main():
-    agent = SimpleContentAgent()
+    agent = SimpleContentAgent(result_store=result_store_from_env())
     
     print("🤖 Content Agent MVP Ready!")
     print("Enter your content requests (type 'quit' to exit)")
@@ -312,9 +420,11 @@ def main():
 
 # API-style interface (for web integration)
 class ContentAgentAPI:
-    def __init__(self):
-        self.agent = SimpleContentAgent()
+    def __init__(self, agent=None):
+        # Remember results in memory so repeated prompts can still be answered while the model is down
+        self.agent = agent or SimpleContentAgent(fallback=DegradedFallback(cache=ResponseCache()))
     
+    @traced("ContentAgentAPI.create_content")
     def create_content(self, prompt: str, context: dict = None) -> dict:
         """
         API endpoint style - returns structured response
@@ -325,13 +435,29 @@ class ContentAgentAPI:
             else:
                 content = self.agent.generate_content(prompt)
             
+            if is_error_result(content):
+                return {
+                    "success": False,
+                    "error": content,
+                    "prompt": prompt
+                }
+            
             return {
                 "success": True,
                 "content": content,
+                "degraded": is_degraded(content),
+                "degraded_source": content.source if is_degraded(content) else None,
                 "prompt": prompt,
                 "context": context or {}
             }
             
+        except ConcurrencyLimitExceeded as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "overloaded": True,
+                "prompt": prompt
+            }
         except Exception as e:
             return {
                 "success": False,
@@ -345,25 +471,123 @@ try:
     
     app = Flask(__name__)
     api = ContentAgentAPI()
+    # Set BUDGET_CONFIG (and BUDGET_LEDGER, BUDGET_LABELS) to admit every call against spend limits
+    budget = ledger_from_env()
+    if budget is not None:
+        api.agent.budget = budget
+        api.agent.budget_labels = parse_labels(os.getenv("BUDGET_LABELS"))
+    # Web requests wait at most WEB_ACQUIRE_TIMEOUT seconds for an upstream slot, then get a 503
+    api.agent.acquire_timeout = float(os.getenv("WEB_ACQUIRE_TIMEOUT") or 2.0)
+    # Set RESULTS_DIR to record every generation (see result_store.py)
+    results = result_store_from_env()
+    if results is not None:
+        api.agent.result_store = results
+    # Set HTTP_CACHE_PATH to share cached /generate responses between worker processes
+    http_cache = HttpCache(
+        ResponseCache(os.getenv("HTTP_CACHE_PATH"), ttl=int(os.getenv("HTTP_CACHE_TTL") or 3600)),
+        max_age=int(os.getenv("HTTP_CACHE_TTL") or 3600)
+    )
+    # Set CONTENT_POOLS to a pool config JSON (see ContentPoolService.from_config) to serve POST /pool
+    pool_service = None
+    if os.getenv("CONTENT_POOLS"):
+        pool_service = ContentPoolService.from_config(
+            os.environ["CONTENT_POOLS"], runner=SpecRunner(content_agent=api.agent)
+        )
+        if getattr(api.agent, "fallback", None) is not None:
+            api.agent.fallback.pools = pool_service  # pools also back the degraded fallback
+    
+    def start_background():
+        """Start per-process background threads; serve.py calls this in each worker after the fork"""
+        if pool_service is not None:
+            pool_service.start()
+    
+    def stop_background():
+        """Stop background threads, save the ledger, flush results and traces; serve.py calls this before a worker exits"""
+        if pool_service is not None:
+            pool_service.stop()
+        if budget is not None:
+            budget.close()
+        if results is not None:
+            results.close()
+        write_traces()  # per-worker files (pid suffix) when AGENT_TRACE/AGENT_PROFILE are set
     
     @app.route('/generate', methods=['POST'])
+    @traced("POST /generate")
     def generate_content_api():
-        data = request.json
+        with span("flask.parse_json"):
+            data = request.json
         prompt = data.get('prompt', '')
         context = data.get('context', {})
         
         if not prompt:
             return jsonify({"success": False, "error": "Prompt required"}), 400
         
-        result = api.create_content(prompt, context)
-        return jsonify(result)
+        fingerprint = request_fingerprint(prompt, context)
+        body = None if http_cache.bypass(request.headers) else http_cache.get(fingerprint)
+        if body is not None:
+            status, headers, payload = http_cache.respond(body, 200, True, request.headers, hit=True)
+        else:
+            result = api.create_content(prompt, context)
+            with span("flask.jsonify"):
+                body = http_cache.store(fingerprint, result)
+                status, headers, payload = http_cache.respond(
+                    body, 200 if result["success"] else 503 if result.get("overloaded") else 502,
+                    http_cache.cacheable(result), request.headers
+                )
+                if result.get("overloaded"):
+                    headers["Retry-After"] = "1"
+        return app.response_class(payload, status=status, headers=headers)
+    
+    @app.route('/pool', methods=['POST'])
+    @traced("POST /pool")
+    def pool_content_api():
+        """A ready generation for (subreddit, response_type, persona), generated live on a pool miss"""
+        if pool_service is None:
+            return jsonify({"success": False, "error": "No content pools configured"}), 404
+        data = request.json or {}
+        key = pool_key(data.get('subreddit') or '', data.get('response_type') or '', data.get('persona'))
+        spec = pool_service.spec_for(key)
+        if spec is None:
+            return jsonify({"success": False, "error": f"No pool for {'/'.join(key)}"}), 404
+        
+        content, source = pool_service.get(key), "pool"
+        if content is None:
+            try:
+                content, source = pool_service.runner.run(spec), "live"
+            except DegradedResultError as e:
+                content, source = e.result, e.result.source
+            except ConcurrencyLimitExceeded as e:
+                return jsonify({"success": False, "error": str(e)}), 503, {"Retry-After": "1"}
+            except Exception as e:
+                return jsonify({"success": False, "error": str(e)}), 502
+        # Pool items are handed out once, so responses must not be cached or shared
+        return jsonify({
+            "success": True, "content": content, "source": source, "degraded": is_degraded(content)
+        }), 200, {"Cache-Control": "no-store"}
     
     @app.route('/health', methods=['GET'])
+    @traced("GET /health")
     def health_check():
-        return jsonify({"status": "healthy", "agent": "content-agent-mvp"})
+        health = {
+            "status": "healthy",
+            "agent": "content-agent-mvp",
+            "circuits": breaker_stats(),
+            "concurrency": limiter_stats(),
+            "http_cache": http_cache.stats()
+        }
+        semantic_cache = getattr(api.agent, "semantic_cache", None)
+        if semantic_cache:
+            health["semantic_cache"] = semantic_cache.stats()
+        if pool_service is not None:
+            health["pools"] = pool_service.stats()
+        if budget is not None:
+            health["budget"] = budget.status()
+        return jsonify(health)
     
     def run_web_api():
         print("🌐 Starting web API on http://localhost:5000")
+        if os.environ.get("WERKZEUG_RUN_MAIN") == "true":  # the reloader's serving process, not its watcher
+            start_background()
         app.run(debug=True, port=5000)
 
 except ImportError:
@@ -562,6 +786,14 @@ def reddit_example_usage():
     print("\n" + "-" * 30)
 
 if __name__ == "__main__":
+    # Opt-in profiling: --trace trace.json / --profile profile.folded (or AGENT_TRACE / AGENT_PROFILE)
+    sys.argv[1:] = configure_from_argv(sys.argv[1:])
+    
+    # Non-interactive batch mode: python content_agent.py batch specs.jsonl [options]
+    if sys.argv[1:2] == ["batch"]:
+        from batch_cli import main as batch_main
+        sys.exit(batch_main(sys.argv[2:], default_kind="reddit_content"))
+    
     # Choose your interface:
     
     # 1. Original command line interface
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Content Pools - precomputed generations served without waiting on the model
+
+A background service keeps one pool of ready-to-use generations per
+(subreddit, response_type, persona) key topped up using idle capacity.
+Requests pop the oldest fresh item in O(1); a popped item is gone from the
+pool, so it can never be handed out twice. Each pool's target size follows
+its observed demand rate, and hit rate, staleness and refill lag are
+exposed through stats().
+
+The web API serves pools at POST /pool when CONTENT_POOLS points at a
+config file (see from_config()). Under serve.py each worker starts its
+own refill threads after the fork.
+"""
+
+import json
+import math
+import threading
+import time
+from collections import deque
+from generation_specs import SpecRunner, validate_spec
+
+
+def pool_key(subreddit: str, response_type: str, persona: str = None) -> tuple:
+    """Canonical pool key"""
+    return (subreddit.lower(), response_type, persona or "default")
+
+
+def pool_key_for_spec(spec: dict) -> tuple:
+    """Pool key a generation spec refills (or is served from)"""
+    persona = spec.get("persona")
+    if isinstance(persona, dict):
+        persona = persona.get("type")
+    response_type = spec.get("response_type") or spec.get("post_type") or spec.get("kind")
+    return pool_key(spec.get("subreddit") or "", response_type, persona)
+
+
+class ContentPool:
+    """Ready-to-serve items and counters for one pool key"""
+
+    def __init__(self, key: tuple, spec: dict, min_size: int, max_size: int):
+        self.key = key
+        self.spec = spec
+        self.min_size = min_size
+        self.max_size = max_size
+        self.items = deque()  # (created_at, text), oldest on the left
+        self.in_flight = 0
+
+        # Demand: exponentially decaying request rate (requests/second)
+        self.demand_rate = 0.0
+        self.last_request = None
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.generated = 0
+        self.failures = 0
+        self.staleness_total = 0.0
+        self.deficit_since = None
+        self.last_refill_lag = None
+        self.max_refill_lag = 0.0
+
+    def current_demand(self, now: float, tau: float) -> float:
+        if self.last_request is None:
+            return 0.0
+        return self.demand_rate * math.exp(-(now - self.last_request) / tau)
+
+    def record_request(self, now: float, tau: float):
+        self.demand_rate = self.current_demand(now, tau) + 1.0 / tau
+        self.last_request = now
+
+    def target_size(self, now: float, tau: float, refill_horizon: float) -> int:
+        wanted = math.ceil(self.current_demand(now, tau) * refill_horizon)
+        return min(self.max_size, max(self.min_size, wanted))
+
+
+class ContentPoolService:
+    """
+    Background refill service for a set of content pools
+
+    Args:
+        runner: SpecRunner used for refills (default: lazily created agents)
+        workers: Number of refill threads
+        max_age: Seconds before a pooled item is considered stale and dropped
+        refill_horizon: Seconds of expected demand each pool should hold
+        demand_window: Time constant (seconds) of the demand-rate estimate
+        should_refill: Optional callable; refills only run while it returns True
+            (e.g. an off-peak or spare-rate-limit check)
+    """
+
+    def __init__(
+        self,
+        runner: SpecRunner = None,
+        workers: int = 2,
+        max_age: float = 6 * 3600,
+        refill_horizon: float = 300,
+        demand_window: float = 60,
+        should_refill=None
+    ):
+        self.runner = runner or SpecRunner()
+        self.workers = workers
+        self.max_age = max_age
+        self.refill_horizon = refill_horizon
+        self.demand_window = demand_window
+        self.should_refill = should_refill or (lambda: True)
+
+        self._pools = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._threads = []
+        self._running = False
+
+    @classmethod
+    def from_config(cls, path: str, runner: SpecRunner = None) -> "ContentPoolService":
+        """
+        Service from a JSON config; pools are keyed by their spec (see pool_key_for_spec())
+
+            {"workers": 2, "max_age": 21600,
+             "pools": [{"spec": {"kind": "comment", "subreddit": "RoastMe", ...}, "min_size": 10}]}
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        settings = {name: config[name] for name in ("workers", "max_age", "refill_horizon", "demand_window")
+                    if name in config}
+        service = cls(runner=runner, **settings)
+        for entry in config.get("pools", []):
+            service.add_pool(
+                pool_key_for_spec(entry["spec"]), entry["spec"],
+                min_size=entry.get("min_size", 5), max_size=entry.get("max_size", 100)
+            )
+        return service
+
+    def spec_for(self, key: tuple):
+        """The refill spec of a registered pool, or None"""
+        with self._lock:
+            pool = self._pools.get(key)
+            return pool.spec if pool is not None else None
+
+    def add_pool(self, key: tuple, spec: dict, min_size: int = 5, max_size: int = 100):
+        """Register a pool; `spec` is the generation spec used to refill it"""
+        validate_spec(spec)
+        with self._lock:
+            self._pools[key] = ContentPool(key, spec, min_size, max_size)
+            self._wakeup.notify_all()
+
+    def get(self, key: tuple):
+        """Pop a ready item from the pool in O(1); returns None on a miss"""
+        now = time.time()
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                return None
+            pool.record_request(now, self.demand_window)
+
+            items = pool.items
+            while items and now - items[0][0] > self.max_age:
+                items.popleft()
+                pool.expired += 1
+
+            if not items:
+                pool.misses += 1
+                self._wakeup.notify()
+                return None
+
+            created_at, text = items.popleft()
+            pool.hits += 1
+            pool.staleness_total += now - created_at
+            if len(items) < pool.target_size(now, self.demand_window, self.refill_horizon):
+                if pool.deficit_since is None:
+                    pool.deficit_since = now
+                self._wakeup.notify()
+            return text
+
+    # Refilling
+    def _neediest_pool(self, now: float):
+        """Pool with the largest unmet target relative to its size, or None"""
+        best, best_need = None, 0.0
+        for pool in self._pools.values():
+            target = pool.target_size(now, self.demand_window, self.refill_horizon)
+            have = len(pool.items) + pool.in_flight
+            if have < target:
+                if pool.deficit_since is None:
+                    pool.deficit_since = now
+                need = (target - have) / target
+                if need > best_need:
+                    best, best_need = pool, need
+        return best
+
+    def refill_once(self) -> bool:
+        """Generate one item for the neediest pool; returns False if nothing needed it"""
+        with self._lock:
+            pool = self._neediest_pool(time.time())
+            if pool is None:
+                return False
+            pool.in_flight += 1
+
+        try:
+            text = self.runner.run(pool.spec)
+        except Exception:
+            with self._lock:
+                pool.in_flight -= 1
+                pool.failures += 1
+            raise
+
+        now = time.time()
+        with self._lock:
+            pool.in_flight -= 1
+            pool.items.append((now, text))
+            pool.generated += 1
+            target = pool.target_size(now, self.demand_window, self.refill_horizon)
+            if pool.deficit_since is not None and len(pool.items) >= target:
+                pool.last_refill_lag = now - pool.deficit_since
+                pool.max_refill_lag = max(pool.max_refill_lag, pool.last_refill_lag)
+                pool.deficit_since = None
+        return True
+
+    def _worker(self):
+        backoff = 1.0
+        while self._running:
+            if not self.should_refill():
+                time.sleep(1.0)
+                continue
+            try:
+                refilled = self.refill_once()
+                backoff = 1.0
+            except Exception:
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 60.0)
+                continue
+            if not refilled:
+                with self._lock:
+                    self._wakeup.wait(timeout=5.0)
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"pool-refill-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        self._running = False
+        with self._lock:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    # Observability
+    def stats(self) -> dict:
+        """Per-pool metrics keyed by 'subreddit/response_type/persona'"""
+        now = time.time()
+        result = {}
+        with self._lock:
+            for key, pool in self._pools.items():
+                requests = pool.hits + pool.misses
+                oldest = now - pool.items[0][0] if pool.items else 0.0
+                result["/".join(key)] = {
+                    "size": len(pool.items),
+                    "target": pool.target_size(now, self.demand_window, self.refill_horizon),
+                    "in_flight": pool.in_flight,
+                    "hits": pool.hits,
+                    "misses": pool.misses,
+                    "hit_rate": round(pool.hits / requests, 3) if requests else None,
+                    "avg_staleness_seconds": round(pool.staleness_total / pool.hits, 1) if pool.hits else None,
+                    "oldest_item_seconds": round(oldest, 1),
+                    "expired": pool.expired,
+                    "generated": pool.generated,
+                    "failures": pool.failures,
+                    "demand_per_minute": round(pool.current_demand(now, self.demand_window) * 60, 2),
+                    "refill_lag_seconds": round(pool.last_refill_lag, 2) if pool.last_refill_lag is not None else None,
+                    "max_refill_lag_seconds": round(pool.max_refill_lag, 2),
+                    "deficit_seconds": round(now - pool.deficit_since, 2) if pool.deficit_since else 0.0,
+                }
+        return result
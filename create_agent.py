@@ -3,15 +3,70 @@
 Minimal Reddit Agent - Post & Comment Generation Only
 """
 
+import json
 import openai
 import os
+import sys
 from dotenv import load_dotenv
+from upstream import create_chat_completion
+from circuit_breaker import CircuitOpenError
+from degraded import is_degraded
+from tracing import configure_from_argv, span, traced
+from result_store import result_store_from_env
+from thread_replies import (
+    MAX_AVOID, RESPONSE_GUIDANCE, avoid_block_tokens, build_thread_prompt, parse_replies, parse_thread, plan_chunks,
+    reply_max_tokens, select_targets
+)
 
 load_dotenv()
 
+# Hard-coded few-shot posts used when no example index is configured
+DEFAULT_POST_EXAMPLES = [
+    "Phone has been on Do Not Disturb for 3 days and I just noticed. Either everyone hates me or I'm more antisocial than I thought. Probably both. Text me some insults.",
+    "Haven't left my apartment in 5 days. Either I'm becoming a hermit or society is avoiding me. Probably both. Make me regret posting this."
+]
+
+# Fallback analysis used when no subreddit profile store is configured
+DEFAULT_ROASTME_ANALYSIS = "Analysis of the last 24 hours of Reddit RoastMe data reveals that the most successful roasts are concise, creatively sarcastic, and lean heavily on dry, deadpan humor. Comments that anthropomorphize boredom or mediocrity, or use clever analogies, consistently receive the highest upvotes. Posts with self-deprecating or relatable titles and body text that invite brutal honesty tend to generate more comments. For maximum engagement, both posters and commenters should focus on relatability, originality, and a balance of wit and subtlety."
+
 class RedditAgent:
-    def __init__(self):
-        self.client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+    def __init__(
+        self,
+        profile_store=None,
+        example_index=None,
+        num_examples: int = 3,
+        dedup_index=None,
+        max_regenerations: int = 2,
+        client=None,
+        result_store=None,
+        fallback=None,
+        budget=None,
+        budget_labels=None
+    ):
+        # OpenAI client is created on first use, so prompts can be rendered without an API key
+        self._client = client
+        self.model = "gpt-4"
+        
+        # Optional ResultStore that records every generation
+        self.result_store = result_store
+        
+        # Optional DegradedFallback serving answers while the model's circuit is open
+        self.fallback = fallback
+        
+        # Optional BudgetLedger; calls are admitted (and may be downgraded) before they are made
+        self.budget = budget
+        self.budget_labels = budget_labels or {}  # e.g. {"tenant": "acme", "campaign": "spring"}
+        
+        # Optional SubredditProfileStore with rolling-window analytics
+        self.profile_store = profile_store
+        
+        # Optional ExampleIndex of high-scoring historical posts/comments for few-shot examples
+        self.example_index = example_index
+        self.num_examples = num_examples
+        
+        # Optional DuplicateIndex; near-duplicates of earlier outputs are regenerated
+        self.dedup_index = dedup_index
+        self.max_regenerations = max_regenerations
         
         # System prompt for Reddit posts
         self.post_system_prompt = """
@@ -28,10 +83,6 @@ class RedditAgent:
         - Well-structured content with clear value
         - Platform-appropriate formatting
         - Engaging conclusions that encourage comments
-
-        Create a post also based on the analysis:
-        Analysis of the last 24 hours of Reddit RoastMe data reveals that the most successful roasts are concise, creatively sarcastic, and lean heavily on dry, deadpan humor. Comments that anthropomorphize boredom or mediocrity, or use clever analogies, consistently receive the highest upvotes. Posts with self-deprecating or relatable titles and body text that invite brutal honesty tend to generate more comments. For maximum engagement, both posters and commenters should focus on relatability, originality, and a balance of wit and subtlety.
-
         """
         
         # NEW: Comment-specific system prompt
@@ -46,6 +97,14 @@ class RedditAgent:
 
     """
     
+    @property
+    def client(self):
+        if self._client is None:
+            with span("client_setup"):
+                self._client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        return self._client
+    
+    @traced("RedditAgent.generate_post")
     def generate_post(
         self,
         topic: str,
@@ -64,28 +123,23 @@ class RedditAgent:
         """
         try:
             # Build post prompt
-            prompt = self._build_post_prompt(topic, subreddit, post_type, max_words)
-            
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": self.post_system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=1500,
-                temperature=0.7
-            )
+            with span("build_prompt"):
+                prompt = self._build_post_prompt(topic, subreddit, post_type, max_words)
+                system_prompt = self._get_post_system_prompt(subreddit)
             
-            return response.choices[0].message.content.strip()
+            spec = {"kind": "post", "topic": topic, "subreddit": subreddit, "post_type": post_type, "max_words": max_words}
+            return self._generate(system_prompt, prompt, max_tokens=1500, spec=spec)
             
         except Exception as e:
             return f"Error generating post: {str(e)}"
     
+    @traced("RedditAgent.generate_comment")
     def generate_comment(
         self,
         original_post: str,
         response_type: str = "helpful",
-        max_words: int = 15
+        max_words: int = 15,
+        subreddit: str = "RoastMe"
     ) -> str:
         """
         Generate a comment responding to a Reddit post
@@ -94,29 +148,221 @@ class RedditAgent:
             original_post: The post you're commenting on
             response_type: "helpful", "supportive", "humorous", "insightful"
             max_words: Maximum number of words (default: 15)
+            subreddit: Subreddit the post is from, used to pick few-shot examples
         """
         try:
             # Build comment prompt
-            prompt = self._build_comment_prompt(original_post, response_type, max_words)
-            
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": self.comment_system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=200,  # Short for comments
-                temperature=0.7
-            )
+            with span("build_prompt"):
+                prompt = self._build_comment_prompt(original_post, response_type, max_words, subreddit)
             
-            return response.choices[0].message.content.strip()
+            spec = {
+                "kind": "comment",
+                "original_post": original_post,
+                "response_type": response_type,
+                "max_words": max_words,
+                "subreddit": subreddit
+            }
+            return self._generate(self.comment_system_prompt, prompt, max_tokens=200, spec=spec)  # Short for comments
             
         except Exception as e:
             return f"Error generating comment: {str(e)}"
     
+    @traced("RedditAgent.generate_thread_replies")
+    def generate_thread_replies(
+        self,
+        thread,
+        targets: list = None,
+        response_type: str = "humorous",
+        max_words: int = 15,
+        subreddit: str = None,
+        max_prompt_tokens: int = 3000,
+        max_replies_per_call: int = 20
+    ) -> dict:
+        """
+        Reply to many comments of one thread in as few upstream calls as possible
+        
+        Args:
+            thread: Reddit API JSON of a submission, a flat list of dump records,
+                or {"title", "selftext", "comments": [...]} (see thread_replies.py)
+            targets: Comment ids to answer (default: top-level comments, best first)
+            response_type: "helpful", "supportive", "humorous", "insightful"
+            max_words: Maximum words per reply
+            subreddit: Defaults to the post's subreddit
+            max_prompt_tokens: Prompt budget per call; larger threads are chunked
+            max_replies_per_call: Upper bound on comments answered per call
+        
+        Returns {comment id: reply}, in target order. Comments that got no usable
+        reply map to an error string. Raises ValueError if the thread can't be parsed.
+        """
+        with span("parse_thread"):
+            try:
+                post, comments = parse_thread(thread)
+            except (AttributeError, KeyError, IndexError, TypeError) as e:
+                raise ValueError(f"Unrecognized thread shape: {type(e).__name__}: {e}") from e
+            by_id = {comment.id: comment for comment in comments}
+            if targets is None:
+                selected = select_targets(comments)
+            else:
+                selected = [by_id[str(id)] for id in targets if str(id) in by_id and by_id[str(id)].body]
+            # Later prompts also list up to MAX_AVOID earlier replies; leave room for them
+            chunks = plan_chunks(selected, by_id, post, max_prompt_tokens, max_replies_per_call,
+                                 avoid_tokens=avoid_block_tokens(max_words))
+        
+        subreddit = subreddit or post.get("subreddit") or "RoastMe"
+        replies = {}
+        written = []  # earlier replies, listed in later prompts so their jokes aren't reused
+        for chunk in chunks:
+            pending = chunk
+            for _ in range(self.max_regenerations + 1):
+                try:
+                    answered = self._reply_to_chunk(post, pending, by_id, response_type, max_words, subreddit, written)
+                except Exception as e:
+                    for comment in pending:
+                        replies[comment.id] = f"Error generating comment: {str(e)}"
+                    break
+                
+                retry = []
+                for comment in pending:
+                    reply = answered.get(comment.id)
+                    if reply is None:
+                        retry.append(comment)
+                        continue
+                    if self.dedup_index is not None and not is_degraded(reply):
+                        with span("dedup_check"):
+                            is_duplicate, _, _ = self.dedup_index.check_and_insert(reply)
+                        if is_duplicate:
+                            written.append(reply)
+                            retry.append(comment)
+                            continue
+                    replies[comment.id] = reply
+                    written.append(reply)
+                pending = retry
+                if not pending:
+                    break
+            for comment in pending:
+                replies.setdefault(comment.id, "Error generating comment: no distinct reply returned")
+        
+        return {comment.id: replies[comment.id] for comment in selected}
+    
+    def _reply_to_chunk(self, post, chunk, by_id, response_type, max_words, subreddit, written) -> dict:
+        """One upstream call for a chunk of comments; {comment id: reply}"""
+        with span("build_prompt", comments=len(chunk)):
+            prompt = build_thread_prompt(post, chunk, by_id, response_type, max_words, subreddit, avoid=written[-MAX_AVOID:])
+        spec = {
+            "kind": "thread_replies",
+            "post_id": post.get("id"),
+            "comment_ids": [comment.id for comment in chunk],
+            "response_type": response_type,
+            "max_words": max_words,
+            "subreddit": subreddit
+        }
+        
+        def comment_spec(comment):
+            return {
+                "kind": "comment",
+                "original_post": comment.body,
+                "response_type": response_type,
+                "max_words": max_words,
+                "subreddit": subreddit
+            }
+        
+        try:
+            completion = create_chat_completion(
+                self.client,
+                self.model,
+                self.comment_system_prompt,
+                prompt,
+                max_tokens=reply_max_tokens(len(chunk), max_words),
+                temperature=0.7,
+                spec=spec,
+                result_store=self.result_store,
+                budget=self.budget,
+                labels=self.budget_labels
+            )
+        except CircuitOpenError:
+            if not self.fallback:
+                raise
+            with span("degraded_fallback"):
+                degraded = {comment.id: self.fallback.get(comment_spec(comment)) for comment in chunk}
+            return {id: reply for id, reply in degraded.items() if reply is not None}
+        
+        with span("parse_replies"):
+            numbered = parse_replies(completion.text, len(chunk))
+        answered = {chunk[number - 1].id: reply for number, reply in numbered.items()}
+        if self.fallback:
+            for comment in chunk:
+                if comment.id in answered:
+                    self.fallback.remember(comment_spec(comment), answered[comment.id])
+        return answered
+    
+    def _generate(self, system_prompt: str, prompt: str, max_tokens: int, spec: dict = None) -> str:
+        """Call the model, regenerating outputs that near-duplicate earlier ones"""
+        user_prompt = prompt
+        for _ in range(self.max_regenerations + 1):
+            try:
+                completion = create_chat_completion(
+                    self.client,
+                    self.model,
+                    system_prompt,
+                    user_prompt,
+                    max_tokens=max_tokens,
+                    temperature=0.7,
+                    spec=spec,
+                    result_store=self.result_store,
+                    budget=self.budget,
+                    labels=self.budget_labels
+                )
+            except CircuitOpenError:
+                with span("degraded_fallback"):
+                    degraded = self.fallback.get(spec) if self.fallback else None
+                if degraded is None:
+                    raise
+                return degraded
+            
+            content = completion.text
+            if self.fallback:
+                self.fallback.remember(spec, content)
+            if self.dedup_index is None:
+                return content
+            
+            with span("dedup_check"):
+                is_duplicate, _, _ = self.dedup_index.check_and_insert(content)
+            if not is_duplicate:
+                return content
+            user_prompt = f"{prompt}\n\nDo NOT reuse this line or anything close to it: \"{content}\""
+        
+        # Out of regenerations: return the last attempt rather than nothing
+        return content
+    
+    def _get_post_system_prompt(self, subreddit: str) -> str:
+        """Post system prompt plus the latest subreddit analysis"""
+        analysis = None
+        if self.profile_store:
+            analysis = self.profile_store.describe(subreddit) or self.profile_store.describe("RoastMe")
+        
+        return f"""{self.post_system_prompt}
+        Create a post also based on the analysis:
+        {analysis or DEFAULT_ROASTME_ANALYSIS}
+
+        """
+    
+    def _get_examples(self, subreddit: str, query: str, kind: str) -> list:
+        """Most similar high-scoring examples from the index, if one is configured"""
+        if not self.example_index:
+            return []
+        
+        for name in (subreddit, "RoastMe"):
+            results = self.example_index.search(name, query, kind=kind, k=self.num_examples)
+            if results:
+                return [" ".join(r["text"].split())[:300] for r in results]
+        return []
+    
     def _build_post_prompt(self, topic: str, subreddit: str, post_type: str, max_words: int) -> str:
         """Build prompt for post generation"""
         
+        examples = self._get_examples(subreddit, topic, "post") or DEFAULT_POST_EXAMPLES
+        examples_text = "\n        ".join(f'- "{example}"' for example in examples)
+        
         # Default r/RoastMe style prompt for all post generation
         prompt = f"""Create a r/RoastMe post about "{topic}".
 
@@ -136,27 +382,19 @@ class RedditAgent:
         - DO NOT give advice on roasting - you are asking to BE roasted
 
         Examples of the correct style:
-        - "Phone has been on Do Not Disturb for 3 days and I just noticed. Either everyone hates me or I'm more antisocial than I thought. Probably both. Text me some insults."
-        - "Haven't left my apartment in 5 days. Either I'm becoming a hermit or society is avoiding me. Probably both. Make me regret posting this."
+        {examples_text}
 
         Your r/RoastMe post (written as yourself asking to be roasted):"""
 
         return prompt
     
-    def _build_comment_prompt(self, original_post: str, response_type: str, max_words: int) -> str:
+    def _build_comment_prompt(self, original_post: str, response_type: str, max_words: int, subreddit: str = "RoastMe") -> str:
         """Build prompt for comment generation"""
-        response_guidance = {
-            "helpful": "Provide constructive, actionable advice",
-            "supportive": "Offer encouragement and emotional support", 
-            "humorous": "Use appropriate humor while being helpful",
-            "insightful": "Share valuable insights or perspectives"
-        }
-        
         prompt = f"""Respond to this Reddit post:
 
 "{original_post[:500]}..."
 
-Response Type: {response_guidance.get(response_type, 'Be helpful and engaging')}
+Response Type: {RESPONSE_GUIDANCE.get(response_type, 'Be helpful and engaging')}
 
 Requirements:
 - Keep response to {max_words} words maximum
@@ -164,24 +402,34 @@ Requirements:
 - Use minimal Reddit formatting (one **bold** word max)
 - End with engaging element (question, insight, or call to action)
 - Match the energy and tone of the original post
-
+{self._format_comment_examples(original_post, subreddit)}
 Your response:"""
 
         return prompt
 
+    def _format_comment_examples(self, original_post: str, subreddit: str) -> str:
+        """Few-shot block of similar top comments (empty without an index)"""
+        examples = self._get_examples(subreddit, original_post[:500], "comment")
+        if not examples:
+            return ""
+        
+        lines = "\n".join(f'- "{example}"' for example in examples)
+        return f"\nHigh-scoring comments on similar posts (match the style, don't copy):\n{lines}\n"
+
 # Simple CLI for testing
 def main():
-    agent = RedditAgent()
+    agent = RedditAgent(result_store=result_store_from_env())
     
     print("🤖 Minimal Reddit Agent")
     print("1. Generate Post")
     print("2. Generate Comment")
-    print("3. Exit")
+    print("3. Reply to Thread")
+    print("4. Exit")
     
     while True:
-        choice = input("\nChoice (1-3): ").strip()
+        choice = input("\nChoice (1-4): ").strip()
         
-        if choice == "3":
+        if choice == "4":
             print("Goodbye! 👋")
             break
         
@@ -204,6 +452,29 @@ def main():
             result = agent.generate_comment(post, response_type, max_words)
             print(f"\n💬 Generated Comment: {result}")
             print(f"Word count: {len(result.split())}")
+        
+        elif choice == "3":
+            path = input("Thread JSON file: ").strip()
+            response_type = input("Response type (helpful/supportive/humorous): ").strip() or "humorous"
+            with open(path, "r", encoding="utf-8") as f:
+                thread = json.load(f)
+            
+            print(f"\n🧠 Generating {response_type} replies...")
+            try:
+                replies = agent.generate_thread_replies(thread, response_type=response_type)
+            except ValueError as e:
+                print(f"❌ {e}")
+                continue
+            for comment_id, reply in replies.items():
+                print(f"\n💬 {comment_id}: {reply}")
 
 if __name__ == "__main__":
+    # Opt-in profiling: --trace trace.json / --profile profile.folded (or AGENT_TRACE / AGENT_PROFILE)
+    sys.argv[1:] = configure_from_argv(sys.argv[1:])
+    
+    # Non-interactive batch mode: python create_agent.py batch specs.jsonl [options]
+    if sys.argv[1:2] == ["batch"]:
+        from batch_cli import main as batch_main
+        sys.exit(batch_main(sys.argv[2:], default_kind="post"))
+    
     main()
\ No newline at end of file
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Dedup Index - MinHash/LSH near-duplicate detection for generated content
+
+Every generated text gets a 32-value MinHash signature over its word
+bigrams. Signatures are split into LSH bands; each band hashes into a fixed
+number of buckets holding compact id arrays, so a lookup only compares
+against the handful of items sharing a band instead of everything stored.
+
+Signatures keep the low 16 bits of each min-hash (b-bit MinHash), which
+keeps storage at ~96 bytes per item including the band buckets. The index is
+persisted as an append-only file of signatures; buckets are rebuilt on load.
+"""
+
+import os
+import random
+import re
+import struct
+import sys
+import threading
+import zlib
+from array import array
+
+FILE_MAGIC = b"DUPIDX1\n"
+HEADER = struct.Struct("<HHH")  # num_perm, bands, seed
+
+WORD_RE = re.compile(r"[a-z0-9']+")
+
+# Odd multiplier that spreads crc32 values over the full 32-bit range
+HASH_MULTIPLIER = 0x9E3779B1
+
+
+def shingles(text: str) -> set:
+    """Word bigrams of the normalized text (single words for one-word texts)"""
+    words = WORD_RE.findall(text.lower())
+    if len(words) < 2:
+        return set(words)
+    return {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+
+class DuplicateIndex:
+    """Near-duplicate index with a check-and-insert API"""
+
+    def __init__(
+        self,
+        path: str = None,
+        num_perm: int = 32,
+        bands: int = 8,
+        threshold: float = 0.7,
+        buckets_per_band: int = 65536,
+        seed: int = 1
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.path = path
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.buckets_per_band = buckets_per_band
+        self.seed = seed
+
+        rng = random.Random(seed)
+        self._masks = [rng.getrandbits(32) for _ in range(num_perm)]
+        self._signatures = array("H")
+        self._buckets = [{} for _ in range(bands)]
+        self._lock = threading.Lock()
+        self._file = None
+
+        if path:
+            self._open(path)
+
+    def __len__(self) -> int:
+        return len(self._signatures) // self.num_perm
+
+    # Signatures
+    def signature(self, text: str) -> array:
+        """b-bit MinHash signature of a text"""
+        hashes = [(zlib.crc32(s.encode("utf-8")) * HASH_MULTIPLIER) & 0xFFFFFFFF for s in shingles(text)]
+        if not hashes:
+            return array("H", [0xFFFF] * self.num_perm)
+        return array("H", [min(map(mask.__xor__, hashes)) & 0xFFFF for mask in self._masks])
+
+    def _band_buckets(self, signature: array) -> list:
+        rows = self.rows
+        return [
+            hash(tuple(signature[band * rows:(band + 1) * rows])) % self.buckets_per_band
+            for band in range(self.bands)
+        ]
+
+    def _similarity(self, signature: array, item_id: int) -> float:
+        start = item_id * self.num_perm
+        stored = self._signatures[start:start + self.num_perm]
+        return sum(a == b for a, b in zip(signature, stored)) / self.num_perm
+
+    # Lookups
+    def _best_match(self, signature: array, band_buckets: list):
+        rows = self.rows
+        num_perm = self.num_perm
+        signatures = self._signatures
+        best_id, best_similarity = None, 0.0
+        seen = set()
+        for band, bucket in enumerate(band_buckets):
+            ids = self._buckets[band].get(bucket)
+            if not ids:
+                continue
+            band_values = signature[band * rows:(band + 1) * rows]
+            for item_id in ids:
+                if item_id in seen:
+                    continue
+                seen.add(item_id)
+                offset = item_id * num_perm + band * rows
+                if signatures[offset:offset + rows] != band_values:
+                    continue  # bucket collision, not an actual band match
+                similarity = self._similarity(signature, item_id)
+                if similarity > best_similarity:
+                    best_id, best_similarity = item_id, similarity
+        return best_id, best_similarity
+
+    def query(self, text: str):
+        """Return (item_id, similarity) of the closest stored near-duplicate, or None"""
+        signature = self.signature(text)
+        with self._lock:
+            best_id, similarity = self._best_match(signature, self._band_buckets(signature))
+        if best_id is None or similarity < self.threshold:
+            return None
+        return best_id, similarity
+
+    def check_and_insert(self, text: str) -> tuple:
+        """
+        Atomically check a text and store it if it's new
+
+        Returns (is_duplicate, item_id, similarity). For duplicates, item_id is
+        the earlier item it matched and nothing is stored; otherwise it's the
+        id the text was stored under.
+        """
+        signature = self.signature(text)
+        band_buckets = self._band_buckets(signature)
+        with self._lock:
+            best_id, similarity = self._best_match(signature, band_buckets)
+            if best_id is not None and similarity >= self.threshold:
+                return True, best_id, similarity
+            return False, self._insert(signature, band_buckets), similarity
+
+    def insert(self, text: str) -> int:
+        """Store a text unconditionally; returns its id"""
+        signature = self.signature(text)
+        band_buckets = self._band_buckets(signature)
+        with self._lock:
+            return self._insert(signature, band_buckets)
+
+    def _insert(self, signature: array, band_buckets: list) -> int:
+        item_id = len(self)
+        self._signatures.extend(signature)
+        for band, bucket in enumerate(band_buckets):
+            ids = self._buckets[band].get(bucket)
+            if ids is None:
+                ids = self._buckets[band][bucket] = array("I")
+            ids.append(item_id)
+        if self._file:
+            self._file.write(signature.tobytes())
+            self._file.flush()
+        return item_id
+
+    # Persistence
+    def _open(self, path: str):
+        header = FILE_MAGIC + HEADER.pack(self.num_perm, self.bands, self.seed)
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, "rb") as f:
+                if f.read(len(header)) != header:
+                    raise ValueError(f"{path} was written with different index settings")
+                data = f.read()
+            # Drop a trailing partial signature left by a crash mid-write
+            record_size = self.num_perm * 2
+            data = data[:len(data) - len(data) % record_size]
+            signatures = array("H")
+            signatures.frombytes(data)
+            for start in range(0, len(signatures), self.num_perm):
+                signature = signatures[start:start + self.num_perm]
+                self._insert(signature, self._band_buckets(signature))
+            self._file = open(path, "r+b")
+            self._file.seek(len(header) + len(data))
+            self._file.truncate()
+        else:
+            self._file = open(path, "wb")
+            self._file.write(header)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+
+# Simple CLI: check texts (one per line) against an index file
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Check texts for near-duplicates")
+    parser.add_argument("index", help="Index file (created if missing)")
+    parser.add_argument("input", nargs="?", help="Text file, one item per line (default: stdin)")
+    parser.add_argument("--threshold", type=float, default=0.7)
+    args = parser.parse_args(argv)
+
+    index = DuplicateIndex(args.index, threshold=args.threshold)
+    source = open(args.input, "r", encoding="utf-8") if args.input else sys.stdin
+    duplicates = total = 0
+    with source:
+        for line in source:
+            text = line.strip()
+            if not text:
+                continue
+            total += 1
+            is_duplicate, item_id, similarity = index.check_and_insert(text)
+            if is_duplicate:
+                duplicates += 1
+                print(f"♻️  duplicate of #{item_id} ({similarity:.2f}): {text}")
+    index.close()
+    print(f"✅ {total} checked, {duplicates} duplicates, {len(index)} stored")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
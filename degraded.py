@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Degraded Mode - answers served while the upstream circuit is open
+
+DegradedFallback tries, in order: the response cache (earlier results for
+the same spec), precomputed content pools, local generators such as
+draft_generator.DraftGenerator.for_spec, and local templates. Whatever
+it returns is a DegradedText: a plain str that also carries the source it
+came from, so callers can flag degraded answers without changing types.
+"""
+
+import random
+from generation_specs import spec_fingerprint
+
+# Local templates per "kind:response_type" or "kind", filled from the spec's fields
+TEMPLATES = {
+    "post": [
+        "Been thinking about {topic} way too much lately. Either I'm onto something or I've lost the plot. Probably both. r/{subreddit}, do your worst.",
+        "{topic} has taken over my life this week. Either I'm dedicated or I need new hobbies. Probably both. Go ahead, roast me.",
+    ],
+    "comment:humorous": [
+        "You look like you'd explain the plot of a movie while it's still playing.",
+        "This has the energy of a group project where you did all the work.",
+        "You look like your phone autocorrects you to 'sorry'.",
+    ],
+    "comment": [
+        "Thanks for sharing this, genuinely useful perspective.",
+        "Appreciate you posting this, hope it works out.",
+    ],
+    "reddit_content": [
+        "**{topic}: what actually worked for me**\n\nI spent a long time getting this wrong, so here's the short version of what finally clicked.\n\n"
+        "- Start smaller than you think you need to\n- Track one number, not ten\n- Ask for help earlier\n\n"
+        "TL;DR: small, consistent steps beat big plans.\n\nWhat's worked for you, r/{subreddit}?",
+    ],
+}
+
+
+class DegradedText(str):
+    """Generated text that came from a degraded-mode source"""
+
+    source = "template"
+
+    def __new__(cls, text: str, source: str):
+        obj = super().__new__(cls, text)
+        obj.source = source
+        return obj
+
+
+def is_degraded(text) -> bool:
+    return isinstance(text, DegradedText)
+
+
+def _pool_key_for(spec: dict):
+    from content_pool import pool_key_for_spec
+    return pool_key_for_spec(spec)
+
+
+class DegradedFallback:
+    """Cache -> pools -> templates fallback chain"""
+
+    def __init__(self, cache=None, pools=None, templates: dict = None, pool_key_for=None, generators: dict = None):
+        self.cache = cache
+        self.pools = pools
+        self.templates = TEMPLATES if templates is None else templates
+        self.pool_key_for = pool_key_for or _pool_key_for
+        # Optional kind -> callable(spec) local generators tried before templates
+        self.generators = generators or {}
+        self.served = {"cache": 0, "pool": 0, "generator": 0, "template": 0}
+
+    def remember(self, spec: dict, text: str):
+        """Store a successful upstream result so it can be served during an outage"""
+        if self.cache is not None and spec and not is_degraded(text):
+            self.cache.set(spec_fingerprint(spec), text)
+
+    def get(self, spec: dict):
+        """A DegradedText for the spec, or None when no source has anything"""
+        if not spec:
+            return None
+
+        if self.cache is not None:
+            text = self.cache.get(spec_fingerprint(spec))
+            if text is not None:
+                return self._served(text, "cache")
+
+        if self.pools is not None and spec.get("subreddit"):
+            text = self.pools.get(self.pool_key_for(spec))
+            if text is not None:
+                return self._served(text, "pool")
+
+        kind = spec.get("kind")
+        generator = self.generators.get(kind)
+        if generator is not None:
+            text = generator(spec)
+            if text:
+                return self._served(text, "generator")
+
+        choices = self.templates.get(f"{kind}:{spec.get('response_type')}") or self.templates.get(kind)
+        if choices:
+            fields = {"topic": spec.get("topic") or "this", "subreddit": spec.get("subreddit") or "reddit"}
+            return self._served(random.choice(choices).format(**fields), "template")
+        return None
+
+    def _served(self, text: str, source: str) -> DegradedText:
+        self.served[source] += 1
+        return DegradedText(text, source)
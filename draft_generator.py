@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Draft Generator - local RoastMe-style post drafts without a model call
+
+Posts follow the structure RedditAgent asks the model for:
+
+    <embarrassing situation>. Either I <A> or I <B>. Probably both. <invitation>
+
+Training splits historical high-scoring posts into those four slots. Each
+draft picks an A, a B and an invitation from the slot banks. The situation
+comes from the bank or, for `novelty` of the drafts, from a second-order
+word Markov chain trained on all situations.
+
+The chain is stored as flat arrays (CSR style): state -> range of
+successor states with cumulative counts, sampled with one bisect per
+word. No dicts are touched while generating. Drafts are for previews,
+A/B baselines, load tests and outage fallback (see degraded.py).
+
+Usage:
+    python draft_generator.py train drafts.bin dumps/RS_2024-01.jsonl.gz --min-score 50
+    python draft_generator.py generate drafts.bin -n 5 --topic gym
+    python draft_generator.py bench drafts.bin
+"""
+
+import json
+import random
+import re
+import sys
+import time
+from array import array
+from bisect import bisect_right
+from subreddit_profiles import STOPWORDS, iter_dump_records
+
+FILE_MAGIC = b"DRAFTS1\n"
+
+POST_RE = re.compile(
+    r"^\s*(?P<situation>.+?[.!?])\s+Either\s+(?P<a>.+?)\s+or\s+(?P<b>.+?)[.!?]+\s+"
+    r"Probably both[.!]*\s*(?P<invite>.*?)\s*$",
+    re.IGNORECASE | re.DOTALL
+)
+WORD_RE = re.compile(r"[\w'$%]+|[.,!?;:]")
+NO_SPACE_BEFORE = frozenset(".,!?;:")
+
+# Used when no dumps have been trained on
+SEED_POSTS = [
+    "Phone has been on Do Not Disturb for 3 days and I just noticed. Either everyone hates me or I'm more antisocial than I thought. Probably both. Text me some insults.",
+    "Haven't left my apartment in 5 days. Either I'm becoming a hermit or society is avoiding me. Probably both. Make me regret posting this.",
+    "Spent 40 minutes choosing a show and then fell asleep during the intro. Either I'm getting old or I have the attention span of a goldfish. Probably both. Roast me.",
+    "Just realized I've been wearing my shirt inside out since this morning. Either nobody noticed or nobody cared enough to tell me. Probably both. Do your worst.",
+    "My plants died while I was home the whole time. Either I'm a terrible caretaker or they chose death over living with me. Probably both. Go ahead, roast me.",
+    "Went to the gym for the first time in 6 months and left after the warm-up. Either I'm pacing myself or I'm just lazy. Probably both. Roast me.",
+]
+
+START, END = 0, 1  # reserved token ids
+
+
+def split_post(text: str):
+    """(situation, either_a, either_b, invitation) or None if the post doesn't follow the structure"""
+    match = POST_RE.match(" ".join(text.split()))
+    if not match or not match.group("invite"):
+        return None
+    return match.group("situation"), match.group("a"), match.group("b"), match.group("invite")
+
+
+def detokenize(tokens: list) -> str:
+    parts = []
+    for token in tokens:
+        if parts and token not in NO_SPACE_BEFORE:
+            parts.append(" ")
+        parts.append(token)
+    return "".join(parts)
+
+
+class DraftGenerator:
+    """Slot grammar + array-backed Markov chain over post situations"""
+
+    def __init__(self, novelty: float = 0.5, max_words: int = 40, seed: int = None):
+        self.novelty = novelty
+        self.max_words = max_words
+        self._random = random.Random(seed)
+
+        self.situations = []
+        self.either_a = []
+        self.either_b = []
+        self.invitations = []
+        self.vocab = ["<s>", "</s>"]
+
+        # Chain arrays, filled by _build_chain() or load()
+        self.offsets = array("I", [0])      # state -> first edge
+        self.successors = array("I")        # edge -> next state
+        self.cumulative = array("I")        # edge -> cumulative count within its state
+        self.state_token = array("I")       # state -> token it emits
+        self._topic_index = {}
+
+    # Training
+    def train(self, posts, max_bank: int = 20000) -> int:
+        """Fit on an iterable of post texts; returns how many matched the structure"""
+        matched = 0
+        banks = (self.situations, self.either_a, self.either_b, self.invitations)
+        for text in posts:
+            slots = split_post(text)
+            if not slots:
+                continue
+            matched += 1
+            for bank, value in zip(banks, slots):
+                if len(bank) < max_bank:
+                    bank.append(value)
+        self._build_chain()
+        return matched
+
+    def train_dumps(self, paths: list, subreddit: str = "RoastMe", min_score: int = 50) -> int:
+        def posts():
+            wanted = subreddit.lower()
+            for path in paths:
+                for record in iter_dump_records(path):
+                    if "body" in record or (record.get("subreddit") or "").lower() != wanted:
+                        continue
+                    if (record.get("score") or 0) < min_score:
+                        continue
+                    yield f"{record.get('title') or ''} {record.get('selftext') or ''}"
+        return self.train(posts())
+
+    @classmethod
+    def default(cls, **kwargs) -> "DraftGenerator":
+        generator = cls(**kwargs)
+        generator.train(SEED_POSTS)
+        return generator
+
+    def _build_chain(self):
+        """Count order-2 transitions over the situations and pack them into arrays"""
+        token_ids = {token: i for i, token in enumerate(self.vocab)}
+        state_ids = {(START, START): 0}
+        state_tokens = [START]
+        edges = {}  # state -> {next_state: count}
+
+        def state_for(pair):
+            state = state_ids.get(pair)
+            if state is None:
+                state = state_ids[pair] = len(state_tokens)
+                state_tokens.append(pair[1])
+            return state
+
+        for situation in self.situations:
+            tokens = [token_ids.setdefault(token, len(token_ids)) for token in WORD_RE.findall(situation)]
+            state, cur = 0, START
+            for token in tokens + [END]:
+                next_state = state_for((cur, token))
+                counts = edges.setdefault(state, {})
+                counts[next_state] = counts.get(next_state, 0) + 1
+                cur, state = token, next_state
+
+        self.vocab = [token for token, _ in sorted(token_ids.items(), key=lambda item: item[1])]
+        self.state_token = array("I", state_tokens)
+        self.offsets = array("I", [0])
+        self.successors = array("I")
+        self.cumulative = array("I")
+        for state in range(len(state_tokens)):
+            total = 0
+            for next_state, count in edges.get(state, {}).items():
+                total += count
+                self.successors.append(next_state)
+                self.cumulative.append(total)
+            self.offsets.append(len(self.successors))
+        self._index_topics()
+
+    def _index_topics(self):
+        self._topic_index = {}
+        for i, situation in enumerate(self.situations):
+            for word in set(WORD_RE.findall(situation.lower())):
+                if len(word) > 2 and word not in STOPWORDS:
+                    self._topic_index.setdefault(word, array("I")).append(i)
+
+    # Generation
+    def _markov_situation(self) -> str:
+        rand = self._random.random
+        offsets, successors, cumulative, state_token = self.offsets, self.successors, self.cumulative, self.state_token
+        vocab = self.vocab
+        words = []
+        state = 0
+        for _ in range(self.max_words):
+            lo, hi = offsets[state], offsets[state + 1]
+            if lo == hi:
+                break
+            state = successors[bisect_right(cumulative, int(rand() * cumulative[hi - 1]), lo, hi)]
+            token = state_token[state]
+            if token == END:
+                break
+            words.append(vocab[token])
+        return detokenize(words)
+
+    def generate(self, topic: str = None) -> str:
+        """One draft post; situations mentioning `topic` words are preferred when there are any"""
+        if not self.situations:
+            raise ValueError("DraftGenerator has not been trained")
+        choice = self._random.choice
+
+        candidates = None
+        if topic:
+            for word in WORD_RE.findall(topic.lower()):
+                candidates = self._topic_index.get(word)
+                if candidates:
+                    break
+
+        if candidates:
+            situation = self.situations[choice(candidates)]
+        elif self._random.random() < self.novelty:
+            situation = self._markov_situation() or choice(self.situations)
+        else:
+            situation = choice(self.situations)
+        if situation[-1] not in ".!?":
+            situation += "."
+
+        a = choice(self.either_a)
+        b = choice(self.either_b)
+        return f"{situation} Either {a} or {b}. Probably both. {choice(self.invitations)}"
+
+    def generate_many(self, count: int, topic: str = None) -> list:
+        generate = self.generate
+        return [generate(topic) for _ in range(count)]
+
+    def for_spec(self, spec: dict):
+        """degraded.DegradedFallback generator: drafts for post specs only"""
+        if spec.get("kind") != "post":
+            return None
+        return self.generate(spec.get("topic"))
+
+    # Persistence: one JSON header line, then the raw chain arrays
+    def save(self, path: str):
+        arrays = ("offsets", "successors", "cumulative", "state_token")
+        header = {
+            "vocab": self.vocab,
+            "banks": [self.situations, self.either_a, self.either_b, self.invitations],
+            "arrays": [(name, len(getattr(self, name))) for name in arrays],
+        }
+        with open(path, "wb") as f:
+            f.write(FILE_MAGIC)
+            f.write(json.dumps(header).encode("utf-8") + b"\n")
+            for name in arrays:
+                getattr(self, name).tofile(f)
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "DraftGenerator":
+        generator = cls(**kwargs)
+        with open(path, "rb") as f:
+            if f.read(len(FILE_MAGIC)) != FILE_MAGIC:
+                raise ValueError(f"{path} is not a draft generator file")
+            header = json.loads(f.readline())
+            generator.vocab = header["vocab"]
+            generator.situations, generator.either_a, generator.either_b, generator.invitations = header["banks"]
+            for name, length in header["arrays"]:
+                values = array("I")
+                values.fromfile(f, length)
+                setattr(generator, name, values)
+        generator._index_topics()
+        return generator
+
+
+# Simple CLI: train, sample, benchmark
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local RoastMe-style draft generator")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    train = sub.add_parser("train", help="Train on submission dumps")
+    train.add_argument("model")
+    train.add_argument("dumps", nargs="+")
+    train.add_argument("--subreddit", default="RoastMe")
+    train.add_argument("--min-score", type=int, default=50)
+
+    generate = sub.add_parser("generate", help="Print drafts")
+    generate.add_argument("model", nargs="?", help="Trained model (built-in seed posts if omitted)")
+    generate.add_argument("-n", type=int, default=5)
+    generate.add_argument("--topic")
+
+    bench = sub.add_parser("bench", help="Measure drafts per second on one core")
+    bench.add_argument("model", nargs="?")
+    bench.add_argument("--seconds", type=float, default=3.0)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "train":
+        generator = DraftGenerator()
+        matched = generator.train_dumps(args.dumps, args.subreddit, args.min_score)
+        generator.save(args.model)
+        print(f"✅ Trained on {matched} posts ({len(generator.state_token)} chain states) -> {args.model}")
+        return
+
+    generator = DraftGenerator.load(args.model) if args.model else DraftGenerator.default()
+    if args.command == "generate":
+        for draft in generator.generate_many(args.n, args.topic):
+            print(f"📝 {draft}")
+        return
+
+    generate_many = generator.generate_many
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < args.seconds:
+        generate_many(1000)
+        count += 1000
+    elapsed = time.perf_counter() - start
+    print(f"⚡ {count / elapsed:,.0f} drafts/s ({elapsed / count * 1e6:.1f} µs each, {count / elapsed * 60:,.0f}/min)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Example Index - memory-mapped BM25 retrieval over high-scoring Reddit content
+
+The index is built offline from dump files and sharded per subreddit and kind
+(posts/comments). Each shard is a handful of flat binary files that are
+mmap'd on load, so only the pages touched by a query are ever read.
+
+Shard layout (<index_dir>/<subreddit>/<kind>/):
+    meta.json     document count, average length, term count
+    terms.bin     the terms, UTF-8, concatenated in sorted order
+    term_offsets.bin  uint64 byte offsets of each term in terms.bin (n_terms + 1 entries)
+    term_entries.bin  uint64 (postings offset, df) pair per term; looked up by bisecting terms.bin
+    postings.bin  uint32 doc ids for each term, followed by their uint32 term frequencies
+    doc_lens.bin  uint32 token count per document
+    offsets.bin   uint64 byte offsets of each document in docs.bin (n + 1 entries)
+    docs.bin      one JSON object per document: text, score, id
+"""
+
+import heapq
+import json
+import math
+import mmap
+import os
+import sys
+from array import array
+from subreddit_profiles import STOPWORDS, iter_dump_records, record_text, tokenize
+
+KINDS = ("post", "comment")
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Very common terms only score their first postings, i.e. the highest-scoring
+# documents, which keeps query time bounded regardless of shard size
+MAX_POSTINGS_PER_TERM = 2000
+
+
+def index_terms(text: str) -> list:
+    """Tokens that are worth indexing (stopwords carry no signal for BM25)"""
+    return [t for t in tokenize(text) if t not in STOPWORDS]
+
+
+def _shard_dir(index_dir: str, subreddit: str, kind: str) -> str:
+    return os.path.join(index_dir, subreddit.lower(), kind)
+
+
+def _write_shard(path: str, docs: list):
+    """Write one shard from a list of (score, id, text) tuples"""
+    os.makedirs(path, exist_ok=True)
+    docs.sort(reverse=True)
+
+    postings = {}
+    doc_lens = array("I")
+    offsets = array("Q", [0])
+    with open(os.path.join(path, "docs.bin"), "wb") as f:
+        for doc_id, (score, item_id, text) in enumerate(docs):
+            terms = index_terms(text)
+            doc_lens.append(len(terms))
+            counts = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((doc_id, tf))
+
+            line = json.dumps({"text": text, "score": score, "id": item_id}).encode("utf-8") + b"\n"
+            f.write(line)
+            offsets.append(offsets[-1] + len(line))
+
+    # Sorted by code point, which is also the byte order of their UTF-8 encodings
+    flat = array("I")
+    term_offsets = array("Q", [0])
+    term_entries = array("Q")
+    with open(os.path.join(path, "terms.bin"), "wb") as f:
+        for term in sorted(postings):
+            entries = postings[term]
+            encoded = term.encode("utf-8")
+            f.write(encoded)
+            term_offsets.append(term_offsets[-1] + len(encoded))
+            term_entries.extend((len(flat), len(entries)))
+            flat.extend(doc_id for doc_id, _ in entries)
+            flat.extend(tf for _, tf in entries)
+
+    for name, data in (("postings.bin", flat), ("doc_lens.bin", doc_lens), ("offsets.bin", offsets),
+                       ("term_offsets.bin", term_offsets), ("term_entries.bin", term_entries)):
+        with open(os.path.join(path, name), "wb") as f:
+            data.tofile(f)
+
+    meta = {
+        "n_docs": len(docs),
+        "avg_len": (sum(doc_lens) / len(doc_lens)) if doc_lens else 0.0,
+        "n_terms": len(term_entries) // 2,
+    }
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+
+def build_example_index(dump_paths: list, index_dir: str, min_score: int = 50, max_docs: int = 50000) -> dict:
+    """
+    Build the index offline from JSONL dumps
+
+    Only items scoring at least `min_score` are kept, and each shard keeps its
+    `max_docs` highest-scoring items. Returns {(subreddit, kind): doc count}.
+    """
+    shards = {}
+    for path in dump_paths:
+        for record in iter_dump_records(path):
+            subreddit = record.get("subreddit")
+            try:
+                score = int(record.get("score") or 0)
+            except (TypeError, ValueError):
+                continue
+            if not subreddit or score < min_score:
+                continue
+            text = " ".join(record_text(record).split())
+            if not text:
+                continue
+
+            kind = "comment" if "body" in record else "post"
+            heap = shards.setdefault((subreddit.lower(), kind), [])
+            item = (score, str(record.get("id") or ""), text)
+            if len(heap) < max_docs:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+
+    for (subreddit, kind), docs in shards.items():
+        _write_shard(_shard_dir(index_dir, subreddit, kind), docs)
+    return {key: len(docs) for key, docs in shards.items()}
+
+
+class IndexShard:
+    """A single memory-mapped subreddit/kind shard"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.n_docs = meta["n_docs"]
+        self.avg_len = meta["avg_len"] or 1.0
+        self.n_terms = meta["n_terms"]
+
+        self._maps = []
+        self.postings = self._map("postings.bin", "I")
+        self.doc_lens = self._map("doc_lens.bin", "I")
+        self.offsets = self._map("offsets.bin", "Q")
+        self.docs = self._map("docs.bin", None)
+        self.term_bytes = self._map("terms.bin", None)
+        self.term_offsets = self._map("term_offsets.bin", "Q")
+        self.term_entries = self._map("term_entries.bin", "Q")
+
+    def lookup(self, term: str):
+        """(postings offset, df) for a term, or None; binary search over the mapped term table"""
+        key = term.encode("utf-8")
+        term_bytes, term_offsets = self.term_bytes, self.term_offsets
+        lo, hi = 0, self.n_terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            candidate = term_bytes[term_offsets[mid]:term_offsets[mid + 1]]
+            if candidate < key:
+                lo = mid + 1
+            elif candidate > key:
+                hi = mid
+            else:
+                return self.term_entries[2 * mid], self.term_entries[2 * mid + 1]
+        return None
+
+    def _map(self, name: str, fmt: str):
+        path = os.path.join(self.path, name)
+        if os.path.getsize(path) == 0:
+            return memoryview(b"").cast(fmt) if fmt else b""
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mapped)
+        return memoryview(mapped).cast(fmt) if fmt else mapped
+
+    def document(self, doc_id: int) -> dict:
+        start, end = self.offsets[doc_id], self.offsets[doc_id + 1]
+        return json.loads(self.docs[start:end])
+
+    def search(self, query: str, k: int = 3, max_postings: int = MAX_POSTINGS_PER_TERM) -> list:
+        """Top-k (bm25_score, doc_id) pairs for a free-text query"""
+        n_docs = self.n_docs
+        if not n_docs:
+            return []
+
+        scores = {}
+        postings = self.postings
+        doc_lens = self.doc_lens
+        norm = K1 / self.avg_len
+        for term in set(index_terms(query)):
+            entry = self.lookup(term)
+            if entry is None:
+                continue
+            offset, df = entry
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            used = min(df, max_postings)
+            ids = postings[offset:offset + used]
+            tfs = postings[offset + df:offset + df + used]
+            for doc_id, tf in zip(ids, tfs):
+                denom = tf + K1 * (1 - B) + norm * B * doc_lens[doc_id]
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (K1 + 1) / denom
+
+        # Ties (and queries with no matching terms) fall back to the highest-scoring docs,
+        # which come first because shards are written in descending score order
+        if not scores:
+            return [(0.0, doc_id) for doc_id in range(min(k, n_docs))]
+        return heapq.nlargest(k, ((s, -d) for d, s in scores.items()))
+
+    def close(self):
+        for view in (self.postings, self.doc_lens, self.offsets, self.term_offsets, self.term_entries):
+            view.release()
+        for mapped in self._maps:
+            mapped.close()
+        self._maps = []
+
+
+class ExampleIndex:
+    """Few-shot example retrieval across all shards of an index directory"""
+
+    def __init__(self, index_dir: str):
+        self.index_dir = index_dir
+        self._shards = {}
+
+    def _shard(self, subreddit: str, kind: str):
+        key = (subreddit.lower(), kind)
+        if key not in self._shards:
+            path = _shard_dir(self.index_dir, subreddit, kind)
+            self._shards[key] = IndexShard(path) if os.path.exists(os.path.join(path, "meta.json")) else None
+        return self._shards[key]
+
+    def has_shard(self, subreddit: str, kind: str) -> bool:
+        return self._shard(subreddit, kind) is not None
+
+    def search(self, subreddit: str, query: str, kind: str = "post", k: int = 3) -> list:
+        """
+        Return the k most similar high-scoring examples
+
+        Each result is a dict with text, score (Reddit score), id and similarity.
+        Unknown subreddits return an empty list.
+        """
+        if kind not in KINDS:
+            raise ValueError(f"kind must be one of {KINDS}")
+        shard = self._shard(subreddit, kind)
+        if shard is None:
+            return []
+
+        results = []
+        for similarity, doc_id in shard.search(query, k):
+            doc = shard.document(abs(doc_id))
+            doc["similarity"] = round(similarity, 3)
+            results.append(doc)
+        return results
+
+    def close(self):
+        for shard in self._shards.values():
+            if shard:
+                shard.close()
+        self._shards = {}
+
+
+# Simple CLI for building and querying the index
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build or query the few-shot example index")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Build the index from JSONL dumps")
+    build.add_argument("index_dir")
+    build.add_argument("dumps", nargs="+")
+    build.add_argument("--min-score", type=int, default=50)
+    build.add_argument("--max-docs", type=int, default=50000, help="Max documents per shard")
+
+    search = sub.add_parser("search", help="Query one subreddit shard")
+    search.add_argument("index_dir")
+    search.add_argument("subreddit")
+    search.add_argument("query")
+    search.add_argument("--kind", choices=KINDS, default="post")
+    search.add_argument("-k", type=int, default=3)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        counts = build_example_index(args.dumps, args.index_dir, args.min_score, args.max_docs)
+        for (subreddit, kind), count in sorted(counts.items()):
+            print(f"📚 r/{subreddit} {kind}s: {count} examples")
+        print(f"✅ Index written to {args.index_dir}")
+    else:
+        index = ExampleIndex(args.index_dir)
+        for result in index.search(args.subreddit, args.query, args.kind, args.k):
+            print(f"[{result['score']}] ({result['similarity']}) {result['text']}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+Generation Specs - one dict format for every kind of generation request
+
+Pools, job queues and batch tools describe work as plain dicts:
+
+    {"kind": "post", "topic": "...", "subreddit": "RoastMe", "post_type": "text_post", "max_words": 100}
+    {"kind": "comment", "original_post": "...", "response_type": "humorous", "max_words": 15}
+    {"kind": "reddit_content", "topic": "...", "subreddit": "...", "post_type": "first_post",
+     "persona": {...}, "content_strategy": {...}, "optimization": {...}}
+    {"kind": "content", "prompt": "...", "context": {...}}
+
+SpecRunner maps a spec onto the matching RedditAgent / SimpleContentAgent call.
+
+reddit_content specs also have a typed form, RedditContentSpec, with frozen
+Persona / ContentStrategy / Optimization parts. It is validated once, keeps
+its enum-like strings interned, and carries a precomputed fingerprint, so
+equivalent specs share one cache key however their dicts were written.
+"""
+
+import hashlib
+import json
+import sys
+
+SPEC_KINDS = ("post", "comment", "reddit_content", "content")
+
+# Prefix the agents use when they swallow an upstream error
+ERROR_PREFIX = "Error generating"
+
+
+class GenerationError(Exception):
+    """Raised when an agent returned an error string instead of content"""
+    pass
+
+
+class DegradedResultError(GenerationError):
+    """Raised when an agent fell back to degraded content; the fallback text is kept on .result"""
+
+    def __init__(self, result):
+        super().__init__(f"Degraded {result.source} result instead of a generation")
+        self.result = result
+
+
+def is_error_result(text: str) -> bool:
+    return text.startswith(ERROR_PREFIX)
+
+
+def validate_spec(spec: dict) -> dict:
+    """Check a spec has a known kind and its required fields"""
+    if isinstance(spec, RedditContentSpec):
+        return spec  # validated when it was built
+    kind = spec.get("kind")
+    if kind not in SPEC_KINDS:
+        raise ValueError(f"Unknown spec kind {kind!r}; expected one of {SPEC_KINDS}")
+
+    required = {
+        "post": ("topic", "subreddit"),
+        "comment": ("original_post",),
+        "reddit_content": ("topic", "subreddit"),
+        "content": ("prompt",),
+    }[kind]
+    missing = [field for field in required if not spec.get(field)]
+    if missing:
+        raise ValueError(f"{kind} spec is missing {', '.join(missing)}")
+    if kind == "reddit_content":
+        RedditContentSpec.from_dict(spec)
+    return spec
+
+
+def _canonical_json(spec: dict) -> str:
+    return json.dumps(spec, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def spec_json(spec) -> str:
+    """Compact JSON for a spec dict or RedditContentSpec"""
+    if isinstance(spec, RedditContentSpec):
+        return spec.to_json()
+    return _canonical_json(spec)
+
+
+def spec_fingerprint(spec) -> str:
+    """
+    Stable cache key for a spec (key order and whitespace don't matter)
+
+    reddit_content specs are canonicalized first, so e.g. a persona with
+    "credentials": "" and one without credentials share a key.
+    """
+    if isinstance(spec, RedditContentSpec):
+        return spec.fingerprint
+    if spec.get("kind") == "reddit_content":
+        try:
+            return RedditContentSpec.from_dict(spec).fingerprint
+        except ValueError:
+            pass
+    return hashlib.sha256(_canonical_json(spec).encode("utf-8")).hexdigest()
+
+
+TRUE_STRINGS = ("true", "yes", "on", "1")
+FALSE_STRINGS = ("false", "no", "off", "0", "")
+
+
+class _SpecPart:
+    """
+    Base for the small frozen parts of a RedditContentSpec
+
+    Subclasses list their string and boolean FIELDS; strings are stripped,
+    empty values become None and the rest are interned. Booleans accept
+    "true"/"false"-style strings.
+
+    Keyword construction and from_dict() (spec files) are strict about
+    unknown fields and value types. coerce(), the old free-form dict API,
+    ignores unknown keys and stringifies scalars like the dict code did.
+    """
+
+    __slots__ = ()
+    FIELDS = ()
+    BOOL_FIELDS = ()
+
+    def __init__(self, **values):
+        unknown = set(values) - set(self.FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown {type(self).__name__} field(s): {', '.join(sorted(unknown))}")
+        for name in self.FIELDS:
+            object.__setattr__(self, name, self._field(name, values.get(name), strict=True))
+
+    @classmethod
+    def _lenient(cls, values: dict):
+        part = object.__new__(cls)
+        for name in cls.FIELDS:
+            object.__setattr__(part, name, cls._field(name, values.get(name), strict=False))
+        return part
+
+    @classmethod
+    def _field(cls, name: str, value, strict: bool):
+        if name in cls.BOOL_FIELDS:
+            return cls._bool(name, value, strict)
+        if value is None:
+            return None
+        if not isinstance(value, str):
+            if strict:
+                raise ValueError(f"{cls.__name__}.{name} must be a string, got {type(value).__name__}")
+            value = str(value)
+        return sys.intern(value.strip()) if value.strip() else None
+
+    @classmethod
+    def _bool(cls, name: str, value, strict: bool) -> bool:
+        if value is None or isinstance(value, (bool, int, float)):
+            return bool(value)
+        if isinstance(value, str):
+            lowered = value.strip().lower()
+            if lowered in TRUE_STRINGS:
+                return True
+            if lowered in FALSE_STRINGS:
+                return False
+        if strict:
+            raise ValueError(f"{cls.__name__}.{name} must be a boolean, got {value!r}")
+        return bool(value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def _values(self) -> tuple:
+        return tuple(getattr(self, name) for name in self.FIELDS)
+
+    def __eq__(self, other):
+        return type(other) is type(self) and other._values() == self._values()
+
+    def __hash__(self):
+        return hash(self._values())
+
+    def __bool__(self):
+        return any(self._values())
+
+    def __repr__(self):
+        set_fields = ", ".join(f"{name}={value!r}" for name, value in zip(self.FIELDS, self._values()) if value)
+        return f"{type(self).__name__}({set_fields})"
+
+    @classmethod
+    def coerce(cls, value, strict: bool = False):
+        """Accept an instance, a dict (the old free-form API) or None"""
+        if value is None or isinstance(value, cls):
+            return value
+        if isinstance(value, dict):
+            return cls.from_dict(value, strict)
+        raise ValueError(f"Expected a {cls.__name__} or dict, got {type(value).__name__}")
+
+    @classmethod
+    def from_dict(cls, data: dict, strict: bool = True):
+        return cls(**data) if strict else cls._lenient(data)
+
+    def to_dict(self) -> dict:
+        return {name: value for name, value in zip(self.FIELDS, self._values()) if value}
+
+
+class Persona(_SpecPart):
+    """Who the post is written as"""
+
+    __slots__ = ("type", "credentials", "tone", "expertise_area")
+    FIELDS = __slots__
+
+
+class ContentStrategy(_SpecPart):
+    """What kind of post it is and how it hooks readers"""
+
+    __slots__ = ("content_type", "viral_hook", "emotional_trigger", "story_arc", "value_type")
+    FIELDS = __slots__
+
+
+class Optimization(_SpecPart):
+    """
+    Title and structure options
+
+    Flattened from the nested dict form:
+    {"title_strategy": {"hook_type", "include_credibility"},
+     "content_structure": {"include_tl_dr", "use_bullet_points"}}
+    """
+
+    __slots__ = ("hook_type", "include_credibility", "include_tl_dr", "use_bullet_points")
+    FIELDS = __slots__
+    BOOL_FIELDS = ("include_credibility", "include_tl_dr", "use_bullet_points")
+    GROUPS = {
+        "title_strategy": ("hook_type", "include_credibility"),
+        "content_structure": ("include_tl_dr", "use_bullet_points"),
+    }
+
+    @classmethod
+    def from_dict(cls, data: dict, strict: bool = True):
+        unknown = set(data) - set(cls.GROUPS)
+        if unknown and strict:
+            raise ValueError(f"Unknown Optimization group(s): {', '.join(sorted(unknown))}")
+        values = {}
+        for group, fields in cls.GROUPS.items():
+            part = data.get(group) or {}
+            if not isinstance(part, dict):
+                if strict:
+                    raise ValueError(f"Optimization {group} must be an object, got {type(part).__name__}")
+                continue
+            extra = set(part) - set(fields)
+            if extra and strict:
+                raise ValueError(f"Unknown {group} field(s): {', '.join(sorted(extra))}")
+            values.update((name, value) for name, value in part.items() if name in fields)
+        return cls(**values) if strict else cls._lenient(values)
+
+    def to_dict(self) -> dict:
+        result = {}
+        for group, fields in self.GROUPS.items():
+            part = {name: getattr(self, name) for name in fields if getattr(self, name)}
+            if part:
+                result[group] = part
+        return result
+
+
+class RedditContentSpec:
+    """Frozen, validated reddit_content spec with a precomputed fingerprint"""
+
+    __slots__ = ("topic", "subreddit", "post_type", "persona", "content_strategy", "optimization", "fingerprint")
+    kind = "reddit_content"
+
+    def __init__(
+        self,
+        topic: str,
+        subreddit: str,
+        post_type: str = "first_post",
+        persona=None,
+        content_strategy=None,
+        optimization=None,
+        strict: bool = False
+    ):
+        """strict=False accepts the old free-form part dicts (see _SpecPart); from_dict() is strict"""
+        if not topic or not subreddit:
+            raise ValueError("reddit_content spec is missing " + ", ".join(
+                name for name, value in (("topic", topic), ("subreddit", subreddit)) if not value
+            ))
+        setter = object.__setattr__
+        setter(self, "topic", topic)
+        setter(self, "subreddit", sys.intern(subreddit))
+        setter(self, "post_type", sys.intern(post_type or "first_post"))
+        setter(self, "persona", Persona.coerce(persona, strict) or None)
+        setter(self, "content_strategy", ContentStrategy.coerce(content_strategy, strict) or None)
+        setter(self, "optimization", Optimization.coerce(optimization, strict) or None)
+        digest = hashlib.sha256(_canonical_json(self.to_dict()).encode("utf-8")).hexdigest()
+        setter(self, "fingerprint", digest)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("RedditContentSpec is immutable")
+
+    def __eq__(self, other):
+        return isinstance(other, RedditContentSpec) and other.fingerprint == self.fingerprint
+
+    def __hash__(self):
+        return hash(self.fingerprint)
+
+    def __repr__(self):
+        return f"RedditContentSpec(topic={self.topic!r}, subreddit={self.subreddit!r}, fingerprint={self.fingerprint[:12]})"
+
+    def arguments(self) -> dict:
+        """Keyword arguments for SimpleContentAgent.generate_reddit_content / _build_reddit_prompt"""
+        return {
+            "topic": self.topic,
+            "subreddit": self.subreddit,
+            "post_type": self.post_type,
+            "persona": self.persona,
+            "content_strategy": self.content_strategy,
+            "optimization": self.optimization,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, strict: bool = True) -> "RedditContentSpec":
+        """Build from the dict form; 'kind' and unrelated top-level keys are ignored"""
+        return cls(
+            topic=data.get("topic"),
+            subreddit=data.get("subreddit"),
+            post_type=data.get("post_type", "first_post"),
+            persona=data.get("persona"),
+            content_strategy=data.get("content_strategy"),
+            optimization=data.get("optimization"),
+            strict=strict
+        )
+
+    def to_dict(self) -> dict:
+        """Canonical dict form (empty parts and fields omitted)"""
+        result = {"kind": self.kind, "topic": self.topic, "subreddit": self.subreddit, "post_type": self.post_type}
+        for name in ("persona", "content_strategy", "optimization"):
+            part = getattr(self, name)
+            if part:
+                result[name] = part.to_dict()
+        return result
+
+    @classmethod
+    def from_json(cls, text: str) -> "RedditContentSpec":
+        return cls.from_dict(json.loads(text))
+
+    def to_json(self) -> str:
+        return _canonical_json(self.to_dict())
+
+
+def _typed(spec) -> RedditContentSpec:
+    return spec if isinstance(spec, RedditContentSpec) else RedditContentSpec.from_dict(spec)
+
+
+class SpecRunner:
+    """Runs specs against lazily created agents, charged to `budget` and recorded to `result_store` when given"""
+
+    def __init__(self, reddit_agent=None, content_agent=None, budget=None, budget_labels=None, result_store=None):
+        self._reddit_agent = reddit_agent
+        self._content_agent = content_agent
+        self.budget = budget
+        self.budget_labels = budget_labels
+        self.result_store = result_store
+
+    @property
+    def reddit_agent(self):
+        if self._reddit_agent is None:
+            from create_agent import RedditAgent
+            self._reddit_agent = RedditAgent(
+                budget=self.budget, budget_labels=self.budget_labels, result_store=self.result_store
+            )
+        return self._reddit_agent
+
+    @property
+    def content_agent(self):
+        if self._content_agent is None:
+            from content_agent import SimpleContentAgent
+            self._content_agent = SimpleContentAgent(
+                budget=self.budget, budget_labels=self.budget_labels, result_store=self.result_store
+            )
+        return self._content_agent
+
+    def render(self, spec: dict) -> dict:
+        """The system and user prompts a spec would send, without calling the model"""
+        validate_spec(spec)
+        kind = spec.kind if isinstance(spec, RedditContentSpec) else spec["kind"]
+
+        if kind == "post":
+            agent = self.reddit_agent
+            return {
+                "system_prompt": agent._get_post_system_prompt(spec["subreddit"]),
+                "prompt": agent._build_post_prompt(
+                    spec["topic"], spec["subreddit"], spec.get("post_type", "text_post"), spec.get("max_words", 100)
+                )
+            }
+        if kind == "comment":
+            agent = self.reddit_agent
+            return {
+                "system_prompt": agent.comment_system_prompt,
+                "prompt": agent._build_comment_prompt(
+                    spec["original_post"], spec.get("response_type", "helpful"), spec.get("max_words", 15),
+                    spec.get("subreddit", "RoastMe")
+                )
+            }
+        agent = self.content_agent
+        if kind == "reddit_content":
+            return {
+                "system_prompt": agent.reddit_system_prompt,
+                "prompt": agent._build_reddit_prompt(**_typed(spec).arguments())
+            }
+        return {
+            "system_prompt": agent.system_prompt,
+            "prompt": agent._build_context_prompt(spec["prompt"], spec.get("context"))
+        }
+
+    def run(self, spec: dict) -> str:
+        """
+        Generate content for a spec; raises GenerationError on upstream failures
+
+        Degraded fallbacks raise DegradedResultError, so queues retry them and
+        caches and pools never store them as real generations.
+        """
+        from degraded import is_degraded
+        validate_spec(spec)
+        kind = spec.kind if isinstance(spec, RedditContentSpec) else spec["kind"]
+
+        if kind == "post":
+            result = self.reddit_agent.generate_post(
+                topic=spec["topic"],
+                subreddit=spec["subreddit"],
+                post_type=spec.get("post_type", "text_post"),
+                max_words=spec.get("max_words", 100)
+            )
+        elif kind == "comment":
+            result = self.reddit_agent.generate_comment(
+                original_post=spec["original_post"],
+                response_type=spec.get("response_type", "helpful"),
+                max_words=spec.get("max_words", 15),
+                subreddit=spec.get("subreddit", "RoastMe")
+            )
+        elif kind == "reddit_content":
+            result = self.content_agent.generate_reddit_content(**_typed(spec).arguments())
+        else:
+            if spec.get("context"):
+                result = self.content_agent.generate_with_context(spec["prompt"], spec["context"])
+            else:
+                result = self.content_agent.generate_content(spec["prompt"])
+
+        if is_degraded(result):
+            raise DegradedResultError(result)
+        if is_error_result(result):
+            raise GenerationError(result)
+        return result
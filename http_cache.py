@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+HTTP Cache - response caching, conditional requests and compression for /generate
+
+Identical /generate payloads (same prompt and context, whatever the key
+order or surrounding whitespace) share a fingerprint. The JSON body is kept
+in a ResponseCache under that fingerprint, so repeats skip the upstream
+call. With a SQLite path the cache is shared by every serve.py worker.
+
+Every cacheable response carries a weak ETag and Cache-Control:
+private, max-age=<ttl>. A client that sends the ETag back in If-None-Match
+gets a bodyless 304. Degraded and failed responses are never stored and
+are sent with Cache-Control: no-store. A request with
+Cache-Control: no-cache bypasses the stored body and regenerates.
+
+Bodies of min_compress_bytes or more are compressed with brotli (if the
+package is installed) or gzip, as Accept-Encoding allows. Compressed
+variants are memoized per ETag, so repeats don't recompress.
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from generation_specs import spec_fingerprint
+from response_cache import ResponseCache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def request_fingerprint(prompt: str, context: dict = None) -> str:
+    """Cache key for a /generate payload"""
+    return spec_fingerprint({"kind": "http_generate", "prompt": prompt.strip(), "context": context or {}})
+
+
+def etag_for(body: str) -> str:
+    """Weak validator for a response body; the same for every encoding of it"""
+    return 'W/"' + hashlib.sha256(body.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match uses weak comparison: W/ prefixes are ignored"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if (candidate[2:] if candidate.startswith("W/") else candidate) == opaque:
+            return True
+    return False
+
+
+def _accepted(accept_encoding: str) -> dict:
+    """Accept-Encoding as {coding: q}"""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+def choose_encoding(accept_encoding: str):
+    """'br', 'gzip' or None for identity"""
+    accepted = _accepted(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+    options = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best, best_q = None, 0.0
+    for coding in options:
+        q = accepted.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=5)
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=6, mtime=0)
+    return data
+
+
+class HttpCache:
+    """Framework-free /generate caching: look up, store and build responses"""
+
+    def __init__(
+        self,
+        cache: ResponseCache = None,
+        max_age: int = 3600,
+        min_compress_bytes: int = 1024,
+        max_compressed_items: int = 1024
+    ):
+        self.cache = cache or ResponseCache(ttl=max_age)
+        self.max_age = max_age
+        self.min_compress_bytes = min_compress_bytes
+        self.max_compressed_items = max_compressed_items
+
+        self.not_modified = 0
+        self.compressed = {"br": 0, "gzip": 0}
+        self._variants = OrderedDict()  # (etag, encoding) -> compressed bytes
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def bypass(request_headers) -> bool:
+        """True when the client asked for a fresh generation"""
+        directives = (request_headers.get("Cache-Control") or "").lower()
+        return "no-cache" in directives or "no-store" in directives
+
+    def get(self, fingerprint: str):
+        """Stored JSON body for a fingerprint, or None"""
+        return self.cache.get(fingerprint)
+
+    def store(self, fingerprint: str, result: dict) -> str:
+        """Serialize a result, storing it if cacheable; returns the JSON body"""
+        body = json.dumps(result, ensure_ascii=False, separators=(",", ":"))
+        if self.cacheable(result):
+            self.cache.set(fingerprint, body)
+        return body
+
+    @staticmethod
+    def cacheable(result: dict) -> bool:
+        return bool(result.get("success")) and not result.get("degraded")
+
+    def _encoded(self, etag: str, body: bytes, encoding: str) -> bytes:
+        key = (etag, encoding)
+        with self._lock:
+            data = self._variants.get(key)
+            if data is not None:
+                self._variants.move_to_end(key)
+                return data
+        data = compress(body, encoding)
+        with self._lock:
+            self._variants[key] = data
+            while len(self._variants) > self.max_compressed_items:
+                self._variants.popitem(last=False)
+        return data
+
+    def respond(self, body: str, status: int, cacheable: bool, request_headers, hit: bool = False):
+        """(status, headers, payload bytes) for a JSON body"""
+        headers = {"Content-Type": "application/json", "Vary": "Accept-Encoding", "X-Cache": "HIT" if hit else "MISS"}
+        if not cacheable:
+            headers["Cache-Control"] = "no-store"
+        else:
+            etag = etag_for(body)
+            headers["ETag"] = etag
+            headers["Cache-Control"] = f"private, max-age={self.max_age}"
+            if etag_matches(request_headers.get("If-None-Match"), etag):
+                self.not_modified += 1
+                return 304, headers, b""
+
+        payload = body.encode("utf-8")
+        encoding = choose_encoding(request_headers.get("Accept-Encoding")) if len(payload) >= self.min_compress_bytes else None
+        if encoding:
+            payload = self._encoded(headers["ETag"], payload, encoding) if cacheable else compress(payload, encoding)
+            headers["Content-Encoding"] = encoding
+            self.compressed[encoding] += 1
+        headers["Content-Length"] = str(len(payload))
+        return status, headers, payload
+
+    def stats(self) -> dict:
+        return dict(self.cache.stats(), not_modified=self.not_modified, compressed=dict(self.compressed))
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Job Queue - durable, resumable bulk generation backed by SQLite
+
+Generation specs (see generation_specs.py) are enqueued into a SQLite table
+and processed by a pool of worker threads. Every result is committed as soon
+as it comes back, so a crash only loses the items that were in flight;
+`resume` puts those back in the queue and skips everything already done.
+Items that keep failing are quarantined instead of being retried forever.
+
+Usage:
+    python job_queue.py enqueue jobs.db specs.jsonl
+    python job_queue.py run jobs.db --workers 8 --rate 120
+    python job_queue.py resume jobs.db --workers 8
+    python job_queue.py status jobs.db
+    python job_queue.py export jobs.db results.jsonl
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from budget import add_budget_arguments, budget_from_args
+from concurrency import limiter_stats
+from generation_specs import SpecRunner, spec_json, validate_spec
+from result_store import add_result_store_arguments, result_store_from_env
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    spec TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    not_before REAL NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    worker TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+"""
+
+STATUSES = ("pending", "running", "done", "quarantined")
+
+
+class RateLimiter:
+    """Token bucket shared by all workers (requests per minute)"""
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(self._next, now) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class JobQueue:
+    """SQLite-backed queue of generation specs"""
+
+    def __init__(self, path: str, max_attempts: int = 3, retry_delay: float = 5.0):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._local = threading.local()
+        self._connect().executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread; autocommit with explicit transactions"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # Producer side
+    def enqueue(self, specs, batch_size: int = 1000) -> int:
+        """Add specs (any iterable, streamed in batches); returns how many were added"""
+        conn = self._connect()
+        added = 0
+        batch = []
+
+        def flush():
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT INTO jobs (spec, created_at, updated_at) VALUES (?, ?, ?)",
+                [(spec, now, now) for spec in batch]
+            )
+            conn.execute("COMMIT")
+
+        for spec in specs:
+            batch.append(spec_json(validate_spec(spec)))
+            if len(batch) >= batch_size:
+                flush()
+                added += len(batch)
+                batch = []
+        if batch:
+            flush()
+            added += len(batch)
+        return added
+
+    # Worker side
+    def claim(self, worker: str):
+        """Atomically move the next ready job to 'running'; returns (id, spec) or None"""
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id, spec FROM jobs WHERE status = 'pending' AND not_before <= ? ORDER BY id LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = ?, updated_at = ? "
+                    "WHERE id = ?",
+                    (worker, now, row[0])
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return (row[0], json.loads(row[1])) if row else None
+
+    def complete(self, job_id: int, result: str):
+        """Checkpoint a result; committed before the worker takes more work"""
+        self._connect().execute(
+            "UPDATE jobs SET status = 'done', result = ?, error = NULL, updated_at = ? WHERE id = ?",
+            (result, time.time(), job_id)
+        )
+
+    def fail(self, job_id: int, error: str) -> str:
+        """Schedule a retry with backoff, or quarantine after max_attempts; returns the new status"""
+        conn = self._connect()
+        attempts = conn.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+        now = time.time()
+        if attempts >= self.max_attempts:
+            status, not_before = "quarantined", 0
+        else:
+            status, not_before = "pending", now + self.retry_delay * 2 ** (attempts - 1)
+        conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, not_before = ?, updated_at = ? WHERE id = ?",
+            (status, error[:2000], not_before, now, job_id)
+        )
+        return status
+
+    # Maintenance
+    def recover(self) -> int:
+        """Return jobs left 'running' by a dead process to the queue"""
+        cursor = self._connect().execute(
+            "UPDATE jobs SET status = 'pending', not_before = 0, updated_at = ? WHERE status = 'running'",
+            (time.time(),)
+        )
+        return cursor.rowcount
+
+    def requeue_quarantined(self) -> int:
+        cursor = self._connect().execute(
+            "UPDATE jobs SET status = 'pending', attempts = 0, not_before = 0, updated_at = ? "
+            "WHERE status = 'quarantined'",
+            (time.time(),)
+        )
+        return cursor.rowcount
+
+    def counts(self) -> dict:
+        counts = {status: 0 for status in STATUSES}
+        for status, count in self._connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"):
+            counts[status] = count
+        return counts
+
+    def next_ready_in(self):
+        """Seconds until the next pending job becomes claimable, or None if none are pending"""
+        row = self._connect().execute("SELECT MIN(not_before) FROM jobs WHERE status = 'pending'").fetchone()
+        return None if row[0] is None else max(0.0, row[0] - time.time())
+
+    def results(self, status: str = "done"):
+        """Stream (id, spec, result, error) rows for a status"""
+        cursor = self._connect().execute(
+            "SELECT id, spec, result, error FROM jobs WHERE status = ? ORDER BY id", (status,)
+        )
+        for job_id, spec, result, error in cursor:
+            yield job_id, json.loads(spec), result, error
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class WorkerPool:
+    """
+    Worker threads draining a JobQueue
+
+    Threads are the right fit here: workers spend nearly all their time
+    waiting on the API, and the rate limiter caps throughput across the pool.
+    """
+
+    def __init__(self, queue: JobQueue, runner: SpecRunner = None, workers: int = 4, rate_per_minute: float = None):
+        self.queue = queue
+        self.runner = runner or SpecRunner()
+        self.workers = workers
+        self.limiter = RateLimiter(rate_per_minute) if rate_per_minute else None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.failed = 0
+        self.quarantined = 0
+
+    def _work(self, name: str):
+        queue = self.queue
+        try:
+            while not self._stop.is_set():
+                job = queue.claim(name)
+                if job is None:
+                    wait = queue.next_ready_in()
+                    if wait is None:
+                        return  # nothing pending: this worker is done
+                    self._stop.wait(min(wait, 1.0))
+                    continue
+
+                job_id, spec = job
+                if self.limiter:
+                    self.limiter.acquire()
+                try:
+                    result = self.runner.run(spec)
+                except Exception as e:
+                    status = queue.fail(job_id, f"{type(e).__name__}: {e}")
+                    with self._lock:
+                        self.failed += 1
+                        self.quarantined += status == "quarantined"
+                    continue
+
+                queue.complete(job_id, result)
+                with self._lock:
+                    self.completed += 1
+        finally:
+            queue.close()
+
+    def run(self, progress_interval: float = 10.0):
+        """Process jobs until the queue is drained or stop() is called"""
+        threads = [
+            threading.Thread(target=self._work, args=(f"{os.getpid()}-{i}",), name=f"job-worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        started = time.time()
+        try:
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(progress_interval / len(threads))
+                elapsed = time.time() - started
+                limits = ", ".join(f"{name} {stats['limit']}" for name, stats in limiter_stats().items())
+                print(f"⏳ {self.completed} done, {self.failed} failed, {self.quarantined} quarantined "
+                      f"({self.completed / elapsed * 60:.1f}/min)" + (f", in-flight limit: {limits}" if limits else ""))
+        except KeyboardInterrupt:
+            print("\n🛑 Stopping after in-flight items finish...")
+            self.stop()
+            for thread in threads:
+                thread.join()
+
+    def stop(self):
+        self._stop.set()
+
+
+def read_specs(path: str):
+    """Stream specs from a JSONL file ('-' for stdin)"""
+    source = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+    try:
+        for line in source:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+
+# CLI
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Durable bulk-generation job queue")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = sub.add_parser("enqueue", help="Add specs from a JSONL file ('-' for stdin)")
+    enqueue.add_argument("db")
+    enqueue.add_argument("specs")
+
+    for name, help_text in (("run", "Process pending jobs"),
+                            ("resume", "Requeue jobs left running by a crash, then process")):
+        command = sub.add_parser(name, help=help_text)
+        command.add_argument("db")
+        command.add_argument("--workers", type=int, default=4)
+        command.add_argument("--rate", type=float, help="Max requests per minute across all workers")
+        command.add_argument("--max-attempts", type=int, default=3)
+        add_budget_arguments(command)
+        add_result_store_arguments(command)
+
+    status = sub.add_parser("status", help="Show job counts")
+    status.add_argument("db")
+
+    export = sub.add_parser("export", help="Write results as JSONL ('-' for stdout)")
+    export.add_argument("db")
+    export.add_argument("output")
+    export.add_argument("--status", choices=STATUSES, default="done")
+
+    requeue = sub.add_parser("requeue-quarantined", help="Give quarantined jobs another round of attempts")
+    requeue.add_argument("db")
+
+    args = parser.parse_args(argv)
+    queue = JobQueue(args.db, max_attempts=getattr(args, "max_attempts", 3))
+
+    if args.command == "enqueue":
+        added = queue.enqueue(read_specs(args.specs))
+        print(f"📥 Enqueued {added} jobs")
+
+    elif args.command in ("run", "resume"):
+        if args.command == "resume":
+            print(f"♻️  Requeued {queue.recover()} interrupted jobs")
+        counts = queue.counts()
+        print(f"🚀 {counts['pending']} pending, {counts['done']} already done")
+        ledger, labels = budget_from_args(args)
+        results = result_store_from_env(args.results)
+        runner = SpecRunner(budget=ledger, budget_labels=labels, result_store=results)
+        try:
+            WorkerPool(queue, runner=runner, workers=args.workers, rate_per_minute=args.rate).run()
+        finally:
+            if ledger:
+                ledger.close()
+            if results:
+                results.close()
+        print(f"✅ Finished: {queue.counts()}")
+
+    elif args.command == "status":
+        for name, count in queue.counts().items():
+            print(f"{name:>12}: {count}")
+
+    elif args.command == "export":
+        output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+        try:
+            for job_id, spec, result, error in queue.results(args.status):
+                output.write(json.dumps({"id": job_id, "spec": spec, "result": result, "error": error}) + "\n")
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+    elif args.command == "requeue-quarantined":
+        print(f"♻️  Requeued {queue.requeue_quarantined()} quarantined jobs")
+
+    queue.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+"""
+Load Test - open-loop capacity testing of the HTTP API
+
+Starts a mock OpenAI-compatible upstream (latency, jitter and error rate
+are configurable; replies come from the local draft generator) and the
+Flask app pointed at it. It then sends requests at fixed arrival rates no
+matter how fast the server answers (open loop). Latency is measured from
+each request's scheduled send time, so queueing in front of a saturated
+server shows up instead of being hidden.
+
+Traffic is a synthetic mix (short comments, long posts, repeated prompts,
+optional bursts) or a replay of recorded requests. Each configuration
+reports achieved RPS, latency percentiles, error and shed rates (HTTP
+429/503, or requests dropped because --max-in-flight was reached) and the
+server's CPU and RSS.
+
+Usage:
+    python load_test.py run --rates 5,10,20 --duration 30 --profile mixed
+    python load_test.py run --rates 20 --burst-every 10 --burst-factor 4 --json results.json
+    python load_test.py run --rates 20 --baseline results.json   # exit 1 on a regression
+    python load_test.py run --url http://localhost:5000 --server-pid 1234 --replay requests.jsonl
+    python load_test.py mock-upstream --port 8900 --latency-ms 800
+"""
+
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SHED_STATUSES = (429, 503)
+
+# name -> [(request kind, weight)]
+PROFILES = {
+    "mixed": [("short_comment", 0.5), ("long_post", 0.3), ("repeated", 0.2)],
+    "comments": [("short_comment", 1.0)],
+    "posts": [("long_post", 1.0)],
+    "repeated": [("repeated", 1.0)],
+}
+
+TOPICS = ["budgeting", "first marathon", "gym anxiety", "meal prep", "student loans", "learning guitar",
+          "working from home", "moving cities", "credit card debt", "sleep schedule"]
+REPEATED_PROMPTS = [
+    "Write a witty one-line Reddit comment about procrastination",
+    "Write a catchy Instagram caption for a coffee shop's morning special",
+    "Create an email subject line for a flash sale announcement",
+]
+
+
+def synthetic_request(kind: str, rng: random.Random) -> dict:
+    """Request body for one synthetic request of the given kind"""
+    topic = rng.choice(TOPICS)
+    if kind == "short_comment":
+        return {"prompt": f"Write a short, witty Reddit comment about {topic} #{rng.randrange(10**6)}",
+                "context": {"platform": "reddit", "length": "under 20 words"}}
+    if kind == "long_post":
+        return {"prompt": f"Write a detailed Reddit post sharing my experience with {topic}, "
+                          f"with a TL;DR and a question for the community #{rng.randrange(10**6)}",
+                "context": {"platform": "reddit", "audience": "beginners", "length": "400 words"}}
+    return {"prompt": rng.choice(REPEATED_PROMPTS)}
+
+
+def arrival_offsets(rate: float, duration: float, rng: random.Random,
+                    burst_every: float = None, burst_length: float = 1.0, burst_factor: float = 1.0) -> list:
+    """Poisson arrival times in [0, duration); the rate is multiplied by burst_factor during bursts"""
+    peak = rate * max(burst_factor, 1.0)
+    offsets = []
+    t = 0.0
+    while True:
+        t += rng.expovariate(peak)
+        if t >= duration:
+            return offsets
+        in_burst = burst_every and (t % burst_every) < burst_length
+        if rng.random() < (peak if in_burst else rate) / peak:  # thinning
+            offsets.append(t)
+
+
+def synthetic_schedule(rate: float, duration: float, profile: str, seed: int = 0, **burst) -> list:
+    rng = random.Random(seed)
+    kinds, weights = zip(*PROFILES[profile])
+    return [(offset, synthetic_request(rng.choices(kinds, weights)[0], rng))
+            for offset in arrival_offsets(rate, duration, rng, **burst)]
+
+
+def replay_schedule(path: str, rate: float = None, duration: float = None) -> list:
+    """
+    Requests from a JSONL file of bodies; an optional "at" field (seconds)
+    keeps recorded timing, otherwise requests are spread at `rate`
+    """
+    schedule = []
+    with open(path, "r", encoding="utf-8") as f:
+        for i, line in enumerate(line for line in f if line.strip()):
+            body = json.loads(line)
+            offset = body.pop("at", None)
+            if offset is None:
+                offset = i / rate if rate else 0.0
+            if duration is None or offset < duration:
+                schedule.append((float(offset), body))
+    return sorted(schedule, key=lambda item: item[0])
+
+
+# Mock upstream
+class MockUpstreamHandler(BaseHTTPRequestHandler):
+    """OpenAI-compatible /v1/chat/completions with simulated latency and errors"""
+
+    protocol_version = "HTTP/1.1"
+    settings = {"latency": 0.5, "jitter": 0.2, "error_rate": 0.0}
+    drafts = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, body: dict):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        settings = self.settings
+        time.sleep(max(0.0, random.gauss(settings["latency"], settings["latency"] * settings["jitter"])))
+        if random.random() < settings["error_rate"]:
+            self._reply(500, {"error": {"message": "mock upstream error", "type": "server_error"}})
+            return
+
+        words = max(5, int(request.get("max_tokens", 200) * 0.6))
+        text = self.drafts.generate()
+        while len(text.split()) < words // 2:
+            text += "\n\n" + self.drafts.generate()
+        prompt_tokens = sum(len(m.get("content", "")) for m in request.get("messages", [])) // 4
+        completion_tokens = len(text) // 4
+        self._reply(200, {
+            "id": f"chatcmpl-mock-{random.randrange(10**9)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        })
+
+
+def start_mock_upstream(port: int = 0, latency: float = 0.5, jitter: float = 0.2, error_rate: float = 0.0):
+    """Serve the mock upstream on a background thread; returns the server (see .server_address)"""
+    from draft_generator import DraftGenerator
+
+    handler = type("Handler", (MockUpstreamHandler,), {
+        "settings": {"latency": latency, "jitter": jitter, "error_rate": error_rate},
+        "drafts": DraftGenerator.default(),
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-upstream", daemon=True).start()
+    return server
+
+
+# Server under test
+DEFAULT_SERVER_CMD = [sys.executable, "-c",
+                      "import sys; from content_agent import app; app.run(port=int(sys.argv[1]), threaded=True)",
+                      "{port}"]
+
+
+def start_server(port: int, upstream_url: str, command: list = None, timeout: float = 30.0):
+    """Start the app with OPENAI_BASE_URL pointing at the mock upstream; waits for /health"""
+    env = dict(os.environ, OPENAI_BASE_URL=upstream_url, OPENAI_API_KEY="mock-key")
+    argv = [arg.replace("{port}", str(port)) for arg in (command or DEFAULT_SERVER_CMD)]
+    process = subprocess.Popen(argv, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}: {' '.join(argv)}")
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1).read()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"Server did not answer /health within {timeout:.0f}s")
+
+
+class ProcessMonitor:
+    """Samples CPU time and RSS of a process (and its children) from /proc"""
+
+    def __init__(self, pid: int, interval: float = 0.5):
+        self.pid = pid
+        self.interval = interval
+        self.peak_rss = 0
+        self._ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="process-monitor", daemon=True)
+
+    def _pids(self) -> list:
+        pids = [self.pid]
+        try:
+            for task in os.listdir(f"/proc/{self.pid}/task"):
+                with open(f"/proc/{self.pid}/task/{task}/children") as f:
+                    pids.extend(int(child) for child in f.read().split())
+        except OSError:
+            pass
+        return pids
+
+    def cpu_seconds(self):
+        total = 0.0
+        for pid in self._pids():
+            try:
+                with open(f"/proc/{pid}/stat") as f:
+                    fields = f.read().rsplit(")", 1)[1].split()
+                total += (int(fields[11]) + int(fields[12])) / self._ticks  # utime + stime
+            except (OSError, IndexError, ValueError):
+                return None if pid == self.pid else total
+        return total
+
+    def rss_bytes(self):
+        total = 0
+        for pid in self._pids():
+            try:
+                with open(f"/proc/{pid}/status") as f:
+                    for line in f:
+                        if line.startswith("VmRSS:"):
+                            total += int(line.split()[1]) * 1024
+            except OSError:
+                if pid == self.pid:
+                    return None
+        return total
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak_rss = max(self.peak_rss, self.rss_bytes() or 0)
+
+    def __enter__(self):
+        self._cpu_start = self.cpu_seconds()
+        self._wall_start = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        cpu_end = self.cpu_seconds()
+        wall = time.perf_counter() - self._wall_start
+        self.cpu_percent = None
+        if self._cpu_start is not None and cpu_end is not None:
+            self.cpu_percent = round(100 * (cpu_end - self._cpu_start) / wall, 1)
+        return False
+
+
+# Load generation
+def percentile(sorted_values: list, q: float):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def send(url: str, body: dict, timeout: float) -> int:
+    data = json.dumps(body).encode("utf-8")
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"}, method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def run_load(url: str, schedule: list, max_in_flight: int = 256, timeout: float = 60.0) -> dict:
+    """Send `schedule` [(offset_seconds, body)] open-loop; returns the measurements"""
+    lock = threading.Lock()
+    in_flight = [0]
+    results = []  # (latency from scheduled time, outcome)
+    dropped = 0
+
+    def fire(scheduled: float, body: dict):
+        try:
+            status = send(url, body, timeout)
+            outcome = "ok" if 200 <= status < 300 else "shed" if status in SHED_STATUSES else "error"
+        except OSError:
+            outcome = "error"
+        latency = time.perf_counter() - scheduled
+        with lock:
+            in_flight[0] -= 1
+            results.append((latency, outcome))
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        start = time.perf_counter()
+        for offset, body in schedule:
+            scheduled = start + offset
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            with lock:
+                if in_flight[0] >= max_in_flight:
+                    dropped += 1
+                    continue
+                in_flight[0] += 1
+            executor.submit(fire, scheduled, body)
+    elapsed = time.perf_counter() - start
+
+    ok = sorted(latency for latency, outcome in results if outcome == "ok")
+    attempted = len(schedule)
+    shed = dropped + sum(outcome == "shed" for _, outcome in results)
+    errors = sum(outcome == "error" for _, outcome in results)
+    return {
+        "offered_rps": round(attempted / schedule[-1][0], 2) if attempted and schedule[-1][0] else None,
+        "achieved_rps": round(len(ok) / elapsed, 2) if elapsed else None,
+        "requests": attempted,
+        "ok": len(ok),
+        "error_rate": round(errors / attempted, 4) if attempted else None,
+        "shed_rate": round(shed / attempted, 4) if attempted else None,
+        "p50_ms": _ms(percentile(ok, 0.50)),
+        "p90_ms": _ms(percentile(ok, 0.90)),
+        "p99_ms": _ms(percentile(ok, 0.99)),
+        "max_ms": _ms(ok[-1] if ok else None),
+    }
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+def compare_to_baseline(results: list, baseline: list, tolerance: float) -> list:
+    """Regression messages for configurations that got slower than the baseline"""
+    previous = {row["config"]: row for row in baseline}
+    problems = []
+    for row in results:
+        old = previous.get(row["config"])
+        if not old:
+            continue
+        if old["achieved_rps"] and row["achieved_rps"] < old["achieved_rps"] * (1 - tolerance):
+            problems.append(f"{row['config']}: achieved RPS {row['achieved_rps']} < baseline {old['achieved_rps']}")
+        if old["p90_ms"] and row["p90_ms"] and row["p90_ms"] > old["p90_ms"] * (1 + tolerance):
+            problems.append(f"{row['config']}: p90 {row['p90_ms']}ms > baseline {old['p90_ms']}ms")
+    return problems
+
+
+# CLI
+def main(argv=None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Open-loop load testing of the content agent HTTP API")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    mock = sub.add_parser("mock-upstream", help="Run only the mock OpenAI-compatible upstream")
+    mock.add_argument("--port", type=int, default=8900)
+    mock.add_argument("--latency-ms", type=float, default=500)
+    mock.add_argument("--jitter", type=float, default=0.2, help="Latency std-dev as a fraction of the mean")
+    mock.add_argument("--error-rate", type=float, default=0.0)
+
+    run = sub.add_parser("run", help="Run one or more load configurations")
+    run.add_argument("--url", help="Existing server base URL (default: start the app against the mock upstream)")
+    run.add_argument("--server-pid", type=int, help="PID to measure CPU/RSS of when using --url")
+    run.add_argument("--server-cmd", help="Command starting the server; {port} is replaced (default: Flask app)")
+    run.add_argument("--port", type=int, default=5055)
+    run.add_argument("--rates", default="5,10,20", help="Comma-separated arrival rates (requests/s)")
+    run.add_argument("--duration", type=float, default=30)
+    run.add_argument("--profile", choices=sorted(PROFILES), default="mixed")
+    run.add_argument("--replay", help="JSONL request bodies to replay instead of synthetic traffic")
+    run.add_argument("--burst-every", type=float, help="Seconds between bursts")
+    run.add_argument("--burst-length", type=float, default=1.0)
+    run.add_argument("--burst-factor", type=float, default=1.0, help="Rate multiplier during bursts")
+    run.add_argument("--max-in-flight", type=int, default=256, help="Client-side cap; excess requests are shed")
+    run.add_argument("--timeout", type=float, default=60)
+    run.add_argument("--mock-latency-ms", type=float, default=500)
+    run.add_argument("--mock-jitter", type=float, default=0.2)
+    run.add_argument("--mock-error-rate", type=float, default=0.0)
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--json", metavar="PATH", help="Write results as JSON")
+    run.add_argument("--baseline", metavar="PATH", help="Earlier --json results; exit 1 on regressions")
+    run.add_argument("--tolerance", type=float, default=0.1)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "mock-upstream":
+        server = start_mock_upstream(args.port, args.latency_ms / 1000, args.jitter, args.error_rate)
+        print(f"🧪 Mock upstream on http://127.0.0.1:{server.server_address[1]}/v1 (Ctrl+C to stop)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+        return 0
+
+    process = None
+    base_url = args.url
+    pid = args.server_pid
+    if not base_url:
+        upstream = start_mock_upstream(0, args.mock_latency_ms / 1000, args.mock_jitter, args.mock_error_rate)
+        upstream_url = f"http://127.0.0.1:{upstream.server_address[1]}/v1"
+        command = args.server_cmd.split() if args.server_cmd else None
+        process = start_server(args.port, upstream_url, command)
+        base_url = f"http://127.0.0.1:{args.port}"
+        pid = process.pid
+
+    burst = {}
+    if args.burst_every:
+        burst = {"burst_every": args.burst_every, "burst_length": args.burst_length, "burst_factor": args.burst_factor}
+
+    results = []
+    try:
+        for rate in (float(r) for r in args.rates.split(",")):
+            if args.replay:
+                schedule = replay_schedule(args.replay, rate, args.duration)
+            else:
+                schedule = synthetic_schedule(rate, args.duration, args.profile, args.seed, **burst)
+            config = f"{args.replay or args.profile}@{rate:g}rps" + (f"+burst{args.burst_factor:g}x" if burst else "")
+            print(f"🚀 {config}: {len(schedule)} requests over {args.duration:g}s", file=sys.stderr)
+
+            monitor = ProcessMonitor(pid) if pid else None
+            if monitor:
+                with monitor:
+                    row = run_load(f"{base_url}/generate", schedule, args.max_in_flight, args.timeout)
+                row["server_cpu_percent"] = monitor.cpu_percent
+                row["server_peak_rss_mb"] = round(monitor.peak_rss / 2**20, 1) if monitor.peak_rss else None
+            else:
+                row = run_load(f"{base_url}/generate", schedule, args.max_in_flight, args.timeout)
+            row["config"] = config
+            results.append(row)
+            print(json.dumps(row))
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            problems = compare_to_baseline(results, json.load(f), args.tolerance)
+        for problem in problems:
+            print(f"❌ {problem}", file=sys.stderr)
+        if problems:
+            return 1
+        print("✅ No regressions against the baseline", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Posting Planner - best posting times from historical engagement
+
+Submissions from the dumps are folded into per-subreddit hour-of-week
+(7 x 24 = 168 slot) histograms in a single pass over all subreddits. The
+histograms are additive, so new dump chunks are merged incrementally.
+Schedules spread a batch of posts over the best upcoming slots while
+keeping a minimum gap between them so they don't compete with each other.
+"""
+
+import json
+import os
+import sys
+from array import array
+from datetime import datetime, timedelta, timezone
+from subreddit_profiles import iter_dump_records
+
+HOURS_PER_WEEK = 168
+
+# The Unix epoch was a Thursday; shifting by 3 days makes slot 0 Monday 00:00 UTC
+EPOCH_WEEKDAY_OFFSET = 3 * 24
+
+# Circular smoothing kernel over neighbouring hours
+SMOOTHING_KERNEL = (1, 2, 3, 2, 1)
+
+DAY_NAMES = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+
+def hour_of_week(timestamp: float) -> int:
+    """Hour-of-week slot (0 = Monday 00:00 UTC) for a Unix timestamp"""
+    return (int(timestamp) // 3600 + EPOCH_WEEKDAY_OFFSET) % HOURS_PER_WEEK
+
+
+def slot_label(slot: int) -> str:
+    return f"{DAY_NAMES[slot // 24]} {slot % 24:02d}:00 UTC"
+
+
+class EngagementPlanner:
+    """Per-subreddit hour-of-week engagement matrices and schedules"""
+
+    def __init__(self, path: str = None, prior_weight: float = 5.0):
+        self.path = path
+        self.prior_weight = prior_weight  # pseudo-posts pulling sparse slots to the subreddit mean
+        self._posts = {}
+        self._engagement = {}
+        self._names = {}
+        self._smoothed = {}
+
+        if path and os.path.exists(path):
+            self.load(path)
+
+    # Ingestion
+    def ingest(self, records) -> int:
+        """Fold submissions (any subreddit) into the histograms; returns how many were used"""
+        used = 0
+        posts_by_sub = self._posts
+        engagement_by_sub = self._engagement
+        touched = set()
+        for record in records:
+            if "body" in record:
+                continue  # comments don't have a posting time to plan
+            name = record.get("subreddit")
+            created = record.get("created_utc")
+            if not name or created is None:
+                continue
+            try:
+                slot = hour_of_week(float(created))
+                engagement = float(record.get("score") or 0) + float(record.get("num_comments") or 0)
+            except (TypeError, ValueError):
+                continue
+
+            key = name.lower()
+            posts = posts_by_sub.get(key)
+            if posts is None:
+                posts = posts_by_sub[key] = array("d", bytes(8 * HOURS_PER_WEEK))
+                engagement_by_sub[key] = array("d", bytes(8 * HOURS_PER_WEEK))
+                self._names[key] = name
+            posts[slot] += 1
+            engagement_by_sub[key][slot] += max(engagement, 0.0)
+            touched.add(key)
+            used += 1
+
+        for key in touched:
+            self._smoothed.pop(key, None)
+        return used
+
+    def ingest_file(self, path: str) -> int:
+        return self.ingest(iter_dump_records(path))
+
+    def decay(self, factor: float):
+        """Scale all history down so newer chunks weigh more (e.g. 0.9 per week)"""
+        for table in (self._posts, self._engagement):
+            for values in table.values():
+                for i in range(HOURS_PER_WEEK):
+                    values[i] *= factor
+        self._smoothed = {}
+
+    # Queries
+    def subreddits(self) -> list:
+        return sorted(self._names.values())
+
+    def engagement_matrix(self, subreddit: str) -> list:
+        """
+        Expected engagement per post for each of the 168 hour-of-week slots
+
+        Slot means are shrunk towards the subreddit mean (so a single viral
+        post doesn't make an empty hour look great) and then smoothed over
+        neighbouring hours. Returns None for unknown subreddits.
+        """
+        key = subreddit.lower()
+        cached = self._smoothed.get(key)
+        if cached is not None:
+            return cached
+        posts = self._posts.get(key)
+        if posts is None:
+            return None
+        engagement = self._engagement[key]
+
+        total_posts = sum(posts)
+        overall_mean = sum(engagement) / total_posts if total_posts else 0.0
+        prior = self.prior_weight
+        means = [
+            (engagement[i] + prior * overall_mean) / (posts[i] + prior)
+            for i in range(HOURS_PER_WEEK)
+        ]
+
+        half = len(SMOOTHING_KERNEL) // 2
+        kernel_total = sum(SMOOTHING_KERNEL)
+        smoothed = [
+            sum(w * means[(i + j - half) % HOURS_PER_WEEK] for j, w in enumerate(SMOOTHING_KERNEL)) / kernel_total
+            for i in range(HOURS_PER_WEEK)
+        ]
+        self._smoothed[key] = smoothed
+        return smoothed
+
+    def best_slots(self, subreddit: str, n: int = 5) -> list:
+        """Top n (slot_label, expected_engagement) pairs"""
+        matrix = self.engagement_matrix(subreddit)
+        if matrix is None:
+            return []
+        ranked = sorted(range(HOURS_PER_WEEK), key=lambda s: matrix[s], reverse=True)
+        return [(slot_label(s), round(matrix[s], 1)) for s in ranked[:n]]
+
+    def schedule(
+        self,
+        posts: list,
+        subreddit: str,
+        start: datetime = None,
+        min_gap_hours: int = 4,
+        horizon_hours: int = HOURS_PER_WEEK
+    ) -> list:
+        """
+        Recommend a posting time for each post
+
+        Picks the best upcoming hours within the horizon, at least
+        `min_gap_hours` apart. If the batch doesn't fit, the horizon is
+        extended week by week. Unknown subreddits get evenly spaced slots.
+
+        Returns a list of {"post", "time", "slot", "expected_engagement"} dicts
+        in chronological order.
+        """
+        if not posts:
+            return []
+        start = start or datetime.now(timezone.utc)
+        if start.tzinfo is None:
+            start = start.replace(tzinfo=timezone.utc)
+        first_hour = start.replace(minute=0, second=0, microsecond=0)
+        if first_hour < start:
+            first_hour += timedelta(hours=1)
+
+        matrix = self.engagement_matrix(subreddit) or [0.0] * HOURS_PER_WEEK
+        base_slot = hour_of_week(first_hour.timestamp())
+        gap = max(min_gap_hours, 1)
+        horizon = horizon_hours
+
+        chosen = []
+        while len(chosen) < len(posts):
+            # Best hours first; earlier hours win ties so an empty matrix spaces posts evenly
+            candidates = sorted(range(horizon), key=lambda h: (-matrix[(base_slot + h) % HOURS_PER_WEEK], h))
+            chosen = []
+            for hour in candidates:
+                if all(abs(hour - other) >= gap for other in chosen):
+                    chosen.append(hour)
+                    if len(chosen) == len(posts):
+                        break
+            horizon += HOURS_PER_WEEK
+        chosen.sort()
+
+        plan = []
+        for post, hour in zip(posts, chosen):
+            slot = (base_slot + hour) % HOURS_PER_WEEK
+            plan.append({
+                "post": post,
+                "time": (first_hour + timedelta(hours=hour)).isoformat(),
+                "slot": slot_label(slot),
+                "expected_engagement": round(matrix[slot], 1)
+            })
+        return plan
+
+    def schedule_many(self, batches: dict, start: datetime = None, min_gap_hours: int = 4) -> dict:
+        """Schedule {subreddit: [posts]} batches in one call"""
+        return {
+            subreddit: self.schedule(posts, subreddit, start=start, min_gap_hours=min_gap_hours)
+            for subreddit, posts in batches.items()
+        }
+
+    # Persistence
+    def save(self, path: str = None):
+        path = path or self.path
+        data = {
+            "names": self._names,
+            "posts": {key: list(values) for key, values in self._posts.items()},
+            "engagement": {key: list(values) for key, values in self._engagement.items()},
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self._names = data["names"]
+        self._posts = {key: array("d", values) for key, values in data["posts"].items()}
+        self._engagement = {key: array("d", values) for key, values in data["engagement"].items()}
+        self._smoothed = {}
+
+
+# Simple CLI: merge dumps and print the best slots / a schedule
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Plan posting times from historical engagement")
+    parser.add_argument("store", help="Planner JSON file (created if missing)")
+    parser.add_argument("dumps", nargs="*", help="JSONL submission dumps to merge in")
+    parser.add_argument("--subreddit", required=True)
+    parser.add_argument("--posts", type=int, default=0, help="Number of posts to schedule")
+    parser.add_argument("--min-gap-hours", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    planner = EngagementPlanner(args.store)
+    for dump in args.dumps:
+        print(f"📥 {dump}: merged {planner.ingest_file(dump)} submissions")
+    if args.dumps:
+        planner.save()
+
+    print(f"\n⏰ Best slots for r/{args.subreddit}:")
+    for label, engagement in planner.best_slots(args.subreddit):
+        print(f"   {label}  (~{engagement} engagement)")
+
+    if args.posts:
+        print("\n📅 Schedule:")
+        plan = planner.schedule([f"post {i + 1}" for i in range(args.posts)], args.subreddit,
+                                min_gap_hours=args.min_gap_hours)
+        for item in plan:
+            print(f"   {item['time']}  {item['post']}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Response Cache - exact-match cache of generated content
+
+An in-memory LRU in front of an optional SQLite file, so repeated requests
+are served without an upstream call and the cache survives restarts. Keys
+are opaque strings (e.g. generation_specs.spec_fingerprint()).
+
+The SQLite connection is opened on first use, and reopened in a process
+forked from the one that opened it: a cache created at import time in
+serve.py's parent gives every worker its own connection.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL
+)
+"""
+
+
+class ResponseCache:
+    """Thread-safe LRU + SQLite response cache"""
+
+    def __init__(self, path: str = None, max_memory_items: int = 10000, ttl: float = None):
+        self.path = path
+        self.max_memory_items = max_memory_items
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+        self._memory = OrderedDict()  # key -> (created_at, value)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._conn_pid = None
+        self._inherited = []  # connections from before a fork: never used or closed here
+
+    def _connection(self):
+        """This process's SQLite connection, or None without a path; caller holds the lock"""
+        if self.path and self._conn_pid != os.getpid():
+            if self._conn is not None:
+                self._inherited.append(self._conn)
+            self._conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(SCHEMA)
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    def _fresh(self, created_at: float) -> bool:
+        return self.ttl is None or time.time() - created_at <= self.ttl
+
+    def _remember(self, key: str, created_at: float, value: str):
+        memory = self._memory
+        memory[key] = (created_at, value)
+        memory.move_to_end(key)
+        while len(memory) > self.max_memory_items:
+            memory.popitem(last=False)
+
+    def get(self, key: str):
+        """Cached value for a key, or None"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None and self.path:
+                row = self._connection().execute(
+                    "SELECT created_at, value FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row:
+                    entry = row
+                    self._remember(key, *row)
+            elif entry is not None:
+                self._memory.move_to_end(key)
+
+            if entry is None or not self._fresh(entry[0]):
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            if self.path:
+                self._connection().execute(
+                    "INSERT OR REPLACE INTO responses (key, value, created_at) VALUES (?, ?, ?)",
+                    (key, value, now)
+                )
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "memory_items": len(self._memory),
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None and self._conn_pid == os.getpid():
+                self._conn.close()
+            self._conn = self._conn_pid = None
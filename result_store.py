@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Result Store - append-only log of every generation, with Parquet export
+
+Agents hand each generation to ResultStore.record(), which only enqueues
+the row; a background thread writes rows in batches to append-only JSONL
+segment files, so recording never blocks the request path. Full segments
+are sealed and can be exported to Parquet (one file per segment, skipped
+once exported) for fast columnar analysis with pyarrow, DuckDB, pandas...
+
+The writer thread is started per process on the first record(), so a
+store built at import time in serve.py's parent works in every worker.
+The CLIs take --results DIR and the web API reads RESULTS_DIR.
+
+Usage:
+    python job_queue.py run jobs.db --results results/
+    python result_store.py export results/ results_parquet/
+    python result_store.py report results_parquet/ --by subreddit --days 7
+    python result_store.py report results_parquet/ --by persona
+"""
+
+import atexit
+import glob
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import uuid
+
+# Column name -> Arrow type name, in export order
+COLUMNS = (
+    ("id", "string"),
+    ("started_at", "float64"),
+    ("finished_at", "float64"),
+    ("latency_ms", "float64"),
+    ("kind", "string"),
+    ("subreddit", "string"),
+    ("post_type", "string"),
+    ("response_type", "string"),
+    ("persona", "string"),
+    ("model", "string"),
+    ("prompt_hash", "string"),
+    ("prompt_tokens", "int64"),
+    ("completion_tokens", "int64"),
+    ("total_tokens", "int64"),
+    ("output", "string"),
+    ("error", "string"),
+    ("cache", "string"),
+    ("spec", "string"),
+)
+
+OPEN_SUFFIX = ".jsonl.part"
+SEALED_SUFFIX = ".jsonl"
+
+_STOP = object()
+
+
+def _persona_label(spec: dict):
+    persona = spec.get("persona")
+    if isinstance(persona, dict):
+        return persona.get("type") or None
+    return persona or None
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class ResultStore:
+    """Batched, background-written, append-only generation log"""
+
+    def __init__(
+        self,
+        directory: str,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        segment_rows: int = 500_000,
+        segment_seconds: float = 3600,
+        max_queue: int = 100_000
+    ):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.segment_rows = segment_rows
+        self.segment_seconds = segment_seconds
+        self.dropped = 0
+        self.written = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._seal_orphans()
+
+        self.max_queue = max_queue
+        self._queue = None
+        self._file = None
+        self._path = None
+        self._segment_count = 0
+        self._segment_rows = 0
+        self._segment_opened = 0.0
+        self._thread = None
+        self._writer_pid = None  # threads don't survive a fork, so each process starts its own writer
+        self._start_lock = threading.Lock()
+
+    def _ensure_writer(self):
+        with self._start_lock:
+            if self._writer_pid == os.getpid():
+                return
+            self._writer_pid = os.getpid()
+            self._queue = queue.Queue(maxsize=self.max_queue)
+            self._file = None  # a segment inherited from the parent belongs to the parent
+            self._thread = threading.Thread(target=self._writer, name="result-store-writer", daemon=True)
+            self._thread.start()
+        atexit.register(self.close)
+
+    # Request path
+    def record(self, spec: dict = None, started_at: float = None, latency: float = None, **fields):
+        """Enqueue one generation; never blocks (rows are dropped and counted if the queue is full)"""
+        spec = spec or {}
+        now = time.time()
+        row = {
+            "id": uuid.uuid4().hex,
+            "started_at": started_at or now,
+            "finished_at": now,
+            "latency_ms": round(latency * 1000, 3) if latency is not None else None,
+            "kind": spec.get("kind"),
+            "subreddit": spec.get("subreddit"),
+            "post_type": spec.get("post_type"),
+            "response_type": spec.get("response_type"),
+            "persona": _persona_label(spec),
+            "spec": json.dumps(spec, sort_keys=True, ensure_ascii=False),
+        }
+        row.update(fields)
+        if self._writer_pid != os.getpid():
+            self._ensure_writer()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+
+    # Writer thread
+    def _open_segment(self):
+        self._segment_count += 1
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+        name = f"results-{stamp}-{os.getpid()}-{self._segment_count:04d}"
+        self._path = os.path.join(self.directory, name + OPEN_SUFFIX)
+        self._file = open(self._path, "a", encoding="utf-8")
+        self._segment_rows = 0
+        self._segment_opened = time.time()
+
+    def _seal_segment(self):
+        if self._file is None:
+            return
+        self._file.close()
+        os.replace(self._path, self._path[:-len(OPEN_SUFFIX)] + SEALED_SUFFIX)
+        self._file = None
+
+    def _seal_orphans(self):
+        """Seal segments left open by processes that died"""
+        for path in glob.glob(os.path.join(self.directory, "*" + OPEN_SUFFIX)):
+            pid = int(os.path.basename(path).split("-")[2])
+            if pid != os.getpid() and not _pid_alive(pid):
+                os.replace(path, path[:-len(OPEN_SUFFIX)] + SEALED_SUFFIX)
+
+    def _write_batch(self, rows: list):
+        while rows:
+            if self._file is None:
+                self._open_segment()
+            # Split at the row limit, so segments hold exactly segment_rows rows however rows were batched
+            room = max(1, self.segment_rows - self._segment_rows)
+            chunk, rows = rows[:room], rows[room:]
+            self._file.write("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in chunk))
+            self._file.flush()
+            self._segment_rows += len(chunk)
+            self.written += len(chunk)
+            # Seal by size or age, so exports never lag far behind
+            if self._segment_rows >= self.segment_rows or time.time() - self._segment_opened >= self.segment_seconds:
+                self._seal_segment()
+
+    def _writer(self):
+        stopping = False
+        while not stopping:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                # Idle: still seal by age, so the open segment becomes exportable
+                if self._file is not None and time.time() - self._segment_opened >= self.segment_seconds:
+                    self._seal_segment()
+                continue
+
+            batch = []
+            taken = 1
+            item = first
+            while True:
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+                if stopping or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                    taken += 1
+                except queue.Empty:
+                    break
+            try:
+                if batch:
+                    self._write_batch(batch)
+            finally:
+                # Only now are the rows on disk, so flush() (queue.join()) may return
+                for _ in range(taken):
+                    self._queue.task_done()
+        self._seal_segment()
+
+    def flush(self):
+        """Block until everything recorded so far is on disk"""
+        if self._writer_pid == os.getpid():
+            self._queue.join()
+
+    def close(self):
+        """Flush, seal the open segment and stop the writer"""
+        if self._writer_pid == os.getpid() and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def sealed_segments(self) -> list:
+        return sorted(glob.glob(os.path.join(self.directory, "*" + SEALED_SUFFIX)))
+
+
+def result_store_from_env(directory: str = None):
+    """ResultStore writing to `directory`, else RESULTS_DIR; None when neither is set"""
+    directory = directory or os.getenv("RESULTS_DIR")
+    return ResultStore(directory) if directory else None
+
+
+def add_result_store_arguments(parser):
+    """--results, shared by the CLIs"""
+    parser.add_argument("--results", metavar="DIR",
+                        help="Record every generation to a result store directory (default: $RESULTS_DIR)")
+
+
+def _arrow_schema():
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ImportError("Parquet export needs pyarrow: pip install pyarrow")
+    return pa.schema([(name, getattr(pa, type_name)()) for name, type_name in COLUMNS])
+
+
+def export_parquet(directory: str, output_dir: str) -> list:
+    """
+    Convert sealed JSONL segments to Parquet files
+
+    Each segment becomes one Parquet file of the same name; segments that
+    already have one are skipped, so repeated exports only do new work.
+    Returns the paths written.
+    """
+    schema = _arrow_schema()
+    import pyarrow.json as pa_json
+    import pyarrow.parquet as pq
+
+    os.makedirs(output_dir, exist_ok=True)
+    written = []
+    for segment in sorted(glob.glob(os.path.join(directory, "*" + SEALED_SUFFIX))):
+        name = os.path.basename(segment)[:-len(SEALED_SUFFIX)] + ".parquet"
+        target = os.path.join(output_dir, name)
+        if os.path.exists(target):
+            continue
+        table = pa_json.read_json(
+            segment,
+            parse_options=pa_json.ParseOptions(explicit_schema=schema, unexpected_field_behavior="ignore")
+        )
+        tmp_target = os.path.join(output_dir, f"_{name}.tmp")  # '_' keeps it out of dataset scans
+        pq.write_table(table.select([column for column, _ in COLUMNS]), tmp_target, compression="zstd")
+        os.replace(tmp_target, target)
+        written.append(target)
+    return written
+
+
+def report(parquet_dir: str, group_by: str = "subreddit", days: float = None) -> list:
+    """
+    Per-group call counts, latency percentiles and token totals
+
+    e.g. report(dir, "subreddit", days=7) gives p50/p95 latency per subreddit
+    for the last week; report(dir, "persona") gives tokens spent per persona.
+    Failed calls and cache hits (rows with a `cache` value) are left out, so
+    percentiles describe upstream generations only.
+    """
+    schema = _arrow_schema()
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(parquet_dir, format="parquet", schema=schema)
+    row_filter = pc.field("error").is_null() & pc.field("cache").is_null()
+    if days:
+        row_filter = row_filter & (pc.field("started_at") >= time.time() - days * 86400)
+    table = dataset.to_table(columns=[group_by, "latency_ms", "total_tokens"], filter=row_filter)
+
+    grouped = table.group_by(group_by).aggregate([
+        ([], "count_all"),
+        ("latency_ms", "tdigest", pc.TDigestOptions(q=[0.5, 0.95])),
+        ("total_tokens", "sum"),
+    ])
+    rows = []
+    for row in grouped.to_pylist():
+        p50, p95 = row["latency_ms_tdigest"] or (None, None)
+        rows.append({
+            group_by: row[group_by],
+            "calls": row["count_all"],
+            "p50_latency_ms": round(p50, 1) if p50 is not None else None,
+            "p95_latency_ms": round(p95, 1) if p95 is not None else None,
+            "total_tokens": row["total_tokens_sum"],
+        })
+    return sorted(rows, key=lambda r: r["calls"], reverse=True)
+
+
+# CLI
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export and query the generation result store")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export = sub.add_parser("export", help="Convert sealed segments to Parquet")
+    export.add_argument("directory")
+    export.add_argument("output_dir")
+
+    summary = sub.add_parser("report", help="Latency percentiles and token totals per group")
+    summary.add_argument("parquet_dir")
+    summary.add_argument("--by", default="subreddit",
+                         choices=("subreddit", "persona", "kind", "model", "post_type", "response_type"))
+    summary.add_argument("--days", type=float, help="Only include the last N days")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        written = export_parquet(args.directory, args.output_dir)
+        print(f"✅ Exported {len(written)} new segment(s) to {args.output_dir}")
+    else:
+        for row in report(args.parquet_dir, args.by, args.days):
+            print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Semantic Cache - reuse generations for near-identical topics
+
+"budgeting tips for beginners" and "beginner budgeting tips" get different
+exact cache keys but interchangeable reddit_content outputs. This cache
+keys entries on everything except the topic (subreddit, post_type,
+persona, strategy, optimization), then matches topics by cosine
+similarity of hashed text features: stemmed words plus character
+trigrams. A hit needs similarity >= threshold and the same numbers and
+negations: "paid off 10000" vs "paid off 100000" or "quitting my job" vs
+"not quitting my job" look alike but ask for opposite posts, so a
+mismatch in either vetoes the match.
+
+Candidates come from a MinHash LSH index over the feature hashes (8 bands
+of 2 rows, the same masking scheme as dedup_index), so a lookup compares
+against a handful of entries, not the whole namespace. Entries
+are evicted LRU past max_entries or after ttl. Inserts append one line to
+a JSONL log and the index is rebuilt from it on load; compact() rewrites
+the log with only live entries.
+"""
+
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dedup_index import HASH_MULTIPLIER
+from generation_specs import RedditContentSpec
+from subreddit_profiles import STOPWORDS
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+NUMBER_RE = re.compile(r"\d+(?:[,.]\d+)*")
+THOUSANDS_RE = re.compile(r"(?<=\d),(?=\d{3})")
+NEGATION_RE = re.compile(
+    r"\b(?:not|no|never|without|nor|neither|none|nothing|nobody|cannot|\w+n['’]t|dont|doesnt|didnt|cant|wont|isnt)\b"
+)
+BANDS = 8
+ROWS = 2
+_rng = random.Random(1)
+_MASKS = [_rng.getrandbits(32) for _ in range(BANDS * ROWS)]
+
+
+def _stem(word: str) -> str:
+    """Crude suffix stripping, enough to line up tips/tip, beginners/beginner, budgeting/budget"""
+    for suffix in ("ings", "ing", "ies", "s"):
+        if len(word) > len(suffix) + 3 and word.endswith(suffix) and not word.endswith("ss"):
+            return word[:-len(suffix)] + ("y" if suffix == "ies" else "")
+    return word
+
+
+def normalize_topic(topic: str) -> list:
+    """Sorted stemmed content words of a topic"""
+    topic = THOUSANDS_RE.sub("", topic)  # 10,000 -> 10000
+    words = [_stem(word) for word in WORD_RE.findall(topic.lower()) if word not in STOPWORDS]
+    return sorted(words) or WORD_RE.findall(topic.lower())
+
+
+def topic_features(topic: str) -> dict:
+    """Sparse L2-normalized feature vector {feature hash: weight}"""
+    words = normalize_topic(topic)
+    features = {}
+    for word in words:
+        key = zlib.crc32(b"w:" + word.encode("utf-8"))
+        features[key] = features.get(key, 0.0) + 1.0
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            key = zlib.crc32(b"c:" + padded[i:i + 3].encode("utf-8"))
+            features[key] = features.get(key, 0.0) + 0.5
+    norm = math.sqrt(sum(weight * weight for weight in features.values())) or 1.0
+    return {key: weight / norm for key, weight in features.items()}
+
+
+def topic_guard(topic: str) -> tuple:
+    """(numbers, negation count) of a topic; entries only match when these are equal"""
+    text = topic.lower()
+    numbers = sorted({number.replace(",", "") for number in NUMBER_RE.findall(text)})
+    return tuple(numbers), len(NEGATION_RE.findall(text))
+
+
+def cosine(a: dict, b: dict) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(key, 0.0) for key, weight in a.items())
+
+
+def lsh_bands(features: dict) -> tuple:
+    """(band, value) pairs of the MinHash signature over the feature hashes"""
+    hashes = [(key * HASH_MULTIPLIER) & 0xFFFFFFFF for key in features]
+    minima = [min(h ^ mask for h in hashes) for mask in _MASKS]
+    return tuple((band, tuple(minima[band * ROWS:(band + 1) * ROWS])) for band in range(BANDS))
+
+
+def namespace_of(spec: RedditContentSpec) -> str:
+    """Hash of everything in the spec except the topic"""
+    data = spec.to_dict()
+    del data["topic"]
+    data["subreddit"] = data["subreddit"].lower()
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest()[:32]
+
+
+class _Entry:
+    __slots__ = ("namespace", "topic", "features", "guard", "bands", "text", "created_at")
+
+    def __init__(self, namespace, topic, features, guard, bands, text, created_at):
+        self.namespace = namespace
+        self.topic = topic
+        self.features = features
+        self.guard = guard
+        self.bands = bands
+        self.text = text
+        self.created_at = created_at
+
+
+class SemanticCache:
+    """Near-match cache for reddit_content generations"""
+
+    def __init__(
+        self,
+        path: str = None,
+        threshold: float = 0.8,
+        max_entries: int = 100_000,
+        ttl: float = None,
+        brute_force_below: int = 32
+    ):
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.brute_force_below = brute_force_below
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._entries = OrderedDict()  # id -> _Entry, least recently used first
+        self._buckets = {}             # (namespace, band, value) -> set of ids
+        self._namespaces = {}          # namespace -> set of ids
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._log = None
+
+        if path:
+            if os.path.exists(path):
+                self._replay(path)
+            self._log = open(path, "a", encoding="utf-8")
+
+    # Index maintenance (caller holds the lock)
+    def _add(self, namespace: str, topic: str, text: str, created_at: float) -> _Entry:
+        features = topic_features(topic)
+        bands = lsh_bands(features)
+        entry = _Entry(namespace, topic, features, topic_guard(topic), bands, text, created_at)
+
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = entry
+        for band in bands:
+            self._buckets.setdefault((namespace,) + band, set()).add(entry_id)
+        self._namespaces.setdefault(namespace, set()).add(entry_id)
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+        return entry
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        for band in entry.bands:
+            bucket = self._buckets.get((entry.namespace,) + band)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[(entry.namespace,) + band]
+        ids = self._namespaces[entry.namespace]
+        ids.discard(entry_id)
+        if not ids:
+            del self._namespaces[entry.namespace]
+
+    def _candidates(self, namespace: str, features: dict):
+        ids = self._namespaces.get(namespace)
+        if not ids:
+            return ()
+        if len(ids) < self.brute_force_below:
+            return list(ids)
+        found = set()
+        for band in lsh_bands(features):
+            found |= self._buckets.get((namespace,) + band, set())
+        return found
+
+    # Public API
+    def get(self, spec):
+        """(text, similarity, "exact" or "semantic") of the best match at or above the threshold, or None"""
+        spec = spec if isinstance(spec, RedditContentSpec) else RedditContentSpec.from_dict(spec)
+        namespace = namespace_of(spec)
+        features = topic_features(spec.topic)
+        guard = topic_guard(spec.topic)
+        now = time.time()
+
+        with self._lock:
+            best_id, best = None, self.threshold
+            for entry_id in self._candidates(namespace, features):
+                entry = self._entries[entry_id]
+                if self.ttl is not None and now - entry.created_at > self.ttl:
+                    continue
+                if entry.guard != guard:
+                    continue  # different numbers or negation: not interchangeable however close
+                similarity = cosine(features, entry.features)
+                if similarity >= best:
+                    best_id, best = entry_id, similarity
+
+            if best_id is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_id)
+            entry = self._entries[best_id]
+            if entry.topic == spec.topic:
+                self.exact_hits += 1
+                label = "exact"
+            else:
+                self.semantic_hits += 1
+                label = "semantic"
+            return entry.text, round(best, 4), label
+
+    def put(self, spec, text: str):
+        spec = spec if isinstance(spec, RedditContentSpec) else RedditContentSpec.from_dict(spec)
+        namespace = namespace_of(spec)
+        now = time.time()
+        with self._lock:
+            self._add(namespace, spec.topic, text, now)
+            if self._log:
+                self._log.write(json.dumps({"ns": namespace, "topic": spec.topic, "text": text, "at": now}) + "\n")
+                self._log.flush()
+
+    def _replay(self, path: str):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue  # torn last line
+                if self.ttl is None or time.time() - row["at"] <= self.ttl:
+                    self._add(row["ns"], row["topic"], row["text"], row["at"])
+
+    def compact(self):
+        """Rewrite the log with only the live entries"""
+        if not self.path:
+            return
+        with self._lock:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for entry in self._entries.values():
+                    f.write(json.dumps({"ns": entry.namespace, "topic": entry.topic,
+                                        "text": entry.text, "at": entry.created_at}) + "\n")
+            self._log.close()
+            os.replace(tmp_path, self.path)
+            self._log = open(self.path, "a", encoding="utf-8")
+
+    def stats(self) -> dict:
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "lookups": lookups,
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.exact_hits + self.semantic_hits) / lookups, 3) if lookups else None,
+            "evictions": self.evictions,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._log:
+                self._log.close()
+                self._log = None
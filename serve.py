@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Serve - pre-fork multi-process server for the web API
+
+The parent imports the app once and loads read-only state: subreddit
+profiles with their summaries precomputed, plus anything a --preload hook
+adds. It then runs gc.freeze() so later garbage collection in the workers
+does not write to those objects' pages, and forks the workers. Each worker
+shares those pages copy-on-write.
+
+Each worker then warms up before accepting traffic: it starts the app's
+background threads (the module's start_background(), e.g. content pool
+refills), creates its own
+OpenAI client (connection pools must not cross a fork), optionally opens
+an upstream connection, and sends a /health request through the app. It
+serves with a threaded WSGI server on the socket inherited from the
+parent. A worker recycles itself, finishing in-flight requests first,
+when its RSS grows past --max-rss-mb or after --max-requests requests.
+The parent replaces it with a fresh fork.
+
+Usage:
+    python serve.py --workers 4 --port 5000
+    python serve.py --workers 8 --profiles profiles.json --max-rss-mb 400 --warm-upstream
+    python serve.py --app content_agent:app --preload mymodule:load_state
+"""
+
+import gc
+import importlib
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+
+def rss_mb() -> float:
+    """Resident set size of this process in MB (0 where /proc is unavailable)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def load_object(target: str):
+    """Import 'module:attribute'"""
+    module_name, _, attribute = target.partition(":")
+    module = importlib.import_module(module_name)
+    return getattr(module, attribute) if attribute else module
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class WorkerServer(ThreadingMixIn, WSGIServer):
+    """Threaded WSGI server accepting on an already-listening socket"""
+
+    daemon_threads = False
+    block_on_close = True
+
+    def __init__(self, listen_socket: socket.socket, app):
+        WSGIServer.__init__(self, listen_socket.getsockname()[:2], _QuietHandler, bind_and_activate=False)
+        self.socket.close()
+        self.socket = listen_socket
+        host, port = listen_socket.getsockname()[:2]
+        self.server_name = socket.getfqdn(host)
+        self.server_port = port
+        self.setup_environ()
+        self.set_app(app)
+        self.requests = 0
+
+    def process_request(self, request, client_address):
+        self.requests += 1
+        super().process_request(request, client_address)
+
+
+class PreforkServer:
+    """Parent process: preload, fork, supervise and respawn workers"""
+
+    def __init__(
+        self,
+        app_target: str = "content_agent:app",
+        host: str = "127.0.0.1",
+        port: int = 5000,
+        workers: int = 4,
+        max_rss_mb: float = None,
+        max_requests: int = None,
+        warm_upstream: bool = False,
+        profiles: str = None,
+        preload: str = None,
+        backlog: int = 1024
+    ):
+        self.app_target = app_target
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.max_rss_mb = max_rss_mb
+        self.max_requests = max_requests
+        self.warm_upstream = warm_upstream
+        self.profiles = profiles
+        self.preload_hook = preload
+        self.backlog = backlog
+
+        self.app = None
+        self.module = None
+        self._children = {}  # pid -> (worker number, started at)
+        self._stopping = False
+
+    # Parent
+    def preload(self):
+        """Import the app and load shared read-only state before forking"""
+        start = time.perf_counter()
+        module_name = self.app_target.partition(":")[0]
+        self.module = importlib.import_module(module_name)
+        self.app = load_object(self.app_target)
+
+        api = getattr(self.module, "api", None)
+        agent = getattr(api, "agent", None)
+        if self.profiles and agent is not None:
+            from subreddit_profiles import SubredditProfileStore
+            store = SubredditProfileStore(self.profiles)
+            for subreddit in store.subreddits():
+                store.describe(subreddit)  # fill the summary cache once, shared by every worker
+            agent.profile_store = store
+
+        if self.preload_hook:
+            load_object(self.preload_hook)()
+
+        # Move everything loaded so far out of the collector's reach: the
+        # workers' collections no longer touch (and copy) these pages
+        gc.collect()
+        gc.freeze()
+        print(f"📦 Preloaded {self.app_target} in {(time.perf_counter() - start) * 1000:.0f} ms, "
+              f"parent RSS {rss_mb():.0f} MB", file=sys.stderr)
+
+    def serve(self):
+        if not hasattr(os, "fork"):
+            raise RuntimeError("serve.py needs os.fork(); use a single process on this platform")
+        self.preload()
+
+        listen_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listen_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listen_socket.bind((self.host, self.port))
+        listen_socket.listen(self.backlog)
+        self.port = listen_socket.getsockname()[1]
+        print(f"🌐 Serving on http://{self.host}:{self.port} with {self.workers} workers", file=sys.stderr)
+
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        for number in range(self.workers):
+            self._spawn(listen_socket, number)
+
+        while self._children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            child = self._children.pop(pid, None)
+            if child is not None and not self._stopping:
+                number, started = child
+                if time.time() - started < 1.0:
+                    time.sleep(1.0)  # don't spin on a worker that dies during start-up
+                self._spawn(listen_socket, number)
+        listen_socket.close()
+
+    def _spawn(self, listen_socket: socket.socket, number: int):
+        forked_at = time.perf_counter()
+        pid = os.fork()
+        if pid:
+            self._children[pid] = (number, time.time())
+            return
+        # Child
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        code = 0
+        try:
+            self._worker(listen_socket, number, forked_at)
+        except BaseException as e:
+            print(f"❌ Worker {number} crashed: {type(e).__name__}: {e}", file=sys.stderr)
+            code = 1
+        finally:
+            sys.stderr.flush()
+            os._exit(code)
+
+    def _stop(self, signum, frame):
+        self._stopping = True
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    # Worker
+    def warm_up(self):
+        """Start the app's background threads, create this worker's upstream client and run one request"""
+        start_background = getattr(self.module, "start_background", None)
+        if start_background is not None:
+            start_background()  # threads don't survive a fork, so each worker starts its own
+
+        api = getattr(self.module, "api", None)
+        agent = getattr(api, "agent", None)
+        if agent is not None and hasattr(agent, "client"):
+            client = agent.client
+            if self.warm_upstream:
+                try:
+                    client.models.list()  # opens (and pools) the upstream connection
+                except Exception as e:
+                    print(f"⚠️ Upstream warm-up failed: {e}", file=sys.stderr)
+        if hasattr(self.app, "test_client"):
+            self.app.test_client().get("/health")
+
+    def _worker(self, listen_socket: socket.socket, number: int, forked_at: float):
+        import random
+        random.seed()  # don't share the parent's random state
+
+        self.warm_up()
+        server = WorkerServer(listen_socket, self.app)
+        print(f"✅ Worker {number} (pid {os.getpid()}) ready in {(time.perf_counter() - forked_at) * 1000:.0f} ms, "
+              f"RSS {rss_mb():.0f} MB", file=sys.stderr)
+
+        def recycle(reason: str):
+            print(f"♻️ Worker {number} (pid {os.getpid()}) recycling: {reason}", file=sys.stderr)
+            server.shutdown()
+
+        def watch():
+            while True:
+                time.sleep(1.0)
+                rss = rss_mb()
+                if self.max_rss_mb and rss > self.max_rss_mb:
+                    return recycle(f"RSS {rss:.0f} MB > {self.max_rss_mb:.0f} MB")
+                if self.max_requests and server.requests >= self.max_requests:
+                    return recycle(f"served {server.requests} requests")
+
+        signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+        threading.Thread(target=watch, name="worker-watchdog", daemon=True).start()
+        server.serve_forever()
+        server.server_close()  # waits for in-flight requests
+        stop_background = getattr(self.module, "stop_background", None)
+        if stop_background is not None:
+            stop_background()  # the worker leaves with os._exit(), which skips atexit handlers
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pre-fork multi-process server for the web API")
+    parser.add_argument("--app", default="content_agent:app", help="WSGI app as module:attribute")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--max-rss-mb", type=float, help="Recycle a worker whose RSS grows past this")
+    parser.add_argument("--max-requests", type=int, help="Recycle a worker after this many requests")
+    parser.add_argument("--warm-upstream", action="store_true", help="Open an upstream connection during warm-up")
+    parser.add_argument("--profiles", help="SubredditProfileStore JSON to preload")
+    parser.add_argument("--preload", help="module:function called in the parent to load more shared state")
+    args = parser.parse_args(argv)
+
+    PreforkServer(
+        app_target=args.app,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        max_rss_mb=args.max_rss_mb,
+        max_requests=args.max_requests,
+        warm_upstream=args.warm_upstream,
+        profiles=args.profiles,
+        preload=args.preload
+    ).serve()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+"""
+Subreddit Profiles - incremental rolling-window analytics over Reddit dumps
+
+Dump chunks (JSONL submissions/comments) are merged into hourly buckets of
+counters and sketches, so keeping the "last 24 hours" summary current only
+costs the new chunk plus a merge of at most `window_hours` buckets.
+"""
+
+import base64
+import gzip
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+from array import array
+
+BUCKET_SECONDS = 3600
+
+TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have i i'm im in is it it's its me my
+of on or so that the this to was were with you your you're just like
+""".split())
+
+REMOVED_TEXT = ("[deleted]", "[removed]")
+
+
+def iter_dump_records(path: str):
+    """Yield records from a JSONL dump file (plain or .gz)"""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def tokenize(text: str) -> list:
+    """Lowercase word tokens used by all the dump analytics"""
+    return TOKEN_RE.findall(text.lower())
+
+
+def record_text(record: dict) -> str:
+    """Body text of a comment, or title + selftext of a submission"""
+    if "body" in record:
+        text = record.get("body") or ""
+    else:
+        text = f"{record.get('title') or ''} {record.get('selftext') or ''}"
+    return "" if text.strip() in REMOVED_TEXT else text
+
+
+def phrases(tokens: list, sizes=(2, 3)):
+    """Yield bigram/trigram phrases that aren't made only of stopwords"""
+    for n in sizes:
+        for i in range(len(tokens) - n + 1):
+            gram = tokens[i:i + n]
+            if all(t in STOPWORDS for t in gram):
+                continue
+            yield " ".join(gram)
+
+
+class CountMinSketch:
+    """Fixed-size frequency sketch; estimates never undercount"""
+
+    def __init__(self, width: int = 1024, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.table = array("q", bytes(8 * width * depth))
+
+    def _indexes(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for row in range(self.depth):
+            yield row * self.width + (h1 + row * h2) % self.width
+
+    def add(self, item: str, count: int = 1):
+        table = self.table
+        for i in self._indexes(item):
+            table[i] += count
+
+    def estimate(self, item: str) -> int:
+        table = self.table
+        return min(table[i] for i in self._indexes(item))
+
+    def merge(self, other: "CountMinSketch"):
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("Cannot merge sketches with different dimensions")
+        table = self.table
+        for i, value in enumerate(other.table):
+            if value:
+                table[i] += value
+
+    def to_dict(self) -> dict:
+        return {
+            "width": self.width,
+            "depth": self.depth,
+            "table": base64.b64encode(self.table.tobytes()).decode("ascii"),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CountMinSketch":
+        sketch = cls(data["width"], data["depth"])
+        sketch.table = array("q")
+        sketch.table.frombytes(base64.b64decode(data["table"]))
+        return sketch
+
+
+class ScoreDigest:
+    """Merging t-digest for streaming score quantiles"""
+
+    def __init__(self, compression: int = 100):
+        self.compression = compression
+        self.count = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._centroids = []
+        self._buffer = []
+
+    def add(self, value: float, weight: float = 1.0):
+        value = float(value)
+        self._buffer.append((value, weight))
+        self.count += weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self._buffer) >= self.compression * 4:
+            self._compress()
+
+    def merge(self, other: "ScoreDigest"):
+        other._compress()
+        if not other._centroids:
+            return
+        self._buffer.extend(other._centroids)
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+
+    def _k(self, q: float) -> float:
+        q = min(max(q, 0.0), 1.0)
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _compress(self):
+        if not self._buffer:
+            return
+        items = sorted(self._centroids + self._buffer)
+        self._buffer = []
+        total = self.count
+        merged = []
+        weight_so_far = 0.0
+        mean, weight = items[0]
+        k_left = self._k(0.0)
+        for next_mean, next_weight in items[1:]:
+            q_right = (weight_so_far + weight + next_weight) / total
+            if self._k(q_right) - k_left <= 1.0:
+                weight += next_weight
+                mean += (next_mean - mean) * next_weight / weight
+            else:
+                merged.append((mean, weight))
+                weight_so_far += weight
+                k_left = self._k(weight_so_far / total)
+                mean, weight = next_mean, next_weight
+        merged.append((mean, weight))
+        self._centroids = merged
+
+    def quantile(self, q: float):
+        """Approximate q-quantile (0..1), or None when empty"""
+        self._compress()
+        centroids = self._centroids
+        if not centroids:
+            return None
+        if len(centroids) == 1:
+            return centroids[0][0]
+        target = q * self.count
+        prev_mid, prev_mean = 0.0, self.min
+        cumulative = 0.0
+        for mean, weight in centroids:
+            mid = cumulative + weight / 2
+            if target <= mid:
+                if mid == prev_mid:
+                    return mean
+                return prev_mean + (mean - prev_mean) * (target - prev_mid) / (mid - prev_mid)
+            prev_mid, prev_mean = mid, mean
+            cumulative += weight
+        if self.count == prev_mid:
+            return self.max
+        return prev_mean + (self.max - prev_mean) * (target - prev_mid) / (self.count - prev_mid)
+
+    def to_dict(self) -> dict:
+        self._compress()
+        return {
+            "compression": self.compression,
+            "count": self.count,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "centroids": self._centroids,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ScoreDigest":
+        digest = cls(data["compression"])
+        digest.count = data["count"]
+        if data["count"]:
+            digest.min = data["min"]
+            digest.max = data["max"]
+        digest._centroids = [tuple(c) for c in data["centroids"]]
+        return digest
+
+
+class ProfileBucket:
+    """Counters and sketches for one subreddit over one hour"""
+
+    def __init__(self, sketch_width: int = 1024, max_candidates: int = 200):
+        self.posts = 0
+        self.comments = 0
+        self.comment_words = 0
+        self.post_scores = ScoreDigest()
+        self.comment_scores = ScoreDigest()
+        self.phrase_sketch = CountMinSketch(sketch_width)
+        self.candidates = {}
+        self.max_candidates = max_candidates
+
+    def add(self, record: dict):
+        score = record.get("score") or 0
+        try:
+            score = float(score)
+        except (TypeError, ValueError):
+            score = 0.0
+        tokens = tokenize(record_text(record))
+
+        if "body" in record:
+            self.comments += 1
+            self.comment_words += len(tokens)
+            self.comment_scores.add(score)
+        else:
+            self.posts += 1
+            self.post_scores.add(score)
+
+        # Upvote-weighted phrase counts, so the top phrases are the ones that score
+        weight = max(1, int(score))
+        candidates = self.candidates
+        for phrase in phrases(tokens):
+            self.phrase_sketch.add(phrase, weight)
+            candidates[phrase] = candidates.get(phrase, 0) + weight
+        if len(candidates) > self.max_candidates * 2:
+            self._trim_candidates()
+
+    def _trim_candidates(self):
+        top = sorted(self.candidates.items(), key=lambda kv: kv[1], reverse=True)
+        self.candidates = dict(top[:self.max_candidates])
+
+    def to_dict(self) -> dict:
+        self._trim_candidates()
+        return {
+            "posts": self.posts,
+            "comments": self.comments,
+            "comment_words": self.comment_words,
+            "post_scores": self.post_scores.to_dict(),
+            "comment_scores": self.comment_scores.to_dict(),
+            "phrase_sketch": self.phrase_sketch.to_dict(),
+            "candidates": self.candidates,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ProfileBucket":
+        bucket = cls()
+        bucket.posts = data["posts"]
+        bucket.comments = data["comments"]
+        bucket.comment_words = data["comment_words"]
+        bucket.post_scores = ScoreDigest.from_dict(data["post_scores"])
+        bucket.comment_scores = ScoreDigest.from_dict(data["comment_scores"])
+        bucket.phrase_sketch = CountMinSketch.from_dict(data["phrase_sketch"])
+        bucket.candidates = data["candidates"]
+        return bucket
+
+
+class SubredditProfileStore:
+    """
+    Rolling-window subreddit analytics built incrementally from dump chunks
+
+    The clock is the newest `created_utc` seen (the watermark), so replaying
+    historical dumps behaves the same as ingesting a live feed.
+    """
+
+    def __init__(self, path: str = None, window_hours: int = None, retention_hours: int = None):
+        self.path = path
+        self.window_hours = window_hours or 24
+        self.retention_hours = retention_hours or self.window_hours
+        self.watermark = 0
+        self._buckets = {}
+        self._names = {}
+        self._summaries = {}
+
+        if path and os.path.exists(path):
+            self.load(path)
+            # Explicit arguments win over the settings saved with the store
+            if window_hours:
+                self.window_hours = window_hours
+            if retention_hours:
+                self.retention_hours = retention_hours
+            self.retention_hours = max(self.retention_hours, self.window_hours)
+
+    # Ingestion
+    def ingest(self, records) -> int:
+        """Merge an iterable of dump records; returns how many were used"""
+        used = 0
+        touched = set()
+        watermark = self.watermark
+        for record in records:
+            name = record.get("subreddit")
+            created = record.get("created_utc")
+            if not name or created is None:
+                continue
+            try:
+                created = int(float(created))
+            except (TypeError, ValueError):
+                continue
+
+            key = name.lower()
+            start = created - created % BUCKET_SECONDS
+            buckets = self._buckets.setdefault(key, {})
+            bucket = buckets.get(start)
+            if bucket is None:
+                bucket = buckets[start] = ProfileBucket()
+            bucket.add(record)
+
+            self._names.setdefault(key, name)
+            self.watermark = max(self.watermark, created)
+            touched.add(key)
+            used += 1
+
+        if self.watermark != watermark:
+            self._summaries.clear()  # every subreddit's window moved, not just the touched ones
+        else:
+            for key in touched:
+                self._summaries.pop(key, None)
+        self.expire()
+        return used
+
+    def ingest_file(self, path: str) -> int:
+        return self.ingest(iter_dump_records(path))
+
+    def expire(self, now: int = None) -> int:
+        """Drop buckets that fell out of the retention window"""
+        now = self.watermark if now is None else now
+        cutoff = now - self.retention_hours * BUCKET_SECONDS
+        dropped = 0
+        for key in list(self._buckets):
+            buckets = self._buckets[key]
+            for start in [s for s in buckets if s + BUCKET_SECONDS <= cutoff]:
+                del buckets[start]
+                dropped += 1
+                self._summaries.pop(key, None)
+            if not buckets:
+                del self._buckets[key]
+        return dropped
+
+    # Queries
+    def subreddits(self) -> list:
+        return sorted(self._names[key] for key in self._buckets)
+
+    def _window(self, key: str, hours: int):
+        cutoff = self.watermark - hours * BUCKET_SECONDS
+        for start, bucket in self._buckets.get(key, {}).items():
+            if start + BUCKET_SECONDS > cutoff:
+                yield bucket
+
+    def phrase_count(self, subreddit: str, phrase: str, hours: int = None) -> int:
+        """Upvote-weighted count of a phrase in the rolling window"""
+        hours = hours or self.window_hours
+        return sum(b.phrase_sketch.estimate(phrase) for b in self._window(subreddit.lower(), hours))
+
+    def summary(self, subreddit: str, hours: int = None, top_phrases: int = 10) -> dict:
+        """Rolling-window summary for a subreddit, or None without data"""
+        key = subreddit.lower()
+        hours = hours or self.window_hours
+        cache_key = (hours, top_phrases)
+        cached = self._summaries.get(key, {}).get(cache_key)
+        if cached is not None:
+            return cached
+
+        buckets = list(self._window(key, hours))
+        if not buckets:
+            return None
+
+        post_scores = ScoreDigest()
+        comment_scores = ScoreDigest()
+        sketch = CountMinSketch(buckets[0].phrase_sketch.width, buckets[0].phrase_sketch.depth)
+        candidates = set()
+        posts = comments = comment_words = 0
+        for bucket in buckets:
+            posts += bucket.posts
+            comments += bucket.comments
+            comment_words += bucket.comment_words
+            post_scores.merge(bucket.post_scores)
+            comment_scores.merge(bucket.comment_scores)
+            sketch.merge(bucket.phrase_sketch)
+            candidates.update(bucket.candidates)
+
+        ranked = sorted(((sketch.estimate(p), p) for p in candidates), reverse=True)
+
+        def quantiles(digest):
+            if not digest.count:
+                return {}
+            return {f"p{int(q * 100)}": round(digest.quantile(q), 1) for q in (0.5, 0.9, 0.99)}
+
+        result = {
+            "subreddit": self._names.get(key, subreddit),
+            "window_hours": hours,
+            "posts": posts,
+            "comments": comments,
+            "avg_comment_words": round(comment_words / comments, 1) if comments else None,
+            "post_score_quantiles": quantiles(post_scores),
+            "comment_score_quantiles": quantiles(comment_scores),
+            "top_phrases": [p for _, p in ranked[:top_phrases]],
+        }
+        self._summaries.setdefault(key, {})[cache_key] = result
+        return result
+
+    def describe(self, subreddit: str, hours: int = None) -> str:
+        """Prompt-ready analysis paragraph, or None without data"""
+        summary = self.summary(subreddit, hours)
+        if not summary:
+            return None
+
+        parts = [
+            f"Analysis of the last {summary['window_hours']} hours of r/{summary['subreddit']} data "
+            f"({summary['posts']} posts, {summary['comments']} comments)."
+        ]
+        comment_q = summary["comment_score_quantiles"]
+        if comment_q:
+            parts.append(
+                f"Median comment score is {comment_q['p50']:g}; the top 10% of comments score "
+                f"above {comment_q['p90']:g}."
+            )
+        if summary["avg_comment_words"]:
+            parts.append(f"Comments average {summary['avg_comment_words']:g} words.")
+        post_q = summary["post_score_quantiles"]
+        if post_q:
+            parts.append(f"Median post score is {post_q['p50']:g}, top 10% above {post_q['p90']:g}.")
+        if summary["top_phrases"]:
+            quoted = ", ".join(f'"{p}"' for p in summary["top_phrases"])
+            parts.append(f"Recurring phrases in high-scoring content: {quoted}.")
+        return " ".join(parts)
+
+    # Persistence
+    def save(self, path: str = None):
+        path = path or self.path
+        data = {
+            "window_hours": self.window_hours,
+            "retention_hours": self.retention_hours,
+            "watermark": self.watermark,
+            "names": self._names,
+            "buckets": {
+                key: {str(start): bucket.to_dict() for start, bucket in buckets.items()}
+                for key, buckets in self._buckets.items()
+            },
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.window_hours = data["window_hours"]
+        self.retention_hours = data["retention_hours"]
+        self.watermark = data["watermark"]
+        self._names = data["names"]
+        self._buckets = {
+            key: {int(start): ProfileBucket.from_dict(b) for start, b in buckets.items()}
+            for key, buckets in data["buckets"].items()
+        }
+        self._summaries = {}
+
+
+# Simple CLI: merge dump chunks into a store and print summaries
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Update subreddit profiles from dump chunks")
+    parser.add_argument("store", help="Profile store JSON file (created if missing)")
+    parser.add_argument("dumps", nargs="*", help="JSONL dump chunks to merge in")
+    parser.add_argument("--window-hours", type=int, help="Window size (default: the store's, or 24)")
+    parser.add_argument("--subreddit", action="append", help="Subreddit(s) to summarize")
+    args = parser.parse_args(argv)
+
+    store = SubredditProfileStore(args.store, window_hours=args.window_hours)
+    for dump in args.dumps:
+        used = store.ingest_file(dump)
+        print(f"📥 {dump}: merged {used} records")
+    if args.dumps:
+        store.save()
+
+    for subreddit in args.subreddit or store.subreddits():
+        description = store.describe(subreddit)
+        print(f"\n📊 r/{subreddit}")
+        print(description or "No data in the current window")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test script for the JSONL batch CLI (no API key needed)
+"""
+
+import io
+import json
+import random
+import threading
+import time
+from batch_cli import run_batch
+from degraded import DegradedText
+from generation_specs import SpecRunner
+from response_cache import ResponseCache
+
+class FakeRunner:
+    """Echoes the topic after a random delay so completion order differs from input order"""
+
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def run(self, spec: dict) -> str:
+        with self._lock:
+            self.calls += 1
+        time.sleep(random.random() / 100)
+        if spec.get("topic") == "fail":
+            raise RuntimeError("upstream failed")
+        return f"post about {spec['topic']}"
+
+    def render(self, spec: dict) -> dict:
+        return {"system_prompt": "system", "prompt": f"prompt for {spec['topic']}"}
+
+def make_input(count: int) -> io.StringIO:
+    lines = [json.dumps({"topic": f"topic {i}", "subreddit": "RoastMe"}) for i in range(count)]
+    lines.insert(3, "{not json")
+    lines.append(json.dumps({"topic": "fail", "subreddit": "RoastMe"}))
+    return io.StringIO("\n".join(lines) + "\n")
+
+def test_input_order():
+    """Results come back in input order with per-line errors"""
+    print("🧪 Testing input-order batch...")
+
+    output = io.StringIO()
+    counts = run_batch(make_input(20), output, runner=FakeRunner(), concurrency=4, default_kind="post")
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+
+    assert counts == {"processed": 22, "errors": 2}
+    assert [r["line"] for r in records] == list(range(1, 23))
+    assert records[0]["spec"]["kind"] == "post"
+    assert records[0]["result"] == "post about topic 0"
+    assert "Invalid JSON" in records[3]["error"]
+    assert "upstream failed" in records[-1]["error"]
+    print("✅ Input order works")
+
+def test_completion_order_and_cache():
+    """Completion order emits everything; the cache skips repeat work"""
+    print("\n🧪 Testing completion order and cache...")
+
+    cache = ResponseCache()
+    runner = FakeRunner()
+    output = io.StringIO()
+    run_batch(make_input(20), output, runner=runner, concurrency=4, order="completion", cache=cache,
+              default_kind="post")
+    lines = sorted(json.loads(line)["line"] for line in output.getvalue().splitlines())
+    assert lines == list(range(1, 23))
+
+    calls = runner.calls
+    output = io.StringIO()
+    run_batch(make_input(20), output, runner=runner, concurrency=4, cache=cache, default_kind="post")
+    assert runner.calls == calls + 1  # only the failing spec runs again
+    assert json.loads(output.getvalue().splitlines()[0])["cached"] is True
+    print("✅ Completion order and cache work")
+
+class FallbackAgent:
+    """Agent stub whose posts all come from the degraded fallback"""
+
+    def generate_post(self, topic, subreddit, post_type, max_words):
+        return DegradedText(f"Template post about {topic}", "template")
+
+def test_degraded_not_cached():
+    """Degraded fallbacks are reported as errors and never cached"""
+    print("\n🧪 Testing degraded results...")
+
+    cache = ResponseCache()
+    output = io.StringIO()
+    counts = run_batch(make_input(3), output, runner=SpecRunner(reddit_agent=FallbackAgent()), cache=cache,
+                       default_kind="post")
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert counts["errors"] == len(records) == 5
+    assert all("DegradedResultError" in r["error"] for r in records if r["line"] != 4)
+    assert cache.stats()["memory_items"] == 0
+    print("✅ Degraded results are not cached")
+
+def test_dry_run():
+    """Dry runs render prompts instead of generating"""
+    print("\n🧪 Testing dry run...")
+
+    runner = FakeRunner()
+    output = io.StringIO()
+    run_batch(make_input(3), output, runner=runner, dry_run=True, default_kind="post")
+    record = json.loads(output.getvalue().splitlines()[0])
+    assert record["prompt"] == "prompt for topic 0" and runner.calls == 0
+    print("✅ Dry run works")
+
+if __name__ == "__main__":
+    print("🚀 Batch CLI Test Suite")
+    print("=" * 40)
+
+    test_input_order()
+    test_completion_order_and_cache()
+    test_degraded_not_cached()
+    test_dry_run()
+
+    print("\n🎉 All batch CLI tests passed!")
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Test script for the budget ledger (no API key needed)
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+from budget import (
+    BudgetExceeded, BudgetLedger, Limit, add_budget_arguments, budget_from_args, estimate_cost
+)
+from upstream import create_chat_completion
+
+class UsageClient:
+    """Chat client stub reporting fixed token usage"""
+
+    def __init__(self):
+        self.models = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, max_tokens, temperature):
+        self.models.append(model)
+        usage = SimpleNamespace(prompt_tokens=1000, completion_tokens=500, total_tokens=1500)
+        message = SimpleNamespace(content="ok")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], model=model, usage=usage)
+
+def test_record_and_aggregate():
+    """Usage is aggregated per tenant, subreddit and model"""
+    print("🧪 Testing spend aggregation...")
+
+    ledger = BudgetLedger()
+    client = UsageClient()
+    spec = {"kind": "post", "subreddit": "RoastMe"}
+    for _ in range(3):
+        create_chat_completion(client, "gpt-4", "system", "prompt", 500, 0.7, spec=spec,
+                               budget=ledger, labels={"tenant": "acme"})
+
+    cost = 3 * estimate_cost("gpt-4", 1000, 500)
+    assert ledger.spend("tenant", "acme")["cost"] == round(cost, 6)
+    assert ledger.spend("subreddit", "RoastMe", "day")["tokens"] == 4500
+    assert ledger.spend("model", "gpt-4", "total")["calls"] == 3
+    assert ledger.spend("tenant", "acme")["reserved"] == 0
+    assert ledger.burn_rate("tenant", "acme") > 0
+    print("✅ Spend aggregation works")
+
+def test_limits():
+    """Soft limits downgrade, hard limits reject"""
+    print("\n🧪 Testing soft and hard limits...")
+
+    per_call = estimate_cost("gpt-4", 1000, 500)
+    ledger = BudgetLedger(limits=[
+        Limit("tenant", "acme", soft=per_call * 2, hard=per_call * 3),
+    ], downgrades={"gpt-4": "gpt-3.5-turbo"})
+    client = UsageClient()
+
+    for _ in range(2):
+        create_chat_completion(client, "gpt-4", "s", "p", 500, 0.7, budget=ledger, labels={"tenant": "acme"})
+    create_chat_completion(client, "gpt-4", "s", "p", 500, 0.7, budget=ledger, labels={"tenant": "acme"})
+    assert client.models == ["gpt-4", "gpt-4", "gpt-3.5-turbo"]
+    assert ledger.downgraded == 1
+
+    strict = BudgetLedger(limits=[Limit("campaign", "*", hard=per_call * 1.5)], downgrades={})
+    create_chat_completion(client, "gpt-4", "s", "p", 500, 0.7, budget=strict, labels={"campaign": "spring"})
+    try:
+        create_chat_completion(client, "gpt-4", "s", "p", 500, 0.7, budget=strict, labels={"campaign": "spring"})
+        raise AssertionError("hard limit not enforced")
+    except BudgetExceeded:
+        pass
+    create_chat_completion(client, "gpt-4", "s", "p", 500, 0.7, budget=strict, labels={"campaign": "summer"})
+    assert strict.rejected == 1
+    print("✅ Soft and hard limits work")
+
+def test_concurrent_reservations():
+    """Concurrent callers can't overshoot a hard limit together"""
+    print("\n🧪 Testing concurrent admission...")
+
+    per_call = estimate_cost("gpt-4", 250, 500)
+    ledger = BudgetLedger(limits=[Limit("tenant", "acme", hard=per_call * 10)], downgrades={})
+    admitted = []
+
+    def worker():
+        for _ in range(20):
+            try:
+                admitted.append(ledger.admit({"tenant": "acme"}, "gpt-4", 250, 500))
+            except BudgetExceeded:
+                pass
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(admitted) == 10
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ledger.json")
+        for admission in admitted:
+            ledger.record(admission, 250, 500)
+        ledger.save(path)
+        restored = BudgetLedger(path=path)
+        assert restored.spend("tenant", "acme") == ledger.spend("tenant", "acme")
+    print("✅ Concurrent admission works")
+
+def test_shared_ledger_file():
+    """Processes sharing a ledger file save in the background and merge, not overwrite"""
+    print("\n🧪 Testing ledger persistence...")
+
+    client = UsageClient()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ledger.json")
+        workers = [BudgetLedger(path=path, save_interval=0.05) for _ in range(2)]
+        for calls, ledger in zip((2, 3), workers):
+            for _ in range(calls):
+                create_chat_completion(client, "gpt-4", "system", "prompt", 500, 0.7,
+                                       budget=ledger, labels={"tenant": "acme"})
+
+        deadline = time.time() + 5
+        while BudgetLedger(path=path).spend("tenant", "acme")["calls"] < 5 and time.time() < deadline:
+            time.sleep(0.05)
+        assert BudgetLedger(path=path).spend("tenant", "acme")["calls"] == 5  # saved without save()
+        assert workers[0].spend("tenant", "acme")["calls"] == 5  # and each sees the other's spend
+
+        create_chat_completion(client, "gpt-4", "system", "prompt", 500, 0.7, budget=workers[1],
+                               labels={"tenant": "acme"})
+        for ledger in workers:
+            ledger.close()
+        spent = BudgetLedger(path=path).spend("tenant", "acme")
+        assert spent["calls"] == 6 and spent["cost"] == round(6 * estimate_cost("gpt-4", 1000, 500), 6)
+
+        parser = argparse.ArgumentParser()
+        add_budget_arguments(parser)
+        config = os.path.join(tmp, "budget.json")
+        with open(config, "w") as f:
+            f.write('{"limits": [{"dimension": "tenant", "hard": 1.0}]}')
+        ledger, labels = budget_from_args(parser.parse_args(
+            ["--budget-config", config, "--budget-ledger", path, "--budget-labels", "tenant=acme,campaign=spring"]
+        ))
+        assert labels == {"tenant": "acme", "campaign": "spring"}
+        assert ledger.limits[0].hard == 1.0 and ledger.spend("tenant", "acme")["calls"] == 6
+    print("✅ Ledger files are shared safely")
+
+def test_queue_wakeups():
+    """record/release skip the shared condition unless an admit is queued, and wake it when one is"""
+    print("\n🧪 Testing queued admission wake-ups...")
+
+    per_call = estimate_cost("gpt-4", 250, 500)
+    ledger = BudgetLedger(limits=[Limit("tenant", "acme", hard=per_call * 1.5, on_hard="queue")],
+                          downgrades={}, queue_timeout=5.0)
+    first = ledger.admit({"tenant": "acme"}, "gpt-4", 250, 500)
+
+    held, done = threading.Event(), threading.Event()
+    def hold_condition():
+        with ledger._changed:
+            held.set()
+            done.wait(5)
+    holder = threading.Thread(target=hold_condition)
+    holder.start()
+    held.wait()
+    releaser = threading.Thread(target=lambda: [ledger.release(ledger.admit({"tenant": "other"}, "gpt-4", 1, 1))
+                                                for _ in range(100)])
+    releaser.start()
+    releaser.join(2)
+    assert not releaser.is_alive()  # no waiters: didn't block on the held condition
+    done.set()
+    holder.join()
+
+    woke = []
+    waiter = threading.Thread(target=lambda: woke.append((ledger.admit({"tenant": "acme"}, "gpt-4", 250, 500),
+                                                          time.monotonic())))
+    waiter.start()
+    time.sleep(0.1)
+    released_at = time.monotonic()
+    ledger.release(first)
+    waiter.join(5)
+    assert woke and woke[0][1] - released_at < 0.5  # notified, not the 1s re-check
+    print("✅ Queued admission wake-ups work")
+
+def test_without_fcntl():
+    """budget imports and saves where fcntl doesn't exist (Windows)"""
+    print("\n🧪 Testing ledger saves without fcntl...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ledger.json")
+        script = (
+            "import sys; sys.modules['fcntl'] = None\n"
+            "from budget import BudgetLedger\n"
+            f"ledger = BudgetLedger(path={path!r})\n"
+            "ledger.record(ledger.admit({'tenant': 'acme'}, 'gpt-4', 10, 10), 10, 10)\n"
+            "ledger.close()\n"
+        )
+        subprocess.run([sys.executable, "-c", script], check=True,
+                       cwd=os.path.dirname(os.path.abspath(__file__)))
+        assert BudgetLedger(path=path).spend("tenant", "acme")["calls"] == 1
+    print("✅ Ledger saves work without fcntl")
+
+if __name__ == "__main__":
+    print("🚀 Budget Ledger Test Suite")
+    print("=" * 40)
+
+    test_record_and_aggregate()
+    test_limits()
+    test_concurrent_reservations()
+    test_shared_ledger_file()
+    test_queue_wakeups()
+    test_without_fcntl()
+
+    print("\n🎉 All budget ledger tests passed!")
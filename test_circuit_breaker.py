@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test script for the circuit breaker and degraded fallback (no API key needed)
+"""
+
+import time
+from types import SimpleNamespace
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, configure_breakers
+from degraded import DegradedFallback, is_degraded
+from response_cache import ResponseCache
+from upstream import create_chat_completion
+
+class FlakyClient:
+    """Chat client stub that fails while `down` is set"""
+
+    def __init__(self):
+        self.down = False
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, max_tokens, temperature):
+        self.calls += 1
+        if self.down:
+            raise ConnectionError("upstream unavailable")
+        message = SimpleNamespace(content=f"reply to {messages[1]['content']}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], model=model, usage=None)
+
+def test_breaker_states():
+    """Breaker opens on failures, fails fast, half-opens and recovers"""
+    print("🧪 Testing breaker state machine...")
+
+    breaker = CircuitBreaker("test", min_calls=4, failure_threshold=0.5, open_seconds=0.05, half_open_calls=2)
+    for failed in (False, True, False, True):
+        breaker.before_call()
+        breaker.record(0.01, failed=failed)
+    assert breaker.state == OPEN
+
+    try:
+        breaker.before_call()
+        raise AssertionError("open breaker let a call through")
+    except CircuitOpenError:
+        pass
+
+    time.sleep(0.06)
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    breaker.record(0.01, failed=False)
+    breaker.before_call()
+    breaker.record(0.01, failed=False)
+    assert breaker.state == CLOSED
+
+    slow = CircuitBreaker("slow", min_calls=2, slow_call_seconds=0.5, slow_call_threshold=0.5)
+    slow.record(1.0, failed=False)
+    slow.record(1.0, failed=False)
+    assert slow.state == OPEN
+    print("✅ Breaker state machine works")
+
+def test_degraded_fallback():
+    """An open circuit serves cached, then template answers without calling upstream"""
+    print("\n🧪 Testing degraded fallback...")
+
+    configure_breakers(min_calls=3, open_seconds=60)
+    client = FlakyClient()
+    fallback = DegradedFallback(cache=ResponseCache())
+    cached_spec = {"kind": "post", "topic": "cats", "subreddit": "RoastMe"}
+
+    completion = create_chat_completion(client, "flaky-model", "system", "cats", 100, 0.7, spec=cached_spec)
+    fallback.remember(cached_spec, completion.text)
+
+    client.down = True
+    for _ in range(2):
+        try:
+            create_chat_completion(client, "flaky-model", "system", "cats", 100, 0.7)
+        except ConnectionError:
+            pass
+
+    calls = client.calls
+    try:
+        create_chat_completion(client, "flaky-model", "system", "cats", 100, 0.7)
+        raise AssertionError("call went through an open circuit")
+    except CircuitOpenError:
+        assert client.calls == calls
+
+    served = fallback.get(cached_spec)
+    assert is_degraded(served) and served.source == "cache" and served == "reply to cats"
+    served = fallback.get({"kind": "post", "topic": "dogs", "subreddit": "RoastMe"})
+    assert served.source == "template" and "dogs" in served
+    assert fallback.get({"kind": "content", "prompt": "anything"}) is None
+    print("✅ Degraded fallback works")
+
+if __name__ == "__main__":
+    print("🚀 Circuit Breaker Test Suite")
+    print("=" * 40)
+
+    test_breaker_states()
+    test_degraded_fallback()
+
+    print("\n🎉 All circuit breaker tests passed!")
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Test script for the adaptive concurrency limiter (no API key needed)
+"""
+
+import heapq
+import random
+import time
+from types import SimpleNamespace
+from concurrency import AdaptiveLimiter, ConcurrencyLimitExceeded, get_limiter, is_overload
+from upstream import create_chat_completion
+
+class RateLimitError(Exception):
+    status_code = 429
+
+class FakeClock:
+    """Simulated monotonic clock, advanced by the test"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+def test_blocking_and_timeout():
+    """acquire() blocks at the limit and times out"""
+    print("🧪 Testing slot accounting...")
+
+    limiter = AdaptiveLimiter("test", initial=2)
+    limiter.acquire()
+    limiter.acquire()
+    try:
+        limiter.acquire(timeout=0.05)
+        assert False, "expected ConcurrencyLimitExceeded"
+    except ConcurrencyLimitExceeded:
+        pass
+    limiter.cancel()
+    limiter.acquire(timeout=0.05)
+    assert limiter.stats()["in_flight"] == 2 and limiter.stats()["acquire_timeouts"] == 1
+    print("✅ Slots block, time out and cancel")
+
+def test_aimd():
+    """Grows while busy and healthy, backs off on overload and on latency"""
+    print("\n🧪 Testing AIMD decisions...")
+
+    limiter = AdaptiveLimiter("test", initial=4)
+    for _ in range(40):
+        slots = limiter.stats()["limit"]
+        for _ in range(slots):
+            limiter.acquire()
+        for _ in range(slots):
+            limiter.release(0.01)
+    grown = limiter.stats()["limit"]
+    assert grown > 4, grown
+
+    limiter.acquire()
+    limiter.release(0.01, overloaded=True)
+    assert limiter.stats()["limit"] == grown // 2
+    assert limiter.stats()["recent_decisions"][-1][3] == "overload"
+
+    limiter = AdaptiveLimiter("test", initial=10, smoothing=1.0)
+    limiter.acquire()
+    limiter.release(0.01)
+    limiter.acquire()
+    limiter.release(0.5)  # 50x the baseline
+    assert limiter.stats()["limit"] == 9 and limiter.stats()["recent_decisions"][-1][3] == "latency"
+
+    # Per-token latency: a long completion at the same speed is not congestion
+    limiter = AdaptiveLimiter("test", initial=10, smoothing=1.0)
+    limiter.acquire()
+    limiter.release(0.1, tokens=10)
+    limiter.acquire()
+    limiter.release(1.0, tokens=100)
+    assert limiter.stats()["limit"] == 10
+
+    assert is_overload(RateLimitError()) and not is_overload(ValueError())
+    print(f"✅ AIMD works (grew 4 → {grown})")
+
+def test_converges_under_load():
+    """Against a simulated congested upstream, the limit settles near its capacity"""
+    print("\n🧪 Testing convergence against a congested upstream...")
+
+    # Calls take 10ms up to `capacity` in flight and slow down quadratically past it
+    capacity, base_latency = 6, 0.01
+    clock = FakeClock()
+    limiter = AdaptiveLimiter("congested-model", initial=30, clock=clock)
+    calls, started, loads = [], 0, []
+    while limiter.completed < 2000:
+        while limiter.in_flight < int(limiter.limit):  # clients always have more work queued
+            limiter.acquire()
+            load = limiter.in_flight
+            latency = base_latency * max(1.0, (load / capacity) ** 2)
+            started += 1
+            heapq.heappush(calls, (clock.now + latency, started, latency))
+        finished_at, _, latency = heapq.heappop(calls)
+        clock.now = finished_at
+        loads.append(limiter.in_flight)
+        limiter.release(latency)
+
+    stats = limiter.stats()
+    recent = loads[-1000:]
+    assert stats["decreases"] > 0 and stats["increases"] > 0
+    assert capacity // 2 <= stats["limit"] <= 2 * capacity, stats
+    assert capacity // 2 <= sum(recent) / len(recent) <= 2 * capacity
+    print(f"✅ Limit settled at {stats['limit']} for capacity {capacity} (started at 30)")
+
+def simulate(limiter, clock, latency_of, completions: int, rng):
+    """Run `completions` calls with clients always waiting, then drain; latency_of(tokens, in_flight)"""
+    calls, started = [], 0
+    target = limiter.completed + completions
+    while calls or limiter.completed < target:
+        while limiter.completed < target and limiter.in_flight < int(limiter.limit):
+            limiter.acquire()
+            tokens = 20 if rng.random() < 0.7 else 300
+            started += 1
+            latency = latency_of(tokens, limiter.in_flight)
+            heapq.heappush(calls, (clock.now + latency, started, tokens, latency))
+        finished_at, _, tokens, latency = heapq.heappop(calls)
+        clock.now = finished_at
+        limiter.release(latency, tokens=tokens)
+
+def test_mixed_lengths_are_not_congestion():
+    """A healthy upstream with a fixed per-call cost and mixed lengths keeps its limit; slowdowns still shrink it"""
+    print("\n🧪 Testing mixed short and long calls...")
+
+    # 0.8s per call plus 20ms per token, whatever the load; 70% 20-token and 30% 300-token calls
+    clock, rng = FakeClock(), random.Random(7)
+    limiter = AdaptiveLimiter("mixed-model", initial=8, max_limit=32, clock=clock)
+    simulate(limiter, clock, lambda tokens, load: 0.8 + 0.02 * tokens, 2000, rng)
+    healthy = limiter.stats()
+    assert healthy["decreases"] == 0 and healthy["limit"] >= 8, healthy
+    assert set(healthy["baseline_latency"]) == {"16-31 tokens", "256-511 tokens"}
+
+    # The same mix, now 3x slower past 8 in flight
+    simulate(limiter, clock, lambda tokens, load: (0.8 + 0.02 * tokens) * (3 if load > 8 else 1), 2000, rng)
+    congested = limiter.stats()
+    assert congested["decreases"] > 0 and congested["limit"] < healthy["limit"], congested
+    print(f"✅ Mixed lengths kept the limit at {healthy['limit']}; a slowdown cut it to {congested['limit']}")
+
+class IdleClient:
+    """Chat client stub that must never be called"""
+
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        raise AssertionError("called without a slot")
+
+def test_short_acquire_timeout():
+    """create_chat_completion(acquire_timeout=...) gives up quickly when the model's slots are taken"""
+    print("\n🧪 Testing a short acquire timeout...")
+
+    limiter = get_limiter("busy-model")
+    held = int(limiter.limit)
+    for _ in range(held):
+        limiter.acquire()
+    start = time.monotonic()
+    try:
+        create_chat_completion(IdleClient(), "busy-model", "system", "prompt", 100, 0.7, acquire_timeout=0.05)
+        assert False, "expected ConcurrencyLimitExceeded"
+    except ConcurrencyLimitExceeded:
+        pass
+    assert time.monotonic() - start < 1.0
+    for _ in range(held):
+        limiter.cancel()
+    print("✅ Short acquire timeouts shed load")
+
+if __name__ == "__main__":
+    print("🚀 Adaptive Concurrency Test Suite")
+    print("=" * 40)
+
+    test_blocking_and_timeout()
+    test_aimd()
+    test_converges_under_load()
+    test_mixed_lengths_are_not_congestion()
+    test_short_acquire_timeout()
+
+    print("\n🎉 All concurrency tests passed!")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test script for the precomputed content pools (no API key needed)
+"""
+
+import itertools
+import json
+import os
+import tempfile
+import time
+from content_pool import ContentPoolService, pool_key
+
+class FakeRunner:
+    """Stands in for SpecRunner so pools can be tested offline"""
+
+    def __init__(self):
+        self.counter = itertools.count()
+
+    def run(self, spec: dict) -> str:
+        return f"{spec['response_type']} comment #{next(self.counter)}"
+
+COMMENT_SPEC = {"kind": "comment", "original_post": "Roast me, I haven't slept in 3 days", "response_type": "humorous"}
+
+def test_pool_serving():
+    """Items are served once each and misses are counted"""
+    print("🧪 Testing pool serving...")
+
+    service = ContentPoolService(runner=FakeRunner(), refill_horizon=1)
+    key = pool_key("RoastMe", "humorous")
+    service.add_pool(key, COMMENT_SPEC, min_size=3, max_size=10)
+
+    assert service.get(key) is None  # empty pool is a miss
+    while service.refill_once():
+        pass
+
+    served = [service.get(key) for _ in range(3)]
+    assert len(set(served)) == 3  # never handed out twice
+    assert service.get(key) is None
+
+    stats = service.stats()["roastme/humorous/default"]
+    assert stats["hits"] == 3 and stats["misses"] == 2
+    assert stats["generated"] == 3
+    print(f"✅ Pool serving works: {stats}")
+
+def test_background_refill():
+    """Background workers top the pool back up"""
+    print("\n🧪 Testing background refill...")
+
+    service = ContentPoolService(runner=FakeRunner(), workers=2)
+    key = pool_key("RoastMe", "humorous", "deadpan")
+    service.add_pool(key, COMMENT_SPEC, min_size=5, max_size=10)
+    service.start()
+    try:
+        deadline = time.time() + 5
+        while service.stats()["roastme/humorous/deadpan"]["size"] < 5 and time.time() < deadline:
+            time.sleep(0.01)
+        assert service.get(key) is not None
+    finally:
+        service.stop()
+    print("✅ Background refill works")
+
+def test_from_config():
+    """A JSON config registers pools keyed by their spec, as POST /pool looks them up"""
+    print("\n🧪 Testing pool config loading...")
+
+    spec = dict(COMMENT_SPEC, subreddit="RoastMe", persona={"type": "comedian"})
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "pools.json")
+        with open(path, "w") as f:
+            json.dump({"workers": 1, "refill_horizon": 1, "pools": [{"spec": spec, "min_size": 2}]}, f)
+        service = ContentPoolService.from_config(path, runner=FakeRunner())
+
+    key = pool_key("RoastMe", "humorous", "comedian")
+    assert service.spec_for(key) == spec
+    assert service.spec_for(pool_key("RoastMe", "humorous")) is None
+    while service.refill_once():
+        pass
+    assert service.get(key) is not None
+    assert service.stats()["roastme/humorous/comedian"]["generated"] == 2
+    print("✅ Pools load from config")
+
+if __name__ == "__main__":
+    print("🚀 Content Pool Test Suite")
+    print("=" * 40)
+
+    test_pool_serving()
+    test_background_refill()
+    test_from_config()
+
+    print("\n🎉 All content pool tests passed!")
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test script for the local draft generator (no API key needed)
+"""
+
+import os
+import random
+import tempfile
+import time
+from draft_generator import SEED_POSTS, DraftGenerator, split_post
+
+def test_structure():
+    """Drafts follow the situation / Either-or / Probably both / invitation structure"""
+    print("🧪 Testing draft structure...")
+
+    assert split_post(SEED_POSTS[1])[1:] == ("I'm becoming a hermit", "society is avoiding me",
+                                             "Make me regret posting this.")
+    assert split_post("Just a normal post about my day.") is None
+
+    generator = DraftGenerator.default(seed=7, novelty=1.0)
+    for draft in generator.generate_many(200):
+        situation, a, b, invitation = split_post(draft)
+        assert situation and a and b and invitation
+
+    assert "gym" in generator.generate("gym").lower()
+    print("✅ Draft structure works")
+
+def test_save_load():
+    """Trained models round-trip through the array file"""
+    print("\n🧪 Testing save/load...")
+
+    generator = DraftGenerator.default(seed=1)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "drafts.bin")
+        generator.save(path)
+        loaded = DraftGenerator.load(path, seed=1)
+
+    assert loaded.vocab == generator.vocab and loaded.successors == generator.successors
+    assert loaded.generate_many(20) == generator.generate_many(20)
+    assert loaded.for_spec({"kind": "comment"}) is None
+    assert split_post(loaded.for_spec({"kind": "post", "topic": "plants"}))
+    print("✅ Save/load works")
+
+def test_speed():
+    """Drafts cost a small multiple of just picking one line from each bank"""
+    print("\n🧪 Testing generation speed...")
+
+    generator = DraftGenerator.default()
+    start = time.perf_counter()
+    generator.generate_many(20000)
+    per_draft = (time.perf_counter() - start) / 20000
+
+    # Same-run baseline, so machine speed and load cancel out; absolute numbers: `draft_generator.py bench`
+    choice = random.Random(1).choice
+    start = time.perf_counter()
+    for _ in range(20000):
+        f"{choice(generator.situations)}. Either {choice(generator.either_a)} or {choice(generator.either_b)}. " \
+            f"Probably both. {choice(generator.invitations)}"
+    baseline = (time.perf_counter() - start) / 20000
+
+    print(f"   {per_draft * 1e6:.1f} µs per draft ({per_draft / baseline:.1f}x template filling)")
+    assert per_draft < 50 * baseline
+    print("✅ Generation speed OK")
+
+if __name__ == "__main__":
+    print("🚀 Draft Generator Test Suite")
+    print("=" * 40)
+
+    test_structure()
+    test_save_load()
+    test_speed()
+
+    print("\n🎉 All draft generator tests passed!")
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Test script for the few-shot example index (no API key needed)
+"""
+
+import json
+import os
+import tempfile
+from example_index import ExampleIndex, build_example_index
+
+RECORDS = [
+    {"subreddit": "RoastMe", "id": "p1", "score": 900, "title": "Haven't left my apartment in 5 days. Probably both. Roast me"},
+    {"subreddit": "RoastMe", "id": "p2", "score": 400, "title": "Phone on Do Not Disturb for 3 days and nobody noticed"},
+    {"subreddit": "RoastMe", "id": "p3", "score": 5, "title": "Low scoring apartment post that should be filtered"},
+    {"subreddit": "RoastMe", "id": "c1", "score": 700, "body": "You look like your apartment smells like regret"},
+    {"subreddit": "RoastMe", "id": "c2", "score": 300, "body": "Even your phone needed a break from you"},
+    {"subreddit": "personalfinance", "id": "p4", "score": 250, "title": "Paid off my student loans in 3 years"},
+]
+
+def build_index(tmp: str) -> str:
+    dump = os.path.join(tmp, "dump.jsonl")
+    with open(dump, "w") as f:
+        for record in RECORDS:
+            f.write(json.dumps(record) + "\n")
+    index_dir = os.path.join(tmp, "index")
+    counts = build_example_index([dump], index_dir, min_score=50)
+    assert counts[("roastme", "post")] == 2
+    return index_dir
+
+def test_search():
+    """Similar high-scoring examples come back from the right shard"""
+    print("🧪 Testing example search...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = ExampleIndex(build_index(tmp))
+
+        posts = index.search("RoastMe", "stuck in my apartment all week", kind="post", k=2)
+        assert posts[0]["id"] == "p1"
+        assert all("filtered" not in p["text"] for p in posts)
+
+        comments = index.search("roastme", "my phone is always off", kind="comment", k=1)
+        assert comments[0]["id"] == "c2"
+
+        shard = index._shard("RoastMe", "post")
+        with open(os.path.join(shard.path, "meta.json")) as f:
+            assert "terms" not in json.load(f)  # the term table stays on disk
+        assert shard.lookup("apartment")[1] == 1 and shard.lookup("zzz") is None
+        assert all(shard.lookup(term) for term in ("days", "disturb", "roast"))
+
+        assert index.search("personalfinance", "loans", kind="comment") == []
+        assert index.search("unknownsub", "anything") == []
+        index.close()
+
+    print("✅ Example search works")
+
+if __name__ == "__main__":
+    print("🚀 Example Index Test Suite")
+    print("=" * 40)
+
+    test_search()
+
+    print("\n🎉 All example index tests passed!")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Test script for typed generation specs (no API key needed)
+"""
+
+import json
+from degraded import DegradedText
+from generation_specs import (
+    DegradedResultError, GenerationError, Optimization, Persona, RedditContentSpec, SpecRunner,
+    spec_fingerprint, validate_spec
+)
+
+SPEC = {
+    "kind": "reddit_content",
+    "topic": "student loan forgiveness success",
+    "subreddit": "personalfinance",
+    "persona": {"type": "everyman", "tone": "relatable", "credentials": ""},
+    "content_strategy": {"content_type": "personal_story", "viral_hook": "transformation"},
+    "optimization": {"title_strategy": {"hook_type": "specific_number", "include_credibility": True},
+                     "content_structure": {"include_tl_dr": False}},
+}
+
+def test_canonical_fingerprint():
+    """Equivalent dicts and typed specs share one fingerprint"""
+    print("🧪 Testing canonical fingerprints...")
+
+    spec = RedditContentSpec.from_dict(SPEC)
+    shuffled = json.loads(json.dumps(SPEC))
+    shuffled["persona"] = {"tone": " relatable ", "type": "everyman"}
+    del shuffled["optimization"]["content_structure"]
+
+    assert spec_fingerprint(shuffled) == spec_fingerprint(SPEC) == spec.fingerprint
+    assert RedditContentSpec.from_dict(shuffled) == spec
+    assert len({spec, RedditContentSpec.from_dict(shuffled)}) == 1
+    assert spec.persona.tone is Persona(tone="relatable").tone  # interned
+    print("✅ Canonical fingerprints work")
+
+def test_round_trip():
+    """Typed specs serialize to JSON and back"""
+    print("\n🧪 Testing JSON round trip...")
+
+    spec = RedditContentSpec.from_dict(SPEC)
+    restored = RedditContentSpec.from_json(spec.to_json())
+    assert restored == spec and restored.to_dict() == spec.to_dict()
+    assert spec.to_dict()["optimization"] == {"title_strategy": {"hook_type": "specific_number",
+                                                                 "include_credibility": True}}
+    assert not Optimization.from_dict({"content_structure": {"use_bullet_points": False}})
+    print("✅ JSON round trip works")
+
+def test_validation():
+    """Bad specs are rejected once, at construction"""
+    print("\n🧪 Testing validation...")
+
+    for bad in (
+        {**SPEC, "persona": {"typ": "expert"}},
+        {**SPEC, "persona": {"type": 3}},
+        {**SPEC, "optimization": {"title": {}}},
+        {**SPEC, "optimization": {"content_structure": {"include_tl_dr": "maybe"}}},
+        {**SPEC, "subreddit": ""},
+    ):
+        try:
+            validate_spec(bad)
+            raise AssertionError(f"accepted {bad}")
+        except ValueError:
+            pass
+
+    spec = RedditContentSpec.from_dict(SPEC)
+    try:
+        spec.topic = "changed"
+        raise AssertionError("spec is mutable")
+    except AttributeError:
+        pass
+    print("✅ Validation works")
+
+def test_legacy_dicts():
+    """The old dict API keeps working: extra keys ignored, scalars stringified, booleans parsed"""
+    print("\n🧪 Testing legacy dict arguments...")
+
+    spec = RedditContentSpec(
+        "budgeting", "personalfinance",
+        persona={"type": "expert", "credentials": 15, "avatar": "https://example.com/me.png"},
+        content_strategy={"content_type": "guide", "notes": ["ignored"]},
+        optimization={"title_strategy": {"hook_type": "question", "include_credibility": "false"},
+                      "content_structure": {"include_tl_dr": "yes", "font": "bold"}, "seo": {}}
+    )
+    assert spec.persona == Persona(type="expert", credentials="15")
+    assert spec.content_strategy.content_type == "guide"
+    assert spec.optimization == Optimization(hook_type="question", include_tl_dr=True)
+    assert not spec.optimization.include_credibility  # "false" is false
+
+    assert Optimization.from_dict({"content_structure": {"use_bullet_points": "False"}}) == Optimization()
+    try:
+        RedditContentSpec.from_dict({**SPEC, "persona": {"type": "expert", "avatar": "x"}})  # spec files stay strict
+        raise AssertionError("strict from_dict accepted an unknown field")
+    except ValueError:
+        pass
+    print("✅ Legacy dicts work")
+
+class FallbackAgent:
+    """Agent stub whose upstream is down: every post comes from the degraded fallback"""
+
+    def generate_post(self, topic, subreddit, post_type, max_words):
+        return DegradedText(f"Template post about {topic}", "template")
+
+def test_degraded_results_fail():
+    """A degraded fallback is a retryable failure, not a finished generation"""
+    print("\n🧪 Testing degraded results...")
+
+    runner = SpecRunner(reddit_agent=FallbackAgent())
+    try:
+        runner.run({"kind": "post", "topic": "budgets", "subreddit": "RoastMe"})
+        raise AssertionError("degraded result was returned as a success")
+    except DegradedResultError as e:
+        assert isinstance(e, GenerationError)
+        assert e.result == "Template post about budgets" and e.result.source == "template"
+    print("✅ Degraded results raise")
+
+if __name__ == "__main__":
+    print("🚀 Generation Spec Test Suite")
+    print("=" * 40)
+
+    test_canonical_fingerprint()
+    test_round_trip()
+    test_validation()
+    test_legacy_dicts()
+    test_degraded_results_fail()
+
+    print("\n🎉 All generation spec tests passed!")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test script for /generate HTTP caching (no API key or Flask needed)
+"""
+
+import gzip
+import json
+import os
+import tempfile
+from http_cache import HttpCache, choose_encoding, etag_matches, request_fingerprint
+from response_cache import ResponseCache
+
+def test_fingerprint():
+    """Key order and surrounding whitespace don't change the fingerprint"""
+    print("🧪 Testing request fingerprints...")
+
+    a = request_fingerprint("Write a tweet ", {"platform": "twitter", "tone": "casual"})
+    b = request_fingerprint("Write a tweet", {"tone": "casual", "platform": "twitter"})
+    assert a == b
+    assert a != request_fingerprint("Write a tweet", {"tone": "formal", "platform": "twitter"})
+    assert request_fingerprint("Hi") == request_fingerprint("Hi", {})
+    print("✅ Fingerprints are canonical")
+
+def test_conditional_requests():
+    """Cacheable responses revalidate with 304; degraded and failed ones are no-store"""
+    print("\n🧪 Testing ETags and Cache-Control...")
+
+    cache = HttpCache(max_age=600)
+    result = {"success": True, "content": "Hello", "degraded": False}
+    body = cache.store("fp", result)
+    assert cache.get("fp") == body
+
+    status, headers, payload = cache.respond(body, 200, True, {})
+    assert status == 200 and headers["Cache-Control"] == "private, max-age=600"
+    etag = headers["ETag"]
+    status, headers, payload = cache.respond(cache.get("fp"), 200, True, {"If-None-Match": etag}, hit=True)
+    assert status == 304 and payload == b"" and headers["X-Cache"] == "HIT"
+    assert etag_matches(f'"other", {etag[2:]}', etag)
+    assert not etag_matches('"other"', etag)
+
+    degraded = {"success": True, "content": "Template", "degraded": True}
+    body = cache.store("fp2", degraded)
+    assert cache.get("fp2") is None
+    status, headers, _ = cache.respond(body, 200, cache.cacheable(degraded), {"If-None-Match": "*"})
+    assert status == 200 and headers["Cache-Control"] == "no-store" and "ETag" not in headers
+    assert cache.bypass({"Cache-Control": "no-cache"}) and not cache.bypass({})
+    print("✅ Conditional requests work")
+
+def test_compression():
+    """Large bodies are compressed as Accept-Encoding allows; small ones are not"""
+    print("\n🧪 Testing compression...")
+
+    cache = HttpCache(min_compress_bytes=256)
+    body = cache.store("big", {"success": True, "content": "word " * 500})
+    status, headers, payload = cache.respond(body, 200, True, {"Accept-Encoding": "gzip, deflate"})
+    assert headers["Content-Encoding"] == "gzip" and headers["Vary"] == "Accept-Encoding"
+    assert json.loads(gzip.decompress(payload)) == json.loads(body)
+    assert int(headers["Content-Length"]) == len(payload) < len(body) / 5
+    print(f"✅ {len(body)} bytes → {len(payload)} bytes gzip")
+
+    _, headers, again = cache.respond(body, 200, True, {"Accept-Encoding": "gzip"})
+    assert again is payload  # memoized variant
+
+    _, headers, _ = cache.respond(body, 200, True, {"Accept-Encoding": "gzip;q=0, identity"})
+    assert "Content-Encoding" not in headers
+    small = cache.store("small", {"success": True, "content": "hi"})
+    _, headers, _ = cache.respond(small, 200, True, {"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in headers
+    assert choose_encoding("") is None
+    assert choose_encoding("*") in ("br", "gzip")
+    print("✅ Compression negotiation works")
+
+def test_shared_cache_across_fork():
+    """A cache built before a fork opens SQLite lazily, once per process"""
+    print("\n🧪 Testing a shared cache across fork...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = HttpCache(ResponseCache(os.path.join(tmp, "http.db")))
+        assert cache.cache._conn is None  # nothing opened at construction (import) time
+        cache.store("parent", {"success": True, "content": "from parent"})
+
+        pid = os.fork()
+        if pid == 0:
+            ok = cache.cache._connection() is not None and cache.cache._conn_pid == os.getpid()
+            cache.cache._memory.clear()
+            ok = ok and json.loads(cache.get("parent"))["content"] == "from parent"
+            cache.store("child", {"success": True, "content": "from child"})
+            os._exit(0 if ok else 1)
+        _, status = os.waitpid(pid, 0)
+        assert status == 0
+
+        assert json.loads(cache.get("child"))["content"] == "from child"  # written by the child's connection
+        cache.cache.close()
+    print("✅ Each process gets its own connection")
+
+if __name__ == "__main__":
+    print("🚀 HTTP Cache Test Suite")
+    print("=" * 40)
+
+    test_fingerprint()
+    test_conditional_requests()
+    test_compression()
+    test_shared_cache_across_fork()
+
+    print("\n🎉 All HTTP cache tests passed!")
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test script for the durable job queue (no API key needed)
+"""
+
+import os
+import tempfile
+import threading
+from generation_specs import GenerationError
+from job_queue import JobQueue, WorkerPool
+
+class FakeRunner:
+    """Fails on 'poison' topics, succeeds otherwise"""
+
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def run(self, spec: dict) -> str:
+        with self._lock:
+            self.calls += 1
+        if spec["topic"] == "poison":
+            raise GenerationError("Error generating post: upstream failed")
+        return f"post about {spec['topic']}"
+
+def make_specs(count: int) -> list:
+    specs = [{"kind": "post", "topic": f"topic {i}", "subreddit": "RoastMe"} for i in range(count)]
+    specs.append({"kind": "post", "topic": "poison", "subreddit": "RoastMe"})
+    return specs
+
+def test_run_and_quarantine():
+    """All good jobs complete; a failing job is quarantined after max_attempts"""
+    print("🧪 Testing run and quarantine...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = JobQueue(os.path.join(tmp, "jobs.db"), max_attempts=2, retry_delay=0)
+        assert queue.enqueue(make_specs(20)) == 21
+
+        runner = FakeRunner()
+        WorkerPool(queue, runner=runner, workers=4).run(progress_interval=0.5)
+
+        assert queue.counts() == {"pending": 0, "running": 0, "done": 20, "quarantined": 1}
+        assert runner.calls == 22  # 20 successes + 2 attempts at the poison item
+        results = {spec["topic"]: result for _, spec, result, _ in queue.results()}
+        assert results["topic 7"] == "post about topic 7"
+        queue.close()
+    print("✅ Run and quarantine work")
+
+def test_resume_skips_completed():
+    """A crash leaves in-flight jobs 'running'; resume redoes only those"""
+    print("\n🧪 Testing resume...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "jobs.db")
+        queue = JobQueue(path)
+        queue.enqueue(make_specs(5)[:5])
+
+        # Simulate a crash: two jobs done, one claimed but never finished
+        for _ in range(2):
+            job_id, spec = queue.claim("crashed-worker")
+            queue.complete(job_id, "done before crash")
+        queue.claim("crashed-worker")
+        queue.close()
+
+        resumed = JobQueue(path)
+        assert resumed.recover() == 1
+        runner = FakeRunner()
+        WorkerPool(resumed, runner=runner, workers=2).run(progress_interval=0.5)
+        assert runner.calls == 3
+        assert resumed.counts()["done"] == 5
+        resumed.close()
+    print("✅ Resume works")
+
+if __name__ == "__main__":
+    print("🚀 Job Queue Test Suite")
+    print("=" * 40)
+
+    test_run_and_quarantine()
+    test_resume_skips_completed()
+
+    print("\n🎉 All job queue tests passed!")
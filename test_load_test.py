@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test script for the load-testing harness (no API key or Flask needed)
+"""
+
+import json
+import os
+import random
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from load_test import (
+    ProcessMonitor, arrival_offsets, compare_to_baseline, run_load, start_mock_upstream, synthetic_schedule
+)
+
+class FakeApiHandler(BaseHTTPRequestHandler):
+    """Answers /generate with 200, or 503 for prompts containing 'shed'"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        status = 503 if "shed" in body["prompt"] else 200
+        self.send_response(status)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+def test_arrivals():
+    """Open-loop schedules follow the requested rate and mix"""
+    print("🧪 Testing arrival schedules...")
+
+    offsets = arrival_offsets(50, 20, random.Random(1))
+    assert 900 < len(offsets) < 1100 and offsets == sorted(offsets)
+
+    bursty = arrival_offsets(50, 20, random.Random(1), burst_every=10, burst_length=1, burst_factor=5)
+    in_bursts = sum(1 for t in bursty if t % 10 < 1)
+    assert in_bursts > 350  # ~250 per burst second vs ~50 otherwise
+
+    schedule = synthetic_schedule(20, 10, "mixed", seed=3)
+    prompts = [body["prompt"] for _, body in schedule]
+    assert len(set(prompts)) < len(prompts)  # repeated prompts are in the mix
+    print("✅ Arrival schedules work")
+
+def test_mock_upstream():
+    """The mock upstream answers like the chat completions API"""
+    print("\n🧪 Testing mock upstream...")
+
+    server = start_mock_upstream(latency=0.01, jitter=0)
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions",
+        data=json.dumps({"model": "gpt-4", "max_tokens": 50,
+                         "messages": [{"role": "user", "content": "hi"}]}).encode(),
+        headers={"Content-Type": "application/json"}
+    )
+    reply = json.loads(urllib.request.urlopen(request).read())
+    server.shutdown()
+    assert reply["choices"][0]["message"]["content"] and reply["usage"]["total_tokens"] > 0
+    print("✅ Mock upstream works")
+
+def test_run_load():
+    """run_load reports throughput, latency percentiles and shed rate"""
+    print("\n🧪 Testing load run...")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeApiHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    schedule = [(i * 0.01, {"prompt": "shed me" if i % 10 == 0 else "hello"}) for i in range(100)]
+
+    with ProcessMonitor(os.getpid(), interval=0.1) as monitor:
+        row = run_load(f"http://127.0.0.1:{server.server_address[1]}/generate", schedule)
+    server.shutdown()
+
+    assert row["requests"] == 100 and row["ok"] == 90
+    assert row["shed_rate"] == 0.1 and row["error_rate"] == 0
+    assert row["p50_ms"] <= row["p90_ms"] <= row["p99_ms"] <= row["max_ms"]
+    assert monitor.peak_rss > 0 and monitor.cpu_percent is not None
+
+    regressions = compare_to_baseline([{**row, "config": "a", "achieved_rps": row["achieved_rps"] / 2}],
+                                      [{**row, "config": "a"}], 0.1)
+    assert len(regressions) == 1
+    print("✅ Load run works")
+
+if __name__ == "__main__":
+    print("🚀 Load Test Harness Test Suite")
+    print("=" * 40)
+
+    test_arrivals()
+    test_mock_upstream()
+    test_run_load()
+
+    print("\n🎉 All load test harness tests passed!")
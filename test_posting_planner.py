@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Test script for the posting-time planner (no API key needed)
+"""
+
+from datetime import datetime, timezone
+from posting_planner import EngagementPlanner, hour_of_week
+
+MONDAY = datetime(2024, 1, 1, tzinfo=timezone.utc)  # a Monday, 00:00 UTC
+
+def test_hour_of_week():
+    """Slot 0 is Monday 00:00 UTC"""
+    print("🧪 Testing hour-of-week slots...")
+    assert hour_of_week(MONDAY.timestamp()) == 0
+    assert hour_of_week(MONDAY.timestamp() + 5 * 86400 + 14 * 3600) == 5 * 24 + 14
+    print("✅ Slots are correct")
+
+def test_schedule():
+    """Posts land in the best slots, spaced apart"""
+    print("\n🧪 Testing schedule...")
+
+    # Saturday 14:00 posts do far better than everything else
+    saturday_2pm = MONDAY.timestamp() + 5 * 86400 + 14 * 3600
+    records = []
+    for week in range(8):
+        for hour in range(168):
+            score = 500 if hour == 5 * 24 + 14 else 10
+            records.append({"subreddit": "RoastMe", "created_utc": MONDAY.timestamp() + (week * 168 + hour) * 3600,
+                            "score": score, "num_comments": 0})
+    records.append({"subreddit": "RoastMe", "created_utc": saturday_2pm, "body": "comments are ignored"})
+
+    planner = EngagementPlanner()
+    assert planner.ingest(records) == 8 * 168
+    assert planner.best_slots("roastme", 1)[0][0] == "Sat 14:00 UTC"
+
+    plan = planner.schedule(["a", "b", "c"], "RoastMe", start=MONDAY, min_gap_hours=4)
+    assert [item["post"] for item in plan] == ["a", "b", "c"]
+    assert "Sat 14:00 UTC" in [item["slot"] for item in plan]
+    hours = [datetime.fromisoformat(item["time"]).timestamp() / 3600 for item in plan]
+    assert all(b - a >= 4 for a, b in zip(hours, hours[1:]))
+
+    # More posts than fit in a week still get scheduled
+    unknown = planner.schedule(list(range(50)), "unknownsub", start=MONDAY, min_gap_hours=6)
+    assert len(unknown) == 50
+    print("✅ Schedule works")
+
+if __name__ == "__main__":
+    print("🚀 Posting Planner Test Suite")
+    print("=" * 40)
+
+    test_hour_of_week()
+    test_schedule()
+
+    print("\n🎉 All posting planner tests passed!")
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Test script for the semantic near-match cache (no API key needed)
+"""
+
+import os
+import tempfile
+import time
+from generation_specs import RedditContentSpec
+from semantic_cache import SemanticCache, cosine, topic_features
+
+def test_similarity():
+    """Reworded topics score high, unrelated topics low"""
+    print("🧪 Testing topic similarity...")
+
+    same = cosine(topic_features("budgeting tips for beginners"), topic_features("Beginner budgeting tips!"))
+    close = cosine(topic_features("budgeting tips for beginners"), topic_features("budget tips for a beginner"))
+    far = cosine(topic_features("budgeting tips for beginners"), topic_features("roast my cat's haircut"))
+    assert same > 0.99, same
+    assert close > 0.8, close
+    assert far < 0.3, far
+    print(f"✅ Similarity: reordered {same:.2f}, reworded {close:.2f}, unrelated {far:.2f}")
+
+def test_lookup_scope():
+    """Hits need the same subreddit, post_type and persona"""
+    print("\n🧪 Testing lookup scope...")
+
+    cache = SemanticCache(threshold=0.8)
+    cache.put(RedditContentSpec("budgeting tips for beginners", "personalfinance"), "stored post")
+
+    assert cache.get(RedditContentSpec("budgeting tips for beginners", "PersonalFinance"))[2] == "exact"
+    text, similarity, label = cache.get(RedditContentSpec("beginner budget tips", "personalfinance"))
+    assert text == "stored post" and label == "semantic" and similarity >= 0.8
+    assert cache.get(RedditContentSpec("beginner budget tips", "frugal")) is None
+    assert cache.get(RedditContentSpec("beginner budget tips", "personalfinance", "comment_reply")) is None
+    assert cache.get(RedditContentSpec("beginner budget tips", "personalfinance",
+                                       persona={"type": "expert"})) is None
+    assert cache.get(RedditContentSpec("retirement accounts explained", "personalfinance")) is None
+
+    stats = cache.stats()
+    assert stats["exact_hits"] == 1 and stats["semantic_hits"] == 1 and stats["misses"] == 4
+    print(f"✅ Scoped lookups work: {stats}")
+
+def test_numbers_and_negation_veto():
+    """Topics differing only in a number or a negation never match"""
+    print("\n🧪 Testing number and negation vetoes...")
+
+    cache = SemanticCache(threshold=0.8)
+    cache.put(RedditContentSpec("quitting my job", "personalfinance"), "quit post")
+    cache.put(RedditContentSpec("paid off 10000 in debt", "personalfinance"), "10k post")
+
+    assert cosine(topic_features("quitting my job"), topic_features("not quitting my job")) >= 0.8
+    assert cache.get(RedditContentSpec("not quitting my job", "personalfinance")) is None
+    assert cache.get(RedditContentSpec("I'm not quitting my job", "personalfinance")) is None
+    assert cache.get(RedditContentSpec("paid off 100000 in debt", "personalfinance")) is None
+    assert cache.get(RedditContentSpec("paid off 10000 of debt", "personalfinance"))[0] == "10k post"
+    assert cache.get(RedditContentSpec("Paid off 10,000 in debt!", "personalfinance"))[0] == "10k post"
+    assert cache.get(RedditContentSpec("Quitting my job!", "personalfinance"))[0] == "quit post"
+    print("✅ Number and negation vetoes work")
+
+PLANTS = ["tomato", "basil", "pepper", "cucumber", "lettuce", "carrot", "squash", "strawberry", "garlic", "onion"]
+TASKS = ["pruning", "watering", "fertilizer", "pests", "seedlings", "harvest", "compost", "mulch", "trellis", "soil"]
+SEASONS = ["spring", "summer", "autumn", "winter", "indoors", "balcony"]
+
+def test_index_eviction_and_persistence():
+    """LSH lookups find matches in large namespaces; LRU eviction; log replay"""
+    print("\n🧪 Testing index, eviction and persistence...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "semantic.jsonl")
+        cache = SemanticCache(path=path, max_entries=500)
+        topics = [f"{plant} {task} {season}" for plant in PLANTS for task in TASKS for season in SEASONS]
+        start = time.perf_counter()
+        for i, topic in enumerate(topics[:600]):
+            cache.put(RedditContentSpec(topic, "gardening"), f"post {i}")
+        insert_us = (time.perf_counter() - start) / 600 * 1e6
+
+        assert cache.stats()["entries"] == 500 and cache.stats()["evictions"] == 100
+        start = time.perf_counter()
+        hit = cache.get(RedditContentSpec(topics[599], "gardening"))
+        lookup_us = (time.perf_counter() - start) * 1e6
+        assert hit is not None and hit[0] == "post 599"
+        cache.compact()
+        cache.close()
+
+        restored = SemanticCache(path=path, max_entries=500)
+        assert restored.stats()["entries"] == 500
+        assert restored.get(RedditContentSpec(topics[599], "gardening"))[0] == "post 599"
+        restored.close()
+    print(f"✅ Index works: {insert_us:.0f} µs/insert, {lookup_us:.0f} µs/lookup over 500 entries")
+
+if __name__ == "__main__":
+    print("🚀 Semantic Cache Test Suite")
+    print("=" * 40)
+
+    test_similarity()
+    test_lookup_scope()
+    test_numbers_and_negation_veto()
+    test_index_eviction_and_persistence()
+
+    print("\n🎉 All semantic cache tests passed!")
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Test script for the pre-fork server (no API key or Flask needed)
+"""
+
+import glob
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+APP_SOURCE = '''
+import os
+
+SHARED = ["preloaded"] * 100000
+STARTED_IN = []
+
+def start_background():
+    STARTED_IN.append(os.getpid())
+
+def app(environ, start_response):
+    start_response("200 OK", [("Content-Type", "text/plain")])
+    started = "started" if STARTED_IN == [os.getpid()] else "not started"
+    return [f"{os.getpid()} {started}".encode()]
+'''
+
+TRACED_APP_SOURCE = '''
+import os
+import time
+
+from tracing import span, write
+
+def stop_background():
+    write()
+
+def app(environ, start_response):
+    with span("request"):
+        time.sleep(0.02)
+    start_response("200 OK", [("Content-Type", "text/plain")])
+    return [str(os.getpid()).encode()]
+'''
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def get(url: str, timeout: float = 10.0) -> str:
+    deadline = time.time() + timeout
+    while True:
+        try:
+            return urllib.request.urlopen(url, timeout=2).read().decode()
+        except OSError:
+            if time.time() > deadline:
+                raise
+            time.sleep(0.1)
+
+def test_prefork_and_recycle():
+    """Workers share one socket, and recycle after --max-requests"""
+    print("🧪 Testing pre-fork workers...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, "serve_test_app.py"), "w") as f:
+            f.write(APP_SOURCE)
+        port = free_port()
+        env = dict(os.environ, PYTHONPATH=tmp + os.pathsep + os.path.dirname(os.path.abspath(__file__)))
+        server = subprocess.Popen(
+            [sys.executable, "serve.py", "--app", "serve_test_app:app", "--port", str(port),
+             "--workers", "2", "--max-requests", "5"],
+            env=env, stderr=subprocess.PIPE, text=True
+        )
+        try:
+            pids = set()
+            for _ in range(40):
+                pid, started = get(f"http://127.0.0.1:{port}/").split(" ", 1)
+                assert started == "started"  # start_background() ran once, in this worker
+                pids.add(pid)
+                time.sleep(0.05)
+            assert str(server.pid) not in pids  # the parent never serves
+            assert len(pids) > 2, pids  # recycled workers were replaced
+        finally:
+            server.send_signal(signal.SIGTERM)
+            _, log = server.communicate(timeout=15)
+
+    assert "Preloaded serve_test_app:app" in log
+    assert "ready in" in log and "recycling: served" in log
+    print("✅ Pre-fork workers work")
+
+def test_worker_traces():
+    """Each worker restarts tracing after the fork and writes its own pid-suffixed files"""
+    print("🧪 Testing per-worker traces...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, "serve_traced_app.py"), "w") as f:
+            f.write(TRACED_APP_SOURCE)
+        port = free_port()
+        env = dict(os.environ, PYTHONPATH=tmp + os.pathsep + os.path.dirname(os.path.abspath(__file__)),
+                   AGENT_TRACE=os.path.join(tmp, "trace.json"), AGENT_PROFILE=os.path.join(tmp, "profile.txt"))
+        server = subprocess.Popen(
+            [sys.executable, "serve.py", "--app", "serve_traced_app:app", "--port", str(port),
+             "--workers", "2", "--max-requests", "5"],
+            env=env, stderr=subprocess.PIPE, text=True
+        )
+        try:
+            pids = {get(f"http://127.0.0.1:{port}/") for _ in range(12)}
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.communicate(timeout=15)
+
+        for pid in pids:
+            with open(os.path.join(tmp, f"trace.{pid}.json")) as f:
+                events = json.load(f)["traceEvents"]
+            spans = [e for e in events if e.get("name") == "request"]
+            assert spans and all(e["pid"] == int(pid) for e in spans), pid
+            with open(os.path.join(tmp, f"profile.{pid}.txt")) as f:
+                assert "serve_traced_app.py" in f.read()  # the worker's own profiler thread sampled it
+        assert len(glob.glob(os.path.join(tmp, "trace.*.json"))) >= len(pids)
+
+    print("✅ Per-worker traces work")
+
+if __name__ == "__main__":
+    print("🚀 Pre-fork Server Test Suite")
+    print("=" * 40)
+
+    test_prefork_and_recycle()
+    test_worker_traces()
+
+    print("\n🎉 All pre-fork server tests passed!")
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test script for the subreddit profile store (no API key needed)
+"""
+
+import os
+import random
+import tempfile
+from subreddit_profiles import SubredditProfileStore, ScoreDigest, CountMinSketch
+
+BASE_TIME = 1_700_000_000
+
+def make_records(count: int, start: int = BASE_TIME, step: int = 60) -> list:
+    """Synthetic RoastMe dump chunk: every fifth record is a submission"""
+    rng = random.Random(42)
+    records = []
+    for i in range(count):
+        record = {"subreddit": "RoastMe", "created_utc": start + i * step, "score": rng.randint(0, 200)}
+        if i % 5:
+            record["body"] = "you look like a tired potato with dad energy"
+        else:
+            record["title"] = "Either I'm lazy or I'm tired. Probably both. Roast me"
+        records.append(record)
+    return records
+
+def test_sketches():
+    """Count-min never undercounts and t-digest tracks quantiles"""
+    print("🧪 Testing sketches...")
+
+    sketch = CountMinSketch(width=256)
+    for i in range(1000):
+        sketch.add(f"phrase {i % 50}")
+    assert sketch.estimate("phrase 7") >= 20
+
+    digest = ScoreDigest()
+    for i in range(10001):
+        digest.add(i)
+    assert abs(digest.quantile(0.5) - 5000) < 100
+    assert abs(digest.quantile(0.9) - 9000) < 100
+    print("✅ Sketches look good")
+
+def test_rolling_window():
+    """New chunks merge in and old buckets expire"""
+    print("\n🧪 Testing rolling window...")
+
+    store = SubredditProfileStore(window_hours=24)
+    store.ingest(make_records(600))  # 10 hours of data
+    summary = store.summary("roastme")
+    assert summary["posts"] + summary["comments"] == 600
+    assert "tired potato" in summary["top_phrases"]
+
+    # A chunk 30 hours later pushes the first chunk out of the window
+    store.ingest(make_records(60, start=BASE_TIME + 40 * 3600))
+    summary = store.summary("RoastMe")
+    assert summary["posts"] + summary["comments"] == 60
+
+    description = store.describe("RoastMe")
+    assert description.startswith("Analysis of the last 24 hours of r/RoastMe data")
+    assert store.describe("personalfinance") is None
+    print(f"✅ Rolling window works:\n{description}")
+
+def test_persistence():
+    """Store round-trips through its JSON file"""
+    print("\n🧪 Testing persistence...")
+
+    store = SubredditProfileStore(window_hours=24)
+    store.ingest(make_records(300))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "profiles.json")
+        store.save(path)
+        reloaded = SubredditProfileStore(path)
+
+        assert reloaded.summary("RoastMe") == store.summary("RoastMe")
+        assert SubredditProfileStore(path, window_hours=6).window_hours == 6  # explicit argument wins
+    print("✅ Persistence works")
+
+def test_watermark_invalidates_other_subreddits():
+    """Cached summaries of untouched subreddits follow the watermark"""
+    print("\n🧪 Testing summary cache invalidation...")
+
+    store = SubredditProfileStore(window_hours=24, retention_hours=72)
+    store.ingest([{"subreddit": "A", "created_utc": BASE_TIME, "body": "only comment", "score": 1}])
+    assert store.summary("A")["comments"] == 1
+
+    store.ingest([{"subreddit": "B", "created_utc": BASE_TIME + 48 * 3600, "body": "later", "score": 1}])
+    assert store.summary("A") is None
+    print("✅ Summaries are invalidated when the watermark moves")
+
+if __name__ == "__main__":
+    print("🚀 Subreddit Profile Store Test Suite")
+    print("=" * 40)
+
+    test_sketches()
+    test_rolling_window()
+    test_persistence()
+    test_watermark_invalidates_other_subreddits()
+
+    print("\n🎉 All profile store tests passed!")
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Test script for whole-thread reply generation (no API key needed)
+"""
+
+import json
+import re
+from types import SimpleNamespace
+import pytest
+from thread_replies import (
+    MAX_AVOID, avoid_block_tokens, build_thread_prompt, parse_replies, parse_thread, plan_chunks, select_targets
+)
+
+def comment(id, body, score=1, replies=None):
+    data = {"id": id, "author": f"user_{id}", "body": body, "score": score, "parent_id": None, "replies": ""}
+    if replies:
+        data["replies"] = {"kind": "Listing", "data": {"children": replies}}
+    return {"kind": "t1", "data": data}
+
+API_THREAD = [
+    {"kind": "Listing", "data": {"children": [{"kind": "t3", "data": {
+        "id": "p1", "subreddit": "RoastMe", "title": "29, still live with my mom",
+        "selftext": "Do your worst."}}]}},
+    {"kind": "Listing", "data": {"children": [
+        comment("a", "Your mom charges you rent in chores", 50, [comment("a1", "lol accurate", 5)]),
+        comment("b", "That haircut is a cry for help", 80),
+        comment("c", "[deleted]", 3),
+        {"kind": "more", "data": {"children": ["x", "y"]}},
+    ]}},
+]
+
+def test_parse_shapes():
+    """API listings, flat dump records and nested dicts parse to the same structure"""
+    print("🧪 Testing thread parsing...")
+
+    post, comments = parse_thread(API_THREAD)
+    assert post["id"] == "p1" and [c.id for c in comments] == ["a", "a1", "b", "c"]
+    assert [c.depth for c in comments] == [0, 1, 0, 0]
+    assert comments[1].parent_id == "a" and comments[3].body == ""
+    assert [c.id for c in select_targets(comments)] == ["b", "a"]
+
+    flat = [
+        {"id": "p1", "title": "Roast my desk"},
+        {"id": "r1", "parent_id": "t1_t1", "body": "reply", "score": 2},
+        {"id": "t1", "parent_id": "t3_p1", "body": "top", "score": 9},
+    ]
+    post, comments = parse_thread(flat)
+    assert post["title"] == "Roast my desk"
+    assert {c.id: c.depth for c in comments} == {"r1": 1, "t1": 0}
+
+    nested = {"title": "Roast me", "comments": [{"body": "one", "replies": [{"body": "two"}]}, {"body": "three"}]}
+    post, comments = parse_thread(nested)
+    assert [(c.body, c.depth) for c in comments] == [("one", 0), ("two", 1), ("three", 0)]
+    assert comments[1].parent_id == comments[0].id
+    print("✅ All thread shapes parse")
+
+def test_chunking():
+    """Thousands of comments split into budgeted chunks, siblings kept together"""
+    print("\n🧪 Testing chunking...")
+
+    post = {"title": "Roast my 40 houseplants", "selftext": "They're all dying. " * 50}
+    parents = [comment(f"p{i}", f"Top-level roast number {i} about plants", 10,
+                       [comment(f"p{i}r{j}", f"Reply {j} to roast {i}: " + "words " * 20) for j in range(9)])
+               for i in range(300)]
+    thread = [API_THREAD[0], {"kind": "Listing", "data": {"children": parents}}]
+    thread[0]["data"]["children"][0]["data"] = dict(post, id="p")
+    post, comments = parse_thread(thread)
+    by_id = {c.id: c for c in comments}
+    assert len(comments) == 3000
+
+    targets = select_targets(comments, max_depth=1)
+    chunks = plan_chunks(targets, by_id, post, max_prompt_tokens=3000, max_per_chunk=25,
+                         avoid_tokens=avoid_block_tokens(15))
+    assert sum(len(chunk) for chunk in chunks) == 3000
+    assert all(len(chunk) <= 25 for chunk in chunks)
+    written = [f"Earlier reply {i}: " + "joke " * 13 for i in range(MAX_AVOID)]  # a full list of 15-word replies
+    for chunk in chunks:
+        prompt = build_thread_prompt(post, chunk, by_id, "humorous", 15, "RoastMe", avoid=written)
+        assert len(prompt) / 4 <= 3000, len(prompt)
+        assert prompt.count("They're all dying") <= 50  # the post appears once per call
+
+    # Siblings of one parent land in the same chunk (unless the parent has more than a chunk's worth)
+    split = sum(len({i for i, chunk in enumerate(chunks) for c in chunk if c.parent_id == f"p{n}"}) > 1
+                for n in range(300))
+    assert split < len(chunks), split
+    print(f"✅ 3000 comments → {len(chunks)} calls instead of 3000")
+
+def test_prompt_and_parsing():
+    """Prompts list earlier replies; answers parse from JSON or numbered lines"""
+    print("\n🧪 Testing prompts and reply parsing...")
+
+    post, comments = parse_thread(API_THREAD)
+    by_id = {c.id: c for c in comments}
+    chunk = [by_id["b"], by_id["a1"]]
+    prompt = build_thread_prompt(post, chunk, by_id, "humorous", 12, "RoastMe", avoid=["Your couch has seniority"])
+    assert '[1] u/user_b: "That haircut is a cry for help"' in prompt
+    assert 'replying to: "Your mom charges you rent in chores"' in prompt
+    assert "Your couch has seniority" in prompt and "12 words" in prompt
+
+    assert parse_replies('Sure! {"1": "First", "2": " Second "}', 2) == {1: "First", 2: "Second"}
+    assert parse_replies('{"1": "Only one", "7": "out of range"}', 2) == {1: "Only one"}
+    assert parse_replies('1. "Alpha"\n[2] Beta', 2) == {1: "Alpha", 2: "Beta"}
+    assert parse_replies("no idea", 2) == {}
+    print("✅ Prompts and parsing work")
+
+JOKES = [
+    "Your mom charging chore rent is the only lease you have ever kept",
+    "That haircut looks like it lost a bet with a lawnmower",
+    "Even your houseplants filed for emancipation last spring",
+    "Your credit score called, it wants to move out too",
+    "The barber saw you coming and took the day off",
+    "At this point the basement should be listed as your permanent address",
+]
+
+class ThreadClient:
+    """Chat client stub answering every numbered comment; its first answer repeats one joke and skips a comment"""
+
+    def __init__(self):
+        self.calls = 0
+        self.jokes = iter(JOKES)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, max_tokens, temperature):
+        self.calls += 1
+        numbers = sorted({int(n) for n in re.findall(r"^\[(\d+)\]", messages[1]["content"], re.MULTILINE)})
+        answer = {str(n): next(self.jokes) for n in numbers}
+        if self.calls == 1:
+            answer[str(numbers[-1])] = answer[str(numbers[-2])]  # same joke twice
+            answer.pop(str(numbers[0]))  # and forget one comment
+        message = SimpleNamespace(content=json.dumps(answer))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], model=model, usage=None)
+
+def test_agent_thread_replies():
+    """RedditAgent answers a thread in one call plus one retry for the gaps and duplicates"""
+    print("\n🧪 Testing RedditAgent.generate_thread_replies...")
+    create_agent = pytest.importorskip("create_agent")
+    from dedup_index import DuplicateIndex
+
+    dedup = DuplicateIndex()  # empty: the repeated joke is caught within the thread itself
+    client = ThreadClient()
+    agent = create_agent.RedditAgent(client=client, dedup_index=dedup)
+    replies = agent.generate_thread_replies(API_THREAD, targets=["a", "a1", "b", "c"])
+    assert list(replies) == ["a", "a1", "b"]  # deleted comment skipped, target order kept
+    assert client.calls == 2
+    assert len(set(replies.values())) == 3 and set(replies.values()) <= set(JOKES), replies
+    assert len(dedup) == 3
+
+    try:
+        agent.generate_thread_replies("not a thread")
+        raise AssertionError("unparseable thread did not raise")
+    except ValueError:
+        pass
+    print(f"✅ {len(replies)} replies in {client.calls} calls")
+
+if __name__ == "__main__":
+    print("🚀 Thread Replies Test Suite")
+    print("=" * 40)
+
+    test_parse_shapes()
+    test_chunking()
+    test_prompt_and_parsing()
+    try:
+        test_agent_thread_replies()
+    except pytest.skip.Exception as e:
+        print(f"⚠️ Skipped: {e}")
+
+    print("\n🎉 All thread reply tests passed!")
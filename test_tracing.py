@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Test script for trace spans and the sampling profiler (no API key needed)
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+import tracing
+from upstream import create_chat_completion
+
+class EchoClient:
+    """Chat client stub that answers after a short delay"""
+
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, max_tokens, temperature):
+        time.sleep(0.02)
+        message = SimpleNamespace(content=messages[1]["content"])
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], model=model, usage=None)
+
+def test_disabled_is_noop():
+    """With tracing off, span() hands back the shared no-op object"""
+    print("🧪 Testing disabled tracing...")
+
+    assert not tracing.enabled()
+    assert tracing.span("anything", size=1) is tracing.NOOP_SPAN
+
+    @tracing.traced()
+    def add(a, b):
+        return a + b
+
+    def plain_add(a, b):
+        return a + b
+
+    class NullContext:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+    null = NullContext()
+
+    def null_span(name):
+        return null
+
+    def per_call(open_span, call) -> float:
+        start = time.perf_counter()
+        for _ in range(100000):
+            with open_span("stage"):
+                call(1, 2)
+        return (time.perf_counter() - start) / 100000
+
+    # Compared with a hand-written no-op in the same run, so machine speed and load cancel out
+    baseline = min(per_call(null_span, plain_add) for _ in range(3))
+    disabled = min(per_call(tracing.span, add) for _ in range(3))
+    print(f"   {disabled * 1e9:.0f} ns per disabled span + traced call ({disabled / baseline:.1f}x a bare no-op)")
+    assert disabled < 10 * baseline
+    print("✅ Disabled tracing is a no-op")
+
+def test_trace_and_profile():
+    """Enabled spans export as Chrome trace events; samples as collapsed stacks"""
+    print("\n🧪 Testing trace export and profiler...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        trace_path = os.path.join(tmp, "trace.json")
+        profile_path = os.path.join(tmp, "profile.folded")
+        argv = tracing.configure_from_argv(["batch", "--trace", trace_path, f"--profile={profile_path}", "specs.jsonl"])
+        assert argv == ["batch", "specs.jsonl"] and tracing.enabled()
+
+        with tracing.span("generate", kind="post"):
+            create_chat_completion(EchoClient(), "echo-model", "system", "hello", 10, 0.7)
+        tracing.write()
+        tracing.disable()
+
+        with open(trace_path) as f:
+            events = [e for e in json.load(f)["traceEvents"] if e["ph"] == "X"]
+        names = [e["name"] for e in events]
+        assert {"generate", "upstream.request", "upstream.parse"} <= set(names)
+        request = events[names.index("upstream.request")]
+        assert request["dur"] >= 20000 and request["args"]["model"] == "echo-model"
+
+        with open(profile_path) as f:
+            lines = f.read().splitlines()
+        assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+        assert any("create (test_tracing.py" in line for line in lines)
+    print("✅ Trace export and profiler work")
+
+def test_bad_interval_falls_back():
+    """A malformed AGENT_PROFILE_INTERVAL_MS doesn't break importing the module"""
+    print("\n🧪 Testing a bad profile interval...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        profile_path = os.path.join(tmp, "profile.folded")
+        env = dict(os.environ, AGENT_PROFILE=profile_path, AGENT_PROFILE_INTERVAL_MS="fast")
+        env.pop("AGENT_TRACE", None)
+        result = subprocess.run(
+            [sys.executable, "-c", "import tracing; print(tracing._profiler.interval)"],
+            env=env, cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True
+        )
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == "0.005" and "Ignoring AGENT_PROFILE_INTERVAL_MS" in result.stderr
+    print("✅ Bad intervals fall back to the default")
+
+if __name__ == "__main__":
+    print("🚀 Tracing Test Suite")
+    print("=" * 40)
+
+    test_disabled_is_noop()
+    test_trace_and_profile()
+    test_bad_interval_falls_back()
+
+    print("\n🎉 All tracing tests passed!")
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Thread Replies - reply to many comments of one Reddit thread per upstream call
+
+parse_thread() normalizes a thread into its post and a flat list of
+comments. It accepts three shapes:
+- the Reddit API JSON of a submission page ([post listing, comment listing])
+- a flat list of dump records linked by parent_id
+- a nested {"title", "selftext", "comments": [{"body", "replies": [...]}]}
+
+plan_chunks() packs the comments to answer into chunks that fit a prompt
+token budget, less the room reserved for the list of earlier replies.
+Siblings are kept together so one call sees all of them.
+build_thread_prompt() sends the post once per chunk, gives each comment a
+short snippet of its parent, and asks for a JSON object of numbered
+replies. It also lists the replies written for earlier chunks so their
+jokes aren't reused. parse_replies() reads the answer back.
+"""
+
+import json
+import re
+from budget import estimate_prompt_tokens
+from subreddit_profiles import record_text
+
+RESPONSE_GUIDANCE = {
+    "helpful": "Provide constructive, actionable advice",
+    "supportive": "Offer encouragement and emotional support",
+    "humorous": "Use appropriate humor while being helpful",
+    "insightful": "Share valuable insights or perspectives"
+}
+
+# Earlier replies listed in each prompt so their jokes aren't reused
+MAX_AVOID = 30
+
+NUMBERED_LINE_RE = re.compile(r"^\s*\[?(\d+)[\].:)]\s*(.+?)\s*$", re.MULTILINE)
+
+
+class Comment:
+    """One comment of a thread"""
+
+    __slots__ = ("id", "parent_id", "author", "body", "score", "depth")
+
+    def __init__(self, id, parent_id, author, body, score, depth):
+        self.id = id
+        self.parent_id = parent_id
+        self.author = author
+        self.body = body
+        self.score = score
+        self.depth = depth
+
+
+def _short_id(fullname):
+    """'t1_abc' / 't3_abc' -> 'abc'"""
+    if isinstance(fullname, str) and fullname[:3] in ("t1_", "t3_"):
+        return fullname[3:]
+    return fullname
+
+
+def _comment(data: dict, parent_id, depth: int) -> Comment:
+    return Comment(
+        id=str(data.get("id")),
+        parent_id=_short_id(data.get("parent_id")) or parent_id,
+        author=data.get("author"),
+        body=" ".join(record_text(data).split()),
+        score=data.get("score") or 0,
+        depth=depth
+    )
+
+
+def _walk_listing(listing: dict, parent_id, depth: int, out: list):
+    for child in listing.get("data", {}).get("children", []):
+        if child.get("kind") != "t1":
+            continue  # "more" stubs: their comments aren't in the payload
+        comment = _comment(child["data"], parent_id, depth)
+        out.append(comment)
+        replies = child["data"].get("replies")
+        if isinstance(replies, dict):
+            _walk_listing(replies, comment.id, depth + 1, out)
+
+
+def _walk_nested(items: list, parent_id, depth: int, out: list):
+    for item in items:
+        item = dict(item)
+        item.setdefault("id", f"c{len(out)}")
+        comment = _comment(item, parent_id, depth)
+        out.append(comment)
+        _walk_nested(item.get("replies") or [], comment.id, depth + 1, out)
+
+
+def parse_thread(data) -> tuple:
+    """(post dict, comments in thread order) from any of the supported shapes"""
+    comments = []
+    if isinstance(data, list) and data and all(isinstance(x, dict) and x.get("kind") == "Listing" for x in data):
+        children = data[0]["data"]["children"]
+        post = children[0]["data"] if children else {}
+        if len(data) > 1:
+            _walk_listing(data[1], post.get("id"), 0, comments)
+    elif isinstance(data, list):
+        post = next((record for record in data if "body" not in record), {})
+        comments = [_comment(record, post.get("id"), 0) for record in data if "body" in record]
+        by_id = {comment.id: comment for comment in comments}
+        for comment in comments:
+            depth, parent, seen = 0, by_id.get(comment.parent_id), set()
+            while parent is not None and parent.id not in seen:
+                seen.add(parent.id)
+                depth += 1
+                parent = by_id.get(parent.parent_id)
+            comment.depth = depth
+    else:
+        post = data
+        _walk_nested(data.get("comments") or [], data.get("id"), 0, comments)
+    return post, comments
+
+
+def select_targets(comments: list, max_depth: int = 0, min_score: int = None, limit: int = None) -> list:
+    """Comments worth answering: readable, shallow enough, highest score first"""
+    selected = [
+        comment for comment in comments
+        if comment.body and comment.depth <= max_depth and (min_score is None or comment.score >= min_score)
+    ]
+    selected.sort(key=lambda comment: -comment.score)
+    return selected[:limit] if limit else selected
+
+
+def post_text(post: dict, max_chars: int = 1500) -> str:
+    text = " ".join(record_text(post).split())
+    return text[:max_chars] + ("..." if len(text) > max_chars else "")
+
+
+def _snippet(text: str, max_chars: int) -> str:
+    return text[:max_chars] + ("..." if len(text) > max_chars else "")
+
+
+def comment_line(number: int, comment: Comment, by_id: dict, max_chars: int = 400) -> str:
+    """'[n] u/author (replying to: "...") "body"' for the prompt"""
+    parent = by_id.get(comment.parent_id)
+    context = f' (replying to: "{_snippet(parent.body, 150)}")' if parent is not None and parent.body else ""
+    return f'[{number}] u/{comment.author or "anonymous"}{context}: "{_snippet(comment.body, max_chars)}"'
+
+
+def plan_chunks(
+    targets: list,
+    by_id: dict,
+    post: dict,
+    max_prompt_tokens: int = 3000,
+    max_per_chunk: int = 20,
+    overhead_tokens: int = 400,
+    avoid_tokens: int = 0
+) -> list:
+    """
+    Split targets into chunks whose prompts fit max_prompt_tokens, siblings together
+
+    avoid_tokens reserves room in every prompt for the earlier replies
+    build_thread_prompt() lists (see avoid_block_tokens()).
+    """
+    parent_order = {}
+    for comment in targets:
+        parent_order.setdefault(comment.parent_id, len(parent_order))
+    ordered = sorted(targets, key=lambda comment: parent_order[comment.parent_id])
+
+    shared = estimate_prompt_tokens(post_text(post)) + overhead_tokens + avoid_tokens
+    chunks, current, used = [], [], shared
+    for comment in ordered:
+        cost = estimate_prompt_tokens(comment_line(len(current) + 1, comment, by_id))
+        if current and (used + cost > max_prompt_tokens or len(current) >= max_per_chunk):
+            chunks.append(current)
+            current, used = [], shared
+        current.append(comment)
+        used += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def build_thread_prompt(
+    post: dict,
+    chunk: list,
+    by_id: dict,
+    response_type: str,
+    max_words: int,
+    subreddit: str,
+    avoid: list = ()
+) -> str:
+    """One prompt answering every comment of a chunk"""
+    lines = "\n".join(comment_line(number, comment, by_id) for number, comment in enumerate(chunk, 1))
+    avoid_block = ""
+    if avoid:
+        used = "\n".join(f'- "{reply}"' for reply in avoid)
+        avoid_block = f"\nReplies already posted in this thread (don't reuse their jokes, angles or phrases):\n{used}\n"
+
+    return f"""Reddit thread in r/{subreddit}:
+
+POST: "{post_text(post)}"
+
+Write one reply to each numbered comment below.
+
+Response Type: {RESPONSE_GUIDANCE.get(response_type, 'Be helpful and engaging')}
+
+Requirements:
+- Keep each reply to {max_words} words maximum
+- Reply to that comment specifically, using the post as shared context
+- Every reply needs its own joke, angle and comparison: never repeat a punchline, analogy or key phrase across replies
+- Use minimal Reddit formatting (one **bold** word max)
+{avoid_block}
+Comments:
+{lines}
+
+Answer with only a JSON object mapping each comment number to its reply, e.g. {{"1": "...", "2": "..."}}"""
+
+
+def reply_max_tokens(count: int, max_words: int) -> int:
+    """Completion budget for `count` replies of up to max_words words"""
+    return count * (max_words * 2 + 12) + 20
+
+
+def avoid_block_tokens(max_words: int, count: int = MAX_AVOID) -> int:
+    """Prompt tokens the list of `count` earlier replies of up to max_words words can take"""
+    return reply_max_tokens(count, max_words) + 20  # plus the block's heading
+
+
+def parse_replies(text: str, count: int) -> dict:
+    """{number: reply} from the model's answer; numbers outside 1..count are dropped"""
+    replies = {}
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end > start:
+        try:
+            data = json.loads(text[start:end + 1])
+            replies = {int(key): str(value) for key, value in data.items() if str(key).strip().isdigit()}
+        except (ValueError, AttributeError):
+            replies = {}
+    if not replies:
+        replies = {int(number): reply for number, reply in NUMBERED_LINE_RE.findall(text)}
+    return {
+        number: reply.strip().strip('"').strip()
+        for number, reply in replies.items()
+        if 1 <= number <= count and reply.strip().strip('"').strip()
+    }
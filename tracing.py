@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Tracing - opt-in trace spans and a sampling profiler for the generation path
+
+Spans mark the stages of a generation (prompt building, client setup,
+upstream request, response parsing, Flask handling...). They are recorded
+only while tracing is enabled and export as Chrome trace event JSON, which
+opens in chrome://tracing, Perfetto or speedscope. When tracing is off,
+span() returns a shared no-op object and @traced costs one global check.
+
+The sampling profiler snapshots every thread's stack every few
+milliseconds and writes collapsed stacks ("a;b;c 42" per line), the input
+format of flamegraph.pl and speedscope.
+
+Enable with environment variables:
+    AGENT_TRACE=trace.json AGENT_PROFILE=profile.folded python content_agent.py
+    AGENT_PROFILE_INTERVAL_MS=2   (default 5)
+or the --trace PATH / --profile PATH flags of the agent CLIs. Output is
+written at exit (or call write()).
+
+A forked child (e.g. a serve.py worker) starts over with its own tracer
+and profiler thread, and writes to the configured paths with its pid
+added (trace.1234.json), so workers don't overwrite each other.
+serve.py workers leave through os._exit(), so the app writes them from
+its stop_background().
+"""
+
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+_tracer = None
+_profiler = None
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "args", "start")
+
+    def __init__(self, tracer, name: str, args: dict):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        if exc_type is not None:
+            self.set(error=exc_type.__name__)
+        self.tracer.add(self.name, self.start, end, self.args)
+        return False
+
+    def set(self, **args):
+        """Attach extra args to the span (e.g. sizes known only at the end)"""
+        if self.args is None:
+            self.args = {}
+        self.args.update(args)
+
+
+class Tracer:
+    """Collects complete ("X") trace events in memory"""
+
+    def __init__(self, max_events: int = 1_000_000):
+        self.max_events = max_events
+        self.events = []
+        self.dropped = 0
+        self._origin = time.perf_counter_ns()
+        self._thread_names = {}
+
+    def add(self, name: str, start_ns: int, end_ns: int, args: dict = None):
+        if len(self.events) >= self.max_events:
+            self.dropped += 1
+            return
+        thread = threading.current_thread()
+        self._thread_names[thread.ident] = thread.name
+        event = {
+            "name": name,
+            "ph": "X",
+            "ts": (start_ns - self._origin) / 1000,
+            "dur": (end_ns - start_ns) / 1000,
+            "pid": os.getpid(),
+            "tid": thread.ident,
+        }
+        if args:
+            event["args"] = args
+        self.events.append(event)
+
+    def export(self, path: str):
+        """Write a Chrome trace event file"""
+        metadata = [
+            {"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": name}}
+            for tid, name in self._thread_names.items()
+        ]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": metadata + list(self.events), "displayTimeUnit": "ms"}, f, default=str)
+
+
+class SamplingProfiler:
+    """Background thread sampling all thread stacks into collapsed-stack counts"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for tid, frame in sys._current_frames().items():
+            if tid == own:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            stack.append(names.get(tid, str(tid)))
+            self.samples[";".join(reversed(stack))] += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def export(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+# Instrumentation API
+def span(name: str, **args):
+    """Context manager timing one stage; a shared no-op unless tracing is enabled"""
+    tracer = _tracer
+    if tracer is None:
+        return NOOP_SPAN
+    return _Span(tracer, name, args or None)
+
+
+def traced(name: str = None):
+    """Decorator wrapping a function call in a span"""
+    def decorate(fn):
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            tracer = _tracer
+            if tracer is None:
+                return fn(*args, **kwargs)
+            with _Span(tracer, label, None):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+# Configuration
+_outputs = {}
+
+
+def configure(trace: str = None, profile: str = None, interval_ms: float = None):
+    """Start tracing to `trace` and/or profiling to `profile`; both are written at exit"""
+    global _tracer, _profiler
+    if trace and _tracer is None:
+        _tracer = Tracer()
+        _outputs["trace"] = trace
+    if profile and _profiler is None:
+        _profiler = SamplingProfiler((interval_ms or 5) / 1000)
+        _profiler.start()
+        _outputs["profile"] = profile
+    if _outputs and not _outputs.get("registered"):
+        _outputs["registered"] = True
+        atexit.register(write)
+
+
+def configure_from_env():
+    interval = os.getenv("AGENT_PROFILE_INTERVAL_MS") or "5"
+    try:
+        interval_ms = float(interval)
+        if interval_ms <= 0:
+            raise ValueError(interval)
+    except ValueError:
+        print(f"⚠️ Ignoring AGENT_PROFILE_INTERVAL_MS={interval!r}: expected a positive number of ms, using 5",
+              file=sys.stderr)
+        interval_ms = 5.0
+    configure(trace=os.getenv("AGENT_TRACE"), profile=os.getenv("AGENT_PROFILE"), interval_ms=interval_ms)
+
+
+def configure_from_argv(argv: list) -> list:
+    """Handle --trace PATH / --profile PATH and return argv without them"""
+    remaining = []
+    settings = {}
+    args = iter(argv)
+    for arg in args:
+        flag, _, value = arg.partition("=")
+        if flag in ("--trace", "--profile"):
+            settings[flag[2:]] = value or next(args, None)
+        else:
+            remaining.append(arg)
+    if settings:
+        configure(**settings)
+    return remaining
+
+
+def write():
+    """Write the trace and profile collected so far"""
+    if _tracer is not None and _outputs.get("trace"):
+        _tracer.export(_outputs["trace"])
+        print(f"🧭 Trace with {len(_tracer.events)} spans written to {_outputs['trace']}", file=sys.stderr)
+    if _profiler is not None and _outputs.get("profile"):
+        _profiler.stop()
+        _profiler.export(_outputs["profile"])
+        print(f"🔥 {sum(_profiler.samples.values())} profile samples written to {_outputs['profile']}", file=sys.stderr)
+
+
+def pid_path(path: str, pid: int = None) -> str:
+    """'trace.json' -> 'trace.<pid>.json'"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{pid or os.getpid()}{ext}"
+
+
+def _after_fork():
+    """Runs in every forked child: the parent's spans and profiler thread don't belong to it"""
+    global _tracer, _profiler
+    if _tracer is not None:
+        _tracer = Tracer(_tracer.max_events)
+    if _profiler is not None:
+        _profiler = SamplingProfiler(_profiler.interval)
+        _profiler.start()
+    for name in ("trace", "profile"):
+        if _outputs.get(name):
+            _outputs[name] = pid_path(_outputs.setdefault(f"{name}_base", _outputs[name]))
+
+
+def disable():
+    """Stop tracing and profiling without writing anything"""
+    global _tracer, _profiler
+    if _profiler is not None:
+        _profiler.stop()
+    _tracer = _profiler = None
+    for name in ("trace", "profile", "trace_base", "profile_base"):
+        _outputs.pop(name, None)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
+
+configure_from_env()
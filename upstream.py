@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Upstream - the one place the agents call the chat completions API
+
+Both agents route their model calls through create_chat_completion(), so
+timing, token usage and result recording are handled the same way for
+every kind of generation. Calls go through the model's circuit breaker
+(circuit_breaker.py), so they fail fast while the upstream is unhealthy,
+wait for a slot from the model's adaptive concurrency limiter
+(concurrency.py), and are admitted against a BudgetLedger (budget.py)
+when one is given.
+"""
+
+import hashlib
+import time
+from circuit_breaker import counts_as_failure, get_breaker
+from concurrency import get_limiter, is_overload
+from tracing import span
+from budget import estimate_prompt_tokens
+
+
+class Completion:
+    """Text plus the metadata of one chat completion call"""
+
+    __slots__ = ("text", "model", "prompt_tokens", "completion_tokens", "total_tokens", "started_at", "latency")
+
+    def __init__(self, text, model, prompt_tokens, completion_tokens, total_tokens, started_at, latency):
+        self.text = text
+        self.model = model
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.total_tokens = total_tokens
+        self.started_at = started_at
+        self.latency = latency
+
+
+def prompt_hash(system_prompt: str, prompt: str) -> str:
+    """Stable hash of the rendered prompts"""
+    digest = hashlib.sha256()
+    digest.update(system_prompt.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(prompt.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def create_chat_completion(
+    client,
+    model: str,
+    system_prompt: str,
+    prompt: str,
+    max_tokens: int,
+    temperature: float,
+    spec: dict = None,
+    result_store=None,
+    budget=None,
+    labels: dict = None,
+    acquire_timeout: float = None
+) -> Completion:
+    """
+    Call the chat completions API and return a Completion
+
+    When a result_store is given, the call (or its failure) is recorded
+    together with `spec`. Exceptions from the client are re-raised;
+    CircuitOpenError and ConcurrencyLimitExceeded are raised without
+    calling the client at all; acquire_timeout overrides how long to wait
+    for a slot (the web API sheds load after a short wait).
+
+    With a budget, the call is admitted first (labels such as tenant and
+    campaign, plus the spec's subreddit): it may run on a cheaper model,
+    wait, or fail with BudgetExceeded. Actual usage is recorded after.
+    """
+    admission = None
+    if budget is not None:
+        budget_labels = dict(labels or {})
+        if spec and spec.get("subreddit"):
+            budget_labels.setdefault("subreddit", spec["subreddit"])
+        admission = budget.admit(budget_labels, model, estimate_prompt_tokens(system_prompt, prompt), max_tokens)
+        model = admission.model
+
+    limiter = get_limiter(model)
+    breaker = get_breaker(model)
+    try:
+        with span("upstream.wait_for_slot", model=model):
+            limiter.acquire(acquire_timeout)  # raises ConcurrencyLimitExceeded if no slot frees up in time
+        try:
+            breaker.before_call()  # raises CircuitOpenError while the model is unhealthy
+        except Exception:
+            limiter.cancel()
+            raise
+    except Exception:
+        if admission is not None:
+            budget.release(admission)
+        raise
+
+    started_at = time.time()
+    start = time.perf_counter()
+    try:
+        with span("upstream.request", model=model):  # network wait plus the client's JSON decoding
+            response = client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=max_tokens,
+                temperature=temperature
+            )
+    except Exception as e:
+        limiter.release(time.perf_counter() - start, overloaded=is_overload(e), max_tokens=max_tokens)
+        breaker.record(time.perf_counter() - start, failed=counts_as_failure(e))
+        if admission is not None:
+            budget.release(admission)
+        if result_store:
+            result_store.record(
+                spec=spec, prompt_hash=prompt_hash(system_prompt, prompt), model=model,
+                started_at=started_at, latency=time.perf_counter() - start, error=f"{type(e).__name__}: {e}"
+            )
+        raise
+
+    latency = time.perf_counter() - start
+    usage = getattr(response, "usage", None)
+    limiter.release(latency, tokens=getattr(usage, "completion_tokens", None), max_tokens=max_tokens)
+    breaker.record(latency, failed=False)
+    with span("upstream.parse"):
+        completion = Completion(
+            text=response.choices[0].message.content.strip(),
+            model=getattr(response, "model", None) or model,
+            prompt_tokens=getattr(usage, "prompt_tokens", None),
+            completion_tokens=getattr(usage, "completion_tokens", None),
+            total_tokens=getattr(usage, "total_tokens", None),
+            started_at=started_at,
+            latency=latency
+        )
+    if admission is not None:
+        budget.record(admission, completion.prompt_tokens, completion.completion_tokens)
+    if result_store:
+        result_store.record(
+            spec=spec, prompt_hash=prompt_hash(system_prompt, prompt), model=completion.model,
+            started_at=started_at, latency=latency, output=completion.text,
+            prompt_tokens=completion.prompt_tokens, completion_tokens=completion.completion_tokens,
+            total_tokens=completion.total_tokens
+        )
+    return completion